@@ -0,0 +1,13 @@
+"""Reproducible benchmarks for the IMS back-end.
+
+Run from the ``wireframe`` directory::
+
+    python -m benchmarks                      # 10k and 100k rows
+    python -m benchmarks --scale 1m 10m --workdir /mnt/scratch
+    python -m benchmarks --scale 10k --save-baseline
+
+Results are compared with ``baselines.json`` and the command exits with
+status 1 when any metric is worse than its baseline by more than the
+tolerance.  Baselines depend on the machine, so re-record them with
+``--save-baseline`` when moving to new hardware.
+"""
@@ -0,0 +1,67 @@
+"""Command line for the benchmark suite (see ``benchmarks``)."""
+
+import argparse
+import json
+import multiprocessing
+import sys
+
+from . import suite
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="Benchmark the IMS back-end on synthetic data.")
+    parser.add_argument('--scale', nargs='+', choices=list(suite.SCALES),
+                        default=['10k', '100k'], help="row counts to run (default: 10k 100k)")
+    parser.add_argument('--repeat', type=int, default=5,
+                        help="timed runs per latency benchmark (default: 5)")
+    parser.add_argument('--tolerance', type=float, default=suite.DEFAULT_TOLERANCE,
+                        help="allowed slowdown before a metric is flagged (default: 0.25)")
+    parser.add_argument('--workdir', help="directory for the temporary databases")
+    parser.add_argument('--baselines', default=suite.BASELINES_PATH,
+                        help="baselines file (default: benchmarks/baselines.json)")
+    parser.add_argument('--save-baseline', action='store_true',
+                        help="store these results as the new baselines")
+    parser.add_argument('--json', dest='json_path', help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    baselines = suite.load_baselines(args.baselines)
+    all_results = {}
+    regressed = []
+    # A fresh interpreter per scale, so peak RSS is that scale's alone
+    context = multiprocessing.get_context('spawn')
+    for scale in args.scale:
+        print(f"Running {scale} ({suite.SCALES[scale]:,} records)...", flush=True)
+        with context.Pool(1, maxtasksperchild=1) as pool:
+            results = pool.apply(suite.run, (scale, args.workdir, args.repeat))
+        all_results[scale] = results
+        rows = suite.compare(results, baselines.get(scale), args.tolerance)
+        _print_table(rows)
+        regressed.extend(f"{scale} {name}" for name, *_, bad in rows if bad)
+        if args.save_baseline:
+            suite.save_baseline(scale, results, args.baselines)
+
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(all_results, f, indent=2)
+    if args.save_baseline:
+        print(f"Baselines saved to {args.baselines}")
+    elif regressed:
+        print(f"Regressions beyond {args.tolerance:.0%}: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+def _print_table(rows):
+    print(f"  {'metric':<22}{'value':>14}{'baseline':>14}{'change':>10}")
+    for name, value, base, change, bad in rows:
+        unit = suite.METRICS[name][0]
+        base_text = '-' if base is None else f"{base:,.2f}"
+        change_text = '-' if change is None else f"{change:+.0%}"
+        flag = '  REGRESSION' if bad else ''
+        print(f"  {name:<22}{value:>10,.2f} {unit:<3}{base_text:>14}{change_text:>10}{flag}")
+    print()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,314 @@
+"""Headless load test: many concurrent sessions against one app process.
+
+Each simulated user is a Streamlit ``AppTest`` session running the real
+``wireframe.py`` script, so every session shares the process-wide
+``st.cache_resource`` stores exactly as browser sessions on one server
+do.  Sessions loop through weighted flows (navigate, search, filter,
+save a record, generate a report) in their own threads; every rerun
+they trigger is timed.
+
+Concurrency is raised in levels.  Each level reports throughput and
+latency percentiles, and the process RSS is sampled as sessions are
+added to estimate the memory cost of one more session.  Run from the
+``wireframe`` directory::
+
+    python -m benchmarks.loadtest --levels 1 5 10 25 --duration 30 --records 10000
+
+Everything runs locally against a scratch data directory.
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+APP_PATH = Path(__file__).resolve().parent.parent / 'wireframe.py'
+
+# Flow -> relative weight in the simulated traffic
+FLOW_WEIGHTS = {
+    'browse': 4,
+    'search': 3,
+    'filter': 3,
+    'save_record': 1,
+    'generate_report': 1,
+}
+
+NAV_KEYS = {
+    'Dashboard': 'nav_dashboard',
+    'Records': 'nav_records',
+    'Add Record': 'nav_add_record',
+    'Reports': 'nav_reports',
+    'Admin': 'nav_admin',
+    'Training': 'nav_training',
+}
+
+SEARCH_TERMS = ('contract', 'audit', 'budget review', 'vendor renewal', 'security')
+
+# A level is saturated when throughput grows by less than this over
+# the previous level, or when p95 latency exceeds the SLO
+MIN_SCALING = 0.10
+DEFAULT_SLO_MS = 1000
+
+# Seconds one rerun may take before AppTest gives up
+RUN_TIMEOUT = 60
+
+# Every completed interaction is also recorded under this name
+ALL = 'all'
+
+
+class Session:
+    """One simulated user: an AppTest instance plus its own RNG."""
+
+    def __init__(self, number, seed):
+        from streamlit.testing.v1 import AppTest
+
+        self.number = number
+        self.rng = random.Random(seed + number)
+        self.app = AppTest.from_file(str(APP_PATH), default_timeout=RUN_TIMEOUT)
+
+    def open(self, timings):
+        started = time.perf_counter()
+        self.app.run()
+        timings.record('open', time.perf_counter() - started)
+
+    def run_flow(self, timings):
+        flow = self.rng.choices(list(FLOW_WEIGHTS), weights=FLOW_WEIGHTS.values())[0]
+        getattr(self, f'_{flow}')(timings)
+
+    # Flows (each step is one rerun)
+
+    def _browse(self, timings):
+        for page in self.rng.sample(['Dashboard', 'Records', 'Reports', 'Admin', 'Training'], 2):
+            self._navigate(timings, page)
+
+    def _search(self, timings):
+        self._navigate(timings, 'Records')
+        box = _widget(self.app.text_input, 'Search records...')
+        self._timed(timings, 'search', box.input(self.rng.choice(SEARCH_TERMS)).run)
+
+    def _filter(self, timings):
+        self._navigate(timings, 'Records')
+        for key in self.rng.sample(['records_category', 'records_status', 'records_priority'], 2):
+            select = self.app.selectbox(key=key)
+            self._timed(timings, 'filter', select.select(self.rng.choice(select.options[1:])).run)
+
+    def _save_record(self, timings):
+        self._navigate(timings, 'Add Record')
+        _widget(self.app.text_input, 'Record Title *').input(
+            f"Load test record {self.number}-{self.rng.randrange(10 ** 6)}")
+        _widget(self.app.selectbox, 'Category *').select('Legal Documents')
+        self._timed(timings, 'save_record', _widget(self.app.button, 'Save Record').click().run)
+
+    def _generate_report(self, timings):
+        self._navigate(timings, 'Reports')
+        self._timed(timings, 'generate_report',
+                    _widget(self.app.button, 'Generate Report').click().run)
+
+    def _navigate(self, timings, page):
+        self._timed(timings, 'navigate', self.app.button(key=NAV_KEYS[page]).click().run)
+
+    def _timed(self, timings, name, action):
+        started = time.perf_counter()
+        try:
+            action()
+        except Exception:
+            timings.record(f'error.{name}', time.perf_counter() - started)
+            raise
+        elapsed = time.perf_counter() - started
+        timings.record(name, elapsed)
+        timings.record(ALL, elapsed)
+        if self.app.exception:
+            timings.record(f'error.{name}', 0.0)
+
+
+def _widget(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+def current_rss_mb():
+    """Resident memory of this process now, in MB."""
+    try:
+        with open('/proc/self/status', encoding='ascii') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Not Linux: fall back to the peak, which never shrinks
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run_level(sessions, duration, timings):
+    """Drive every session concurrently for ``duration`` seconds."""
+    deadline = time.monotonic() + duration
+    failures = []
+
+    def drive(session):
+        while time.monotonic() < deadline:
+            try:
+                session.run_flow(timings)
+            except Exception as e:
+                failures.append(repr(e))
+
+    threads = [threading.Thread(target=drive, args=(s,), daemon=True) for s in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return failures
+
+
+def load_test(levels, duration, records=0, seed=1234, slo_ms=DEFAULT_SLO_MS):
+    """Run the levels in order and return the report as a dict."""
+    from ims.profiling import Profiler
+
+    if records:
+        _seed_store(records, seed)
+    rss_start = current_rss_mb()
+    sessions = []
+    rss_samples = []
+    opening = Profiler(window=100_000)
+    report = {'levels': [], 'interactions': {}}
+    for level in levels:
+        # Sessions carry over between levels; only the new ones are opened
+        for number in range(len(sessions), level):
+            session = Session(number, seed)
+            session.open(opening)
+            sessions.append(session)
+        timings = Profiler(window=100_000)
+        failures = run_level(sessions, duration, timings)
+        rss = current_rss_mb()
+        rss_samples.append((level, rss))
+        rows = {row['name']: row for row in timings.summary()}
+        overall = rows.get(ALL, {'count': 0, 'p50': 0.0, 'p95': 0.0, 'p99': 0.0})
+        report['levels'].append({
+            'sessions': level,
+            'interactions': overall['count'],
+            'throughput': overall['count'] / duration,
+            'p50_ms': overall['p50'] * 1000,
+            'p95_ms': overall['p95'] * 1000,
+            'p99_ms': overall['p99'] * 1000,
+            'errors': sum(row['count'] for name, row in rows.items() if name.startswith('error.')),
+            'failures': failures[:5],
+            'rss_mb': rss,
+        })
+        report['interactions'] = rows
+    report['open'] = opening.summary()
+    report['rss_start_mb'] = rss_start
+    report['rss_per_session_mb'] = _slope(rss_samples, rss_start)
+    report['ceiling'] = _ceiling(report['levels'], slo_ms)
+    return report
+
+
+def _seed_store(records, seed):
+    from ims.config import data_path
+    from ims.store import RecordStore
+
+    from . import synthetic
+
+    store = RecordStore(data_path('ims.db'))
+    try:
+        if store.count() == 0:
+            for chunk in synthetic.record_chunks(records, seed=seed):
+                store.add_many(chunk)
+    finally:
+        store.close()
+
+
+def _slope(samples, rss_start):
+    """MB of RSS per extra session, fitted over the levels."""
+    if len(samples) >= 2 and len({n for n, _ in samples}) >= 2:
+        return statistics.linear_regression([n for n, _ in samples],
+                                            [rss for _, rss in samples]).slope
+    if samples:
+        sessions, rss = samples[-1]
+        return (rss - rss_start) / sessions
+    return None
+
+
+def _ceiling(levels, slo_ms):
+    """The best sustained throughput and the level where scaling stops."""
+    best = max(levels, key=lambda level: level['throughput'], default=None)
+    saturated = None
+    for previous, level in zip([None] + levels, levels):
+        if level['p95_ms'] > slo_ms or (
+                previous and level['throughput'] < previous['throughput'] * (1 + MIN_SCALING)):
+            saturated = level['sessions']
+            break
+    return {
+        'throughput': best and best['throughput'],
+        'at_sessions': best and best['sessions'],
+        'saturated_at_sessions': saturated,
+    }
+
+
+def print_report(report, slo_ms):
+    print(f"{'sessions':>8}{'interactions':>14}{'per sec':>10}{'p50 ms':>10}"
+          f"{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}{'RSS MB':>10}")
+    for level in report['levels']:
+        print(f"{level['sessions']:>8}{level['interactions']:>14,}{level['throughput']:>10.1f}"
+              f"{level['p50_ms']:>10.0f}{level['p95_ms']:>10.0f}{level['p99_ms']:>10.0f}"
+              f"{level['errors']:>8}{level['rss_mb']:>10.0f}")
+        for failure in level['failures']:
+            print(f"{'':>8}  ! {failure}")
+    print()
+    print(f"{'interaction':<22}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for row in report['open'] + list(report['interactions'].values()):
+        name = row['name']
+        print(f"{name:<22}{row['count']:>8,}{row['p50'] * 1000:>10.0f}{row['p95'] * 1000:>10.0f}"
+              f"{row['p99'] * 1000:>10.0f}{row['max'] * 1000:>10.0f}")
+    print()
+    if report['rss_per_session_mb'] is not None:
+        print(f"RSS growth per session: {report['rss_per_session_mb']:.1f} MB "
+              f"(from {report['rss_start_mb']:.0f} MB)")
+    ceiling = report['ceiling']
+    if ceiling['throughput'] is not None:
+        print(f"Throughput ceiling: {ceiling['throughput']:.1f} interactions/s "
+              f"at {ceiling['at_sessions']} sessions")
+    if ceiling['saturated_at_sessions'] is not None:
+        print(f"Saturated at {ceiling['saturated_at_sessions']} sessions "
+              f"(throughput gain under {MIN_SCALING:.0%} or p95 over {slo_ms} ms)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.loadtest',
+                                     description="Simulate concurrent sessions against the app.")
+    parser.add_argument('--levels', nargs='+', type=int, default=[1, 5, 10, 25],
+                        help="concurrent session counts, in increasing order (default: 1 5 10 25)")
+    parser.add_argument('--duration', type=float, default=30,
+                        help="seconds to drive each level (default: 30)")
+    parser.add_argument('--records', type=int, default=0,
+                        help="synthetic records to load before the sessions start")
+    parser.add_argument('--seed', type=int, default=1234)
+    parser.add_argument('--slo-ms', type=float, default=DEFAULT_SLO_MS,
+                        help="p95 latency at which a level counts as saturated (default: 1000)")
+    parser.add_argument('--data-dir', help="data directory for the app (default: a temporary one)")
+    parser.add_argument('--json', dest='json_path', help="also write the report to this file")
+    args = parser.parse_args(argv)
+    if args.levels != sorted(args.levels):
+        parser.error("--levels must be in increasing order")
+
+    with tempfile.TemporaryDirectory(prefix='ims-loadtest-') as tmp:
+        # Must be set before anything imports ims.config
+        os.environ['IMS_DATA_DIR'] = args.data_dir or tmp
+        report = load_test(args.levels, args.duration, args.records, args.seed, args.slo_ms)
+    print_report(report, args.slo_ms)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
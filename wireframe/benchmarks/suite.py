@@ -0,0 +1,229 @@
+"""The benchmarks and their comparison against stored baselines.
+
+``run(scale)`` builds a fresh store of synthetic records and measures the
+code paths behind the pages: bulk inserts, the Records page filters,
+facets, search and paging, the Dashboard headline aggregates, a CSV
+export and the User Management directory.  Latencies are the median of several
+runs after a warm-up, so one slow run does not decide the result.
+"""
+
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from ims import export as exporter
+from ims.metrics import summarize
+from ims.permissions import accessible
+from ims.store import COLUMNS, RecordStore
+from ims.users import UserDirectory
+
+from . import synthetic
+
+SCALES = {
+    '10k': 10_000,
+    '100k': 100_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+
+BASELINES_PATH = Path(__file__).resolve().parent / 'baselines.json'
+
+# Allowed slowdown against the baseline before a metric is flagged
+DEFAULT_TOLERANCE = 0.25
+
+# Metric -> (unit, True when higher is better)
+METRICS = {
+    'insert': ('rows/s', True),
+    'records.first_page': ('ms', False),
+    'filter.page': ('ms', False),
+    'filter.count': ('ms', False),
+    'filter.facets': ('ms', False),
+    'filter.sorted_page': ('ms', False),
+    'filter.visible_page': ('ms', False),
+    'search.page': ('ms', False),
+    'search.count': ('ms', False),
+    'search.facets': ('ms', False),
+    'dashboard.headline': ('ms', False),
+    'export.csv': ('rows/s', True),
+    'users.insert': ('rows/s', True),
+    'users.filter': ('ms', False),
+    'users.prefix': ('ms', False),
+    'peak_rss': ('MB', False),
+}
+
+# Filters and searches the Records page issues for a typical selection
+FILTERS = {'category': 'Legal', 'status': 'Active'}
+FACET_FIELDS = ('category', 'status', 'priority')
+SEARCH = 'contract renewal'
+
+# A user without the Administrator role, for the visibility-restricted page
+VIEWER = 'jane.doe@company.com'
+
+# Users in the directory at every scale above this
+MAX_USERS = 1_000_000
+
+# User Management filters and the lazy picker's prefix
+USER_FILTERS = {'role': 'User', 'department': 'Finance', 'status': 'Active'}
+USER_PREFIX = 'jane'
+
+INSERT_BATCH = 10000
+
+# Differences smaller than this are timer noise, whatever the percentage
+MIN_DELTA = {'ms': 0.5}
+
+
+def run(scale, workdir=None, repeat=5):
+    """Run every benchmark at ``scale`` and return ``{metric: value}``.
+
+    Peak RSS covers the whole process, so each scale should run in a
+    fresh interpreter (the command line does this).
+    """
+    total = SCALES[scale]
+    with tempfile.TemporaryDirectory(dir=workdir, prefix=f'ims-bench-{scale}-') as tmp:
+        store = RecordStore(Path(tmp) / 'bench.db')
+        try:
+            results = {'insert': _insert(store, total)}
+            results.update(_latencies(_record_queries(store), repeat))
+            results['export.csv'] = _export(store, total)
+        finally:
+            store.close()
+        directory = UserDirectory(Path(tmp) / 'users.db')
+        try:
+            results.update(_users(directory, min(total, MAX_USERS), repeat))
+        finally:
+            directory.close()
+    results['peak_rss'] = peak_rss_mb()
+    return results
+
+
+def _insert(store, total):
+    started = time.perf_counter()
+    for chunk in synthetic.record_chunks(total, INSERT_BATCH):
+        store.add_many(chunk)
+    return total / (time.perf_counter() - started)
+
+
+def _users(directory, total, repeat):
+    started = time.perf_counter()
+    batch = []
+    for user in synthetic.users(total):
+        batch.append(user)
+        if len(batch) == INSERT_BATCH:
+            directory.upsert_many(batch)
+            batch = []
+    directory.upsert_many(batch)
+    return {
+        'users.insert': total / (time.perf_counter() - started),
+        'users.filter': _median_ms(lambda: (directory.count(**USER_FILTERS),
+                                            directory.page(limit=50, **USER_FILTERS)), repeat),
+        'users.prefix': _median_ms(lambda: directory.pick(USER_PREFIX), repeat),
+    }
+
+
+def _record_queries(store):
+    today = synthetic.END_DATE
+
+    def headline():
+        counts = store.counts()
+        return summarize(counts, store.timeline('day', start=today - timedelta(days=62)), today)
+
+    def visible_page():
+        # Resolving the user's access bitmap (uncached), then one Records page
+        _, visible = accessible(store, VIEWER)
+        return store.count(visible=visible, **FILTERS), store.page(limit=50, visible=visible, **FILTERS)
+
+    return {
+        'records.first_page': lambda: store.page(limit=50),
+        'filter.page': lambda: store.page(limit=50, **FILTERS),
+        'filter.count': lambda: store.count(**FILTERS),
+        'filter.facets': lambda: store.facets(FACET_FIELDS, **FILTERS),
+        'filter.sorted_page': lambda: store.page(sort='Modified', descending=True,
+                                                 limit=50, **FILTERS),
+        'filter.visible_page': visible_page,
+        'search.page': lambda: store.page(sort='Relevance', limit=50, search=SEARCH),
+        'search.count': lambda: store.count(search=SEARCH),
+        'search.facets': lambda: store.facets(FACET_FIELDS, search=SEARCH),
+        'dashboard.headline': headline,
+    }
+
+
+def _latencies(queries, repeat):
+    return {name: _median_ms(query, repeat) for name, query in queries.items()}
+
+
+def _median_ms(func, repeat):
+    func()  # warm-up: page cache, lazily built indexes
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def _export(store, total):
+    started = time.perf_counter()
+    path = exporter.export(store.iter_chunks(), COLUMNS, 'CSV', prefix='bench')
+    elapsed = time.perf_counter() - started
+    os.unlink(path)
+    return total / elapsed
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+# Baselines
+
+def load_baselines(path=BASELINES_PATH):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(scale, results, path=BASELINES_PATH):
+    """Store ``results`` as the baseline for ``scale``, keeping the others."""
+    import platform
+    import sqlite3
+
+    baselines = load_baselines(path)
+    baselines[scale] = {
+        'recorded': time.strftime('%Y-%m-%d'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'machine': platform.machine(),
+        'results': {name: round(value, 3) for name, value in results.items()},
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """One ``(metric, value, baseline, change, regressed)`` row per result.
+
+    ``change`` is the relative change in the "better" direction (negative
+    is worse); it and ``baseline`` are None when there is no baseline.
+    """
+    rows = []
+    for name, value in results.items():
+        base = (baseline or {}).get('results', {}).get(name)
+        if not base:
+            rows.append((name, value, None, None, False))
+            continue
+        unit, higher_is_better = METRICS[name]
+        change = (value - base) / base if higher_is_better else (base - value) / base
+        noise = abs(value - base) < MIN_DELTA.get(unit, 0)
+        rows.append((name, value, base, change, change < -tolerance and not noise))
+    return rows
@@ -0,0 +1,109 @@
+"""Deterministic synthetic records and users.
+
+Rows have the shape of ``SAMPLE_RECORDS`` and ``SAMPLE_USERS`` with
+values drawn from the reference option lists.  The same ``seed`` always
+gives the same rows, and rows are produced in chunks so ten million of
+them never have to be in memory at once.
+"""
+
+import random
+from datetime import date, timedelta
+
+from ims.permissions import VISIBILITIES
+from ims.reference import DEPARTMENTS, PRIORITIES, RECORD_STATUSES, ROLES, USER_STATUSES
+from ims.store import format_id
+
+# Stored record categories (the first word of the form categories)
+CATEGORIES = ('Legal', 'Technical', 'Financial', 'Project', 'Client', 'Security')
+
+FIRST_NAMES = ('John', 'Jane', 'Bob', 'Alice', 'Carlos', 'Priya', 'Wei', 'Fatima',
+               'Liam', 'Olga', 'Kenji', 'Amara', 'Noah', 'Sofia', 'Ahmed', 'Mia')
+LAST_NAMES = ('Smith', 'Doe', 'Wilson', 'Johnson', 'Garcia', 'Patel', 'Chen', 'Khan',
+              'Murphy', 'Ivanova', 'Sato', 'Okafor', 'Brown', 'Rossi', 'Hassan', 'Muller')
+
+# Record name = subject + " - " + qualifier, e.g. "Client Contract - ABC Corp"
+SUBJECTS = ('Client Contract', 'Project Specifications', 'Budget Analysis',
+            'Security Audit Report', 'Vendor Agreement', 'Design Review',
+            'Compliance Checklist', 'Quarterly Forecast', 'Incident Report',
+            'Service Proposal', 'Risk Assessment', 'Meeting Minutes')
+QUALIFIERS = ('ABC Corp', 'Q1', 'Q2', 'Q3', 'Q4', 'Northwind', 'Contoso', 'Globex',
+              'Initech', 'Umbrella', 'Phase 1', 'Phase 2', 'Draft', 'Final')
+WORDS = ('contract', 'client', 'important', 'budget', 'review', 'security', 'audit',
+         'invoice', 'renewal', 'specification', 'urgent', 'archive', 'legal', 'vendor',
+         'forecast', 'compliance', 'policy', 'migration', 'roadmap', 'incident')
+
+# Created dates are spread over this many days before END_DATE
+DATE_SPAN = 730
+END_DATE = date(2024, 1, 31)
+
+# Share of Public, Restricted and Private records
+VISIBILITY_WEIGHTS = (70, 20, 10)
+
+DEFAULT_SEED = 1234
+
+
+def people(count=len(FIRST_NAMES) * len(LAST_NAMES)):
+    """Distinct "First Last" names used for Assigned and the user list."""
+    names = [f"{first} {last}" for last in LAST_NAMES for first in FIRST_NAMES]
+    return names[:count]
+
+
+def record_chunks(total, chunk_size=10000, seed=DEFAULT_SEED, start=1):
+    """Yield ``total`` records as lists of at most ``chunk_size`` dicts."""
+    rng = random.Random(seed)
+    # Access fields come from their own generator so the other fields
+    # stay the same as in data sets generated before they existed
+    access = random.Random(seed + 1)
+    assignees = people()
+    emails = [email_of(name) for name in assignees]
+    for offset in range(0, total, chunk_size):
+        chunk = []
+        for number in range(start + offset, start + min(offset + chunk_size, total)):
+            created = END_DATE - timedelta(days=rng.randrange(DATE_SPAN))
+            modified = min(created + timedelta(days=rng.randrange(60)), END_DATE)
+            chunk.append({
+                'ID': format_id(number),
+                'Name': f"{rng.choice(SUBJECTS)} - {rng.choice(QUALIFIERS)}",
+                'Category': rng.choice(CATEGORIES),
+                'Created': created.isoformat(),
+                'Modified': modified.isoformat(),
+                'Status': rng.choice(RECORD_STATUSES),
+                'Priority': rng.choice(PRIORITIES),
+                'Assigned': rng.choice(assignees),
+                'Description': ' '.join(rng.choices(WORDS, k=12)),
+                'Tags': ', '.join(rng.sample(WORDS, 3)),
+                'Department': rng.choice(DEPARTMENTS),
+                'Visibility': access.choices(VISIBILITIES, VISIBILITY_WEIGHTS)[0],
+                'Owner': access.choice(emails),
+                'Shared With': access.sample(emails, 2),
+            })
+        yield chunk
+
+
+def email_of(name, suffix=''):
+    """The email of a synthetic user, e.g. 'jane.doe@company.com'."""
+    return f"{name.lower().replace(' ', '.')}{suffix}@company.com"
+
+
+def records(total, seed=DEFAULT_SEED):
+    """``total`` records one at a time."""
+    for chunk in record_chunks(total, seed=seed):
+        yield from chunk
+
+
+def users(total, seed=DEFAULT_SEED):
+    """``total`` users shaped like ``SAMPLE_USERS`` (emails are unique)."""
+    rng = random.Random(seed)
+    names = people()
+    for number in range(total):
+        name = names[number % len(names)]
+        suffix = '' if number < len(names) else str(number // len(names))
+        login = END_DATE - timedelta(days=rng.randrange(DATE_SPAN))
+        yield {
+            'Name': name,
+            'Email': email_of(name, suffix),
+            'Role': rng.choice(ROLES),
+            'Department': rng.choice(DEPARTMENTS),
+            'Last Login': f"{login.isoformat()} {rng.randrange(24):02d}:{rng.randrange(60):02d}",
+            'Status': rng.choice(USER_STATUSES),
+        }
@@ -0,0 +1,6 @@
+"""Shared back-end services for the IMS wireframe.
+
+Modules in this package are imported by the Streamlit pages but do not
+depend on Streamlit themselves, so they can also be used from scripts
+and worker processes.
+"""
@@ -0,0 +1,184 @@
+"""Append-only activity event log with time-bucketed rollups.
+
+Every event (record created/updated, logins, reports generated, ...) is
+one row in the ``activity`` table.  Triggers keep per-minute, per-hour
+and per-day counts in ``activity_rollup`` so charts never scan the raw
+events, and ``series()`` downsamples long ranges to a fixed number of
+points with LTTB.
+"""
+
+import sqlite3
+import threading
+import time
+
+from .profiling import timed
+
+# Grain -> bucket width in seconds
+GRAINS = {
+    'minute': 60,
+    'hour': 3600,
+    'day': 86400,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS activity (
+    id     INTEGER PRIMARY KEY,
+    ts     REAL NOT NULL,
+    action TEXT NOT NULL,
+    user   TEXT NOT NULL,
+    detail TEXT NOT NULL DEFAULT '',
+    status TEXT NOT NULL DEFAULT 'Complete'
+);
+CREATE INDEX IF NOT EXISTS idx_activity_ts ON activity (ts);
+CREATE TABLE IF NOT EXISTS activity_rollup (
+    grain  TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    n      INTEGER NOT NULL,
+    PRIMARY KEY (grain, bucket)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS activity_no_update BEFORE UPDATE ON activity BEGIN
+    SELECT RAISE(ABORT, 'activity log is append-only');
+END;
+CREATE TRIGGER IF NOT EXISTS activity_no_delete BEFORE DELETE ON activity BEGIN
+    SELECT RAISE(ABORT, 'activity log is append-only');
+END;
+"""
+
+ROLLUP_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS activity_rollup_insert AFTER INSERT ON activity BEGIN
+{statements}
+END;
+"""
+
+ROLLUP_STATEMENT = (
+    "    INSERT INTO activity_rollup VALUES "
+    "('{grain}', CAST(new.ts / {width} AS INTEGER) * {width}, 1) "
+    "ON CONFLICT (grain, bucket) DO UPDATE SET n = n + 1;"
+)
+
+# Default number of points a chart series is reduced to
+MAX_POINTS = 300
+
+
+class ActivityLog:
+    """Writer and query interface for the activity tables."""
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.executescript(ROLLUP_TRIGGER.format(statements='\n'.join(
+            ROLLUP_STATEMENT.format(grain=grain, width=width)
+            for grain, width in GRAINS.items())))
+
+    @timed('activity.log')
+    def log(self, action, user, detail='', status='Complete', ts=None):
+        """Append one event; ``ts`` defaults to now (epoch seconds)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO activity (ts, action, user, detail, status) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (time.time() if ts is None else ts, action, user, detail, status))
+
+    @property
+    def version(self):
+        """Id of the newest event; changes whenever an event is logged."""
+        with self._lock:
+            row = self._conn.execute("SELECT MAX(id) FROM activity").fetchone()
+        return row[0] or 0
+
+    @timed('activity.recent')
+    def recent(self, limit=5):
+        """Newest events first as ``(ts, action, user, detail, status)``."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT ts, action, user, detail, status FROM activity "
+                "ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+
+    @timed('activity.rollup')
+    def rollup(self, grain, start, end):
+        """``[(bucket_start, count), ...]`` for buckets in ``[start, end)``."""
+        width = GRAINS[grain]
+        with self._lock:
+            return self._conn.execute(
+                "SELECT bucket, n FROM activity_rollup "
+                "WHERE grain = ? AND bucket >= ? AND bucket < ? ORDER BY bucket",
+                (grain, int(start // width * width), end)).fetchall()
+
+    @timed('activity.series')
+    def series(self, start, end, max_points=MAX_POINTS):
+        """Event counts over ``[start, end)`` reduced to ``max_points``.
+
+        Picks the finest grain that keeps the bucket count near
+        ``max_points``, fills empty buckets with zeros and downsamples
+        the rest with LTTB.  Returns ``(grain, [(bucket_start, count)])``.
+        """
+        span = max(end - start, 1)
+        grain = next((g for g, width in GRAINS.items() if span / width <= max_points * 4),
+                     'day')
+        width = GRAINS[grain]
+        counts = dict(self.rollup(grain, start, end))
+        first = int(start // width * width)
+        points = [(bucket, counts.get(bucket, 0)) for bucket in range(first, int(end), width)]
+        return grain, lttb(points, max_points)
+
+
+def rebuild_rollup(conn):
+    """Recount ``activity_rollup`` from the events (e.g. after a restore)."""
+    conn.execute("DELETE FROM activity_rollup")
+    for grain, width in GRAINS.items():
+        conn.execute(
+            "INSERT INTO activity_rollup SELECT ?, CAST(ts / ? AS INTEGER) * ?, COUNT(*) "
+            "FROM activity GROUP BY 2", (grain, width, width))
+
+
+def lttb(points, threshold):
+    """Largest-Triangle-Three-Buckets downsampling of ``(x, y)`` points.
+
+    Keeps the first and last point and, from each of ``threshold - 2``
+    buckets in between, the point forming the largest triangle with its
+    neighbours, which preserves peaks and troughs far better than
+    averaging.
+    """
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+    sampled = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        next_start = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        next_bucket = points[next_start:next_end]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+
+        ax, ay = points[a]
+        best, best_area = None, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        a = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def time_ago(ts, now=None):
+    """Human readable age such as ``'15 min ago'``."""
+    seconds = max(int((now or time.time()) - ts), 0)
+    if seconds < 60:
+        return 'just now'
+    if seconds < 3600:
+        return f'{seconds // 60} min ago'
+    if seconds < 86400:
+        hours = seconds // 3600
+        return f'{hours} hour ago' if hours == 1 else f'{hours} hours ago'
+    days = seconds // 86400
+    return f'{days} day ago' if days == 1 else f'{days} days ago'
@@ -0,0 +1,131 @@
+"""Content-addressed attachment storage.
+
+Uploaded files are streamed to disk in fixed-size chunks while their
+SHA-256 is computed, then moved to ``blobs/<aa>/<sha256>``.  A file that
+is already stored is not written again; records simply gain another
+link to the same blob.  Reads go through ``mmap`` so large files are
+paged in by the OS rather than copied into Python memory.
+"""
+
+import hashlib
+import mmap
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from . import revs
+
+CHUNK_SIZE = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    sha256  TEXT PRIMARY KEY,
+    size    INTEGER NOT NULL,
+    created REAL NOT NULL,
+    rev     INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS attachments (
+    id        INTEGER PRIMARY KEY,
+    record_id TEXT NOT NULL,
+    sha256    TEXT NOT NULL REFERENCES blobs (sha256),
+    name      TEXT NOT NULL,
+    mime      TEXT NOT NULL DEFAULT '',
+    uploaded  REAL NOT NULL,
+    user      TEXT NOT NULL DEFAULT ''
+);
+CREATE INDEX IF NOT EXISTS idx_attachments_record ON attachments (record_id);
+CREATE INDEX IF NOT EXISTS idx_attachments_sha256 ON attachments (sha256);
+"""
+
+
+class AttachmentStore:
+    """Blob files on disk plus the ``blobs``/``attachments`` tables."""
+
+    def __init__(self, db_path, root):
+        self.root = Path(root)
+        self._tmp = self.root / 'tmp'
+        self._tmp.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        revs.install(self._conn, 'blobs')
+
+    def blob_path(self, sha256):
+        return self.root / 'blobs' / sha256[:2] / sha256
+
+    def put(self, stream):
+        """Store the contents of a binary ``stream`` and return ``(sha256, size)``.
+
+        The stream is read ``CHUNK_SIZE`` bytes at a time; if a blob with
+        the same hash already exists the new copy is discarded.
+        """
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self._tmp)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+            sha256 = digest.hexdigest()
+            target = self.blob_path(sha256)
+            if target.exists():
+                os.unlink(tmp_path)
+            else:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO blobs (sha256, size, created, rev) "
+                f"VALUES (?, ?, ?, {revs.next_rev('blobs')})",
+                (sha256, size, time.time()))
+        return sha256, size
+
+    def attach(self, record_id, stream, name, mime='', user=''):
+        """Store ``stream`` and link it to ``record_id``; returns ``(attachment id, sha256)``."""
+        sha256, _ = self.put(stream)
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO attachments (record_id, sha256, name, mime, uploaded, user) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (record_id, sha256, name, mime, time.time(), user))
+        return cur.lastrowid, sha256
+
+    def for_record(self, record_id):
+        """Attachments linked to ``record_id`` with their blob sizes."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT a.id, a.name, a.mime, a.sha256, a.uploaded, b.size "
+                "FROM attachments a JOIN blobs b USING (sha256) "
+                "WHERE a.record_id = ? ORDER BY a.id", (record_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    @contextmanager
+    def open_blob(self, sha256):
+        """Memory-map a stored blob for reading.
+
+        Yields a read-only ``mmap`` (``b''`` for empty files) that can be
+        sliced, hashed or passed to anything accepting a buffer without
+        copying the file into the Python heap.
+        """
+        with open(self.blob_path(sha256), 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b''
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                yield mapped
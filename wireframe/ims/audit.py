@@ -0,0 +1,523 @@
+"""Append-only security audit log in rolling, compressed segment files.
+
+Events are JSON lines appended to the active segment file by a single
+writer thread; ``record()`` only puts the event on an in-memory queue,
+so the request path never waits for the disk.  A segment is closed once
+it reaches ``max_bytes`` or is ``max_age`` seconds old.  Closed segments
+are rewritten in the background as gzip members of ``BLOCK_EVENTS``
+events each, and the plain file is then removed.
+
+Every segment is split into the same blocks whether or not it is
+compressed yet.  The index sidecar (``index.db`` next to the segments)
+holds each closed segment's time range, the offset and time range of
+each of its blocks, and per user and per action a bitmap of the blocks
+holding their events (see ``ims.bitmaps``); the open segments' index is
+kept in memory.  A query such as "everything user X did in the last 30
+days" only reads the segments overlapping the range and decompresses
+only the blocks that can match, so its cost follows the number of
+matching events rather than the size of the log.
+
+Event times are made non-decreasing as they are written, which keeps
+segments and blocks in time order.
+"""
+
+import gzip
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from . import bitmaps
+from .profiling import timed
+
+# Security-relevant actions, as shown in the audit log filter
+ACTIONS = (
+    'User Login',
+    'New Record Added',
+    'Records Imported',
+    'Permissions Changed',
+    'Password Reset Sent',
+    'Invites Sent',
+    'Settings Updated',
+    'Directory Sync Started',
+    'Backup Started',
+    'Restore Started',
+    'Security Scan',
+)
+
+# Action -> risk shown next to it; anything else is Low
+RISKS = {
+    'Permissions Changed': 'High',
+    'Restore Started': 'High',
+    'Settings Updated': 'Medium',
+    'Password Reset Sent': 'Medium',
+    'Directory Sync Started': 'Medium',
+    'Records Imported': 'Medium',
+}
+
+# Indexed event fields -> posting kind
+INDEXED_FIELDS = ('user', 'action')
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_AGE = 86400
+
+# Events per block, the unit that is compressed and read back
+BLOCK_EVENTS = 1024
+
+# Events the writer appends in one write
+WRITE_BATCH = 1000
+
+# Seconds between rollover checks while no events arrive
+IDLE_CHECK = 60
+
+# Compact JSON, so field values can be found in the raw lines
+SEPARATORS = (',', ':')
+
+SUFFIX = '.jsonl'
+COMPRESSED_SUFFIX = '.jsonl.gz'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_segments (
+    seq      INTEGER PRIMARY KEY,
+    first_ts REAL NOT NULL,
+    last_ts  REAL NOT NULL,
+    events   INTEGER NOT NULL,
+    bytes    INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_audit_segments_ts ON audit_segments (last_ts, first_ts);
+CREATE TABLE IF NOT EXISTS audit_blocks (
+    segment  INTEGER NOT NULL,
+    block    INTEGER NOT NULL,
+    offset   INTEGER NOT NULL,
+    length   INTEGER NOT NULL,
+    first_ts REAL NOT NULL,
+    last_ts  REAL NOT NULL,
+    PRIMARY KEY (segment, block)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS audit_postings (
+    kind    TEXT NOT NULL,
+    value   TEXT NOT NULL,
+    segment INTEGER NOT NULL,
+    blocks  BLOB NOT NULL,
+    PRIMARY KEY (kind, value, segment)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS audit_segments_no_update BEFORE UPDATE ON audit_segments BEGIN
+    SELECT RAISE(ABORT, 'audit log is append-only');
+END;
+CREATE TRIGGER IF NOT EXISTS audit_segments_no_delete BEFORE DELETE ON audit_segments BEGIN
+    SELECT RAISE(ABORT, 'audit log is append-only');
+END;
+"""
+
+_STOP = object()
+
+
+class SegmentIndex:
+    """Blocks and postings of one segment, built as its events are appended."""
+
+    def __init__(self, seq, path):
+        self.seq = seq
+        self.path = path
+        # [offset, length, first_ts, last_ts, events] per block
+        self.blocks = []
+        # kind -> value -> bitmap of block numbers
+        self.postings = {kind: {} for kind in INDEXED_FIELDS}
+        self.size = 0
+        self.events = 0
+        self.first_ts = None
+        self.last_ts = None
+
+    def add(self, event, nbytes):
+        """Account for ``event``, stored in the next ``nbytes`` of the file."""
+        if not self.blocks or self.blocks[-1][4] == BLOCK_EVENTS:
+            self.blocks.append([self.size, 0, event['ts'], event['ts'], 0])
+        block = self.blocks[-1]
+        block[1] += nbytes
+        block[3] = event['ts']
+        block[4] += 1
+        bit = 1 << (len(self.blocks) - 1)
+        for kind in INDEXED_FIELDS:
+            values = self.postings[kind]
+            values[event[kind]] = values.get(event[kind], 0) | bit
+        self.size += nbytes
+        self.events += 1
+        if self.first_ts is None:
+            self.first_ts = event['ts']
+        self.last_ts = event['ts']
+
+    def candidates(self, criteria, start, end):
+        """``(block, offset, length)`` of blocks that can hold matches."""
+        bits = (1 << len(self.blocks)) - 1
+        for kind, value in criteria.items():
+            bits &= self.postings[kind].get(value, 0)
+        return [(n, block[0], block[1]) for n, block in enumerate(self.blocks)
+                if bits >> n & 1 and block[3] >= start and block[2] < end]
+
+
+class AuditLog:
+    """Queues audit events and answers queries over every segment.
+
+    One AuditLog per process should own a directory: it is the only
+    writer of the segment files.
+    """
+
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.dropped = 0
+        self.last_error = None
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.directory / 'index.db'), check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._queue = queue.Queue()
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='audit-compress')
+        # Segments closed but not compressed yet, by seq
+        self._closing = {}
+        self._active = None
+        self._file = None
+        self._last_ts = 0.0
+        self._recover()
+        self._writer = threading.Thread(target=self._write_loop, name='audit-writer', daemon=True)
+        self._writer.start()
+
+    # Writing
+
+    def record(self, action, user, target='', detail='', ip='', ts=None):
+        """Queue one event; returns at once without touching the disk."""
+        self._queue.put({
+            'ts': time.time() if ts is None else ts,
+            'user': user,
+            'action': action,
+            'target': target,
+            'detail': detail,
+            'ip': ip,
+        })
+
+    def flush(self):
+        """Block until every queued event has been written."""
+        self._queue.join()
+
+    def shutdown(self):
+        self._queue.put(_STOP)
+        self._writer.join()
+        self._compressor.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+    def _write_loop(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=IDLE_CHECK)
+            except queue.Empty:
+                self._idle_roll()
+                continue
+            batch = [item]
+            while len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(event is _STOP for event in batch)
+            events = [event for event in batch if event is not _STOP]
+            try:
+                self._append(events)
+            except Exception as error:
+                # A failing disk must not kill the writer; count what was lost
+                self.dropped += len(events)
+                self.last_error = f"{type(error).__name__}: {error}"
+                self._resync()
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                with self._lock:
+                    if self._file is not None:
+                        self._file.close()
+                        self._file = None
+                return
+
+    @timed('audit.append')
+    def _append(self, events):
+        with self._lock:
+            lines = []
+            for event in events:
+                # Keep times non-decreasing so segments and blocks stay ordered
+                event['ts'] = self._last_ts = max(event['ts'], self._last_ts)
+                if self._should_roll(event['ts']):
+                    self._write_lines(lines)
+                    lines = []
+                    self._roll()
+                if self._active is None:
+                    self._open(self._next_seq())
+                line = (json.dumps(event, separators=SEPARATORS) + '\n').encode('utf-8')
+                lines.append(line)
+                self._active.add(event, len(line))
+            self._write_lines(lines)
+
+    def _write_lines(self, lines):
+        if lines:
+            self._file.write(b''.join(lines))
+            self._file.flush()
+
+    def _resync(self):
+        """Re-read the active segment after a failed write, so its index matches the file."""
+        with self._lock:
+            if self._active is None:
+                return
+            if self._file is not None:
+                self._file.close()
+            try:
+                self._active = _scan(self._active.seq, self._active.path)
+                self._file = open(self._active.path, 'ab')
+            except OSError:
+                # Start a new segment with the next event
+                self._active = self._file = None
+
+    def _should_roll(self, ts):
+        active = self._active
+        return active is not None and active.events and (
+            active.size >= self.max_bytes or ts - active.first_ts >= self.max_age)
+
+    def _idle_roll(self):
+        with self._lock:
+            if self._should_roll(time.time()):
+                self._roll()
+
+    def _open(self, seq):
+        self._active = SegmentIndex(seq, self.directory / f'{seq:08d}{SUFFIX}')
+        self._file = open(self._active.path, 'ab')
+
+    def _roll(self):
+        """Close the active segment and compress it in the background."""
+        self._file.close()
+        self._file = None
+        closed, self._active = self._active, None
+        self._closing[closed.seq] = closed
+        self._compressor.submit(self._compress, closed)
+
+    def _next_seq(self):
+        row = self._conn.execute("SELECT MAX(seq) FROM audit_segments").fetchone()
+        return max([row[0] or 0, *self._closing]) + 1
+
+    # Closing segments
+
+    def _compress(self, segment):
+        try:
+            self._close_segment(segment)
+        except Exception as error:
+            # The plain segment stays readable and is retried on restart
+            self.last_error = f"{type(error).__name__}: {error}"
+
+    @timed('audit.compress')
+    def _close_segment(self, segment):
+        """Rewrite ``segment`` as gzip blocks and add it to the sidecar index."""
+        target = self.directory / f'{segment.seq:08d}{COMPRESSED_SUFFIX}'
+        partial = target.with_name(target.name + '.partial')
+        blocks = []
+        with open(segment.path, 'rb') as source, open(partial, 'wb') as out:
+            for offset, length, first_ts, last_ts, _ in segment.blocks:
+                source.seek(offset)
+                data = gzip.compress(source.read(length), compresslevel=6)
+                blocks.append((segment.seq, len(blocks), out.tell(), len(data), first_ts, last_ts))
+                out.write(data)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(partial, target)
+        postings = [(kind, value, segment.seq, _to_blob(bits))
+                    for kind, values in segment.postings.items()
+                    for value, bits in values.items()]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # The segment row is the commit point: with it, the plain file is redundant
+                self._conn.executemany("INSERT OR REPLACE INTO audit_blocks VALUES (?, ?, ?, ?, ?, ?)",
+                                       blocks)
+                self._conn.executemany("INSERT OR REPLACE INTO audit_postings VALUES (?, ?, ?, ?)",
+                                       postings)
+                self._conn.execute("INSERT INTO audit_segments VALUES (?, ?, ?, ?, ?)",
+                                   (segment.seq, segment.first_ts, segment.last_ts,
+                                    segment.events, target.stat().st_size))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            del self._closing[segment.seq]
+        try:
+            # Queries already reading it hold their own file handle
+            segment.path.unlink()
+        except OSError:
+            pass
+
+    def _recover(self):
+        """Pick up after a restart: resume or close the plain segments left."""
+        closed = {row[0] for row in self._conn.execute("SELECT seq FROM audit_segments")}
+        plain = sorted(self.directory.glob(f'*{SUFFIX}'))
+        for path in self.directory.glob('*.partial'):
+            path.unlink()
+        for path in plain:
+            seq = int(path.name[:-len(SUFFIX)])
+            if seq in closed:
+                # Compressed and indexed before the plain file could be removed
+                path.unlink()
+                continue
+            segment = _scan(seq, path)
+            if segment.last_ts is not None:
+                self._last_ts = max(self._last_ts, segment.last_ts)
+            if self._active is not None:
+                self._closing[self._active.seq] = self._active
+                self._compressor.submit(self._compress, self._active)
+            self._active = segment
+            self._file = open(path, 'ab')
+        row = self._conn.execute("SELECT MAX(last_ts) FROM audit_segments").fetchone()
+        self._last_ts = max(self._last_ts, row[0] or 0.0)
+
+    # Queries
+
+    @timed('audit.query')
+    def query(self, user=None, action=None, start=None, end=None, limit=200):
+        """Matching events, newest first, as dicts (at most ``limit``).
+
+        ``start`` and ``end`` bound the event time (epoch seconds) as
+        ``[start, end)``; None leaves that side open.
+        """
+        events = []
+        for event in self.events(user, action, start, end):
+            events.append(event)
+            if limit is not None and len(events) >= limit:
+                break
+        return events
+
+    def events(self, user=None, action=None, start=None, end=None):
+        """Yield matching events newest first."""
+        criteria = {kind: value for kind, value in (('user', user), ('action', action))
+                    if value is not None}
+        start = float('-inf') if start is None else start
+        end = float('inf') if end is None else end
+        open_segments, closed = self._plan(criteria, start, end)
+        try:
+            # Open segments are newer than every closed one
+            for handle, blocks in open_segments:
+                for _, offset, length in reversed(blocks):
+                    handle.seek(offset)
+                    yield from _matches(handle.read(length), criteria, start, end)
+        finally:
+            for handle, _ in open_segments:
+                handle.close()
+        for seq, blocks in closed:
+            with open(self.directory / f'{seq:08d}{COMPRESSED_SUFFIX}', 'rb') as handle:
+                for offset, length in reversed(blocks):
+                    handle.seek(offset)
+                    yield from _matches(gzip.decompress(handle.read(length)), criteria, start, end)
+
+    def _plan(self, criteria, start, end):
+        """Blocks to read: from the open segments (with a handle) and the closed ones."""
+        with self._lock:
+            open_segments = []
+            for segment in sorted(self._open_segments(), key=lambda s: s.seq, reverse=True):
+                blocks = segment.candidates(criteria, start, end)
+                if blocks:
+                    # Opened now so a segment compressed meanwhile stays readable
+                    open_segments.append((open(segment.path, 'rb'), blocks))
+            segments = self._conn.execute(
+                "SELECT seq FROM audit_segments WHERE last_ts >= ? AND first_ts < ? "
+                "ORDER BY seq DESC", (start, end)).fetchall()
+            if not segments:
+                return open_segments, []
+            low, high = segments[-1][0], segments[0][0]
+            # Segment -> bitmap of candidate blocks, narrowed by each criterion
+            candidates = None
+            for kind, value in criteria.items():
+                found = {seq: int.from_bytes(blob, 'little') for seq, blob in self._conn.execute(
+                    "SELECT segment, blocks FROM audit_postings "
+                    "WHERE kind = ? AND value = ? AND segment BETWEEN ? AND ?",
+                    (kind, value, low, high))}
+                candidates = found if candidates is None else {
+                    seq: bits & found[seq] for seq, bits in candidates.items() if seq in found}
+            closed = []
+            for (seq,) in segments:
+                if candidates is not None and not candidates.get(seq):
+                    continue
+                members = None if candidates is None else bitmaps.Membership(candidates[seq])
+                blocks = [(offset, length) for block, offset, length in self._conn.execute(
+                    "SELECT block, offset, length FROM audit_blocks "
+                    "WHERE segment = ? AND last_ts >= ? AND first_ts < ? ORDER BY block",
+                    (seq, start, end)) if members is None or block in members]
+                if blocks:
+                    closed.append((seq, blocks))
+            return open_segments, closed
+
+    def _open_segments(self):
+        return [segment for segment in (*self._closing.values(), self._active)
+                if segment is not None and segment.events]
+
+    def stats(self):
+        """Totals for the admin page: events, segments and bytes on disk."""
+        with self._lock:
+            events, segments, size = self._conn.execute(
+                "SELECT COALESCE(SUM(events), 0), COUNT(*), COALESCE(SUM(bytes), 0) "
+                "FROM audit_segments").fetchone()
+            for segment in self._open_segments():
+                events += segment.events
+                segments += 1
+                size += segment.size
+        return {'events': events, 'segments': segments, 'bytes': size,
+                'queued': self._queue.qsize(), 'dropped': self.dropped}
+
+
+def risk_of(action):
+    return RISKS.get(action, 'Low')
+
+
+def _matches(data, criteria, start, end):
+    """Decode one block and yield its matching events, newest first."""
+    # Only lines containing every criterion as written are decoded
+    needles = [json.dumps({kind: value}, separators=SEPARATORS)[1:-1].encode('utf-8')
+               for kind, value in criteria.items()]
+    lines = _lines_with(data, needles[0]) if needles else data.splitlines()
+    for line in reversed(lines):
+        if not all(needle in line for needle in needles[1:]):
+            continue
+        event = json.loads(line)
+        if start <= event['ts'] < end and all(event[k] == v for k, v in criteria.items()):
+            yield event
+
+
+def _lines_with(data, needle):
+    """The lines of ``data`` containing ``needle``, found at C speed."""
+    lines = []
+    found = data.find(needle)
+    while found != -1:
+        start = data.rfind(b'\n', 0, found) + 1
+        end = data.find(b'\n', found)
+        lines.append(data[start:end])
+        found = data.find(needle, end)
+    return lines
+
+
+def _scan(seq, path):
+    """Rebuild the index of a plain segment, dropping a torn last line."""
+    segment = SegmentIndex(seq, path)
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                event = json.loads(line) if line.endswith(b'\n') else None
+            except ValueError:
+                event = None
+            if event is None:
+                break
+            segment.add(event, len(line))
+    if path.stat().st_size > segment.size:
+        os.truncate(path, segment.size)
+    return segment
+
+
+def _to_blob(bits):
+    return bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
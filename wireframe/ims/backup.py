@@ -0,0 +1,547 @@
+"""Full and incremental backups of the records database and attachments.
+
+A full backup is a page-level copy of the SQLite database taken with the
+online backup API, so writers are never blocked for long.  An
+incremental backup holds only the rows written since its parent, found
+by a column that grows with every write (``INCREMENTAL_KEYS``); tables
+with no such column are small and copied whole.  Tables derived from
+the others (search index, metrics, rollups) are left out and rebuilt on
+restore (see ``ims.restore``), and the transient work queues (outgoing
+mail, report jobs) are not backed up at all.
+
+Attachment blobs are content-addressed, so a backup only stores blobs
+that no earlier backup in its chain already holds.  Every file is
+streamed through gzip (or zstd when ``zstandard`` is installed) and its
+SHA-256 is recorded in the backup's ``manifest.json``.
+
+Each backup is written to ``<id>.partial`` and renamed when complete, so
+a crash never leaves something that looks like a usable backup.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+FULL, INCREMENTAL = 'full', 'incremental'
+
+# Tables copied incrementally -> column that grows with every write.
+# The key is assigned inside the writing transaction (an append-only id,
+# or a rev, see ``ims.revs``), so a row committed after a backup's read
+# always gets a key above that backup's cursor.  Rewritten rows replace
+# the earlier copy on restore.
+INCREMENTAL_KEYS = {
+    'records': 'rev',
+    'activity': 'id',
+    'attachments': 'id',
+    'blobs': 'rev',
+    'users': 'rev',
+    'blob_text': 'rev',
+    'directory_sync_runs': 'rev',
+}
+
+# Keys of backups whose manifest predates ``keys``; a cursor taken on a
+# different column than the current key is useless, so such tables are
+# copied whole once
+_LEGACY_KEYS = {'records': 'rev', 'activity': 'id', 'attachments': 'id',
+                'blobs': 'created', 'users': 'rev', 'blob_text': 'finished',
+                'directory_sync_runs': 'finished'}
+
+# Rebuilt from the other tables on restore
+DERIVED_TABLES = ('record_stats', 'record_timeline', 'activity_rollup', 'records_fts')
+
+# Work queues that only make sense to the running server; never backed up
+TRANSIENT_TABLES = ('outbox', 'report_jobs')
+
+# Incremental backups taken before the next full one
+MAX_CHAIN = 6
+
+SCHEDULES = ('Daily at 2:00 AM', 'Weekly on Sunday', 'Monthly on 1st', 'Manual Only')
+MANUAL = 'Manual Only'
+SCHEDULE_HOUR = 2
+
+COPY_CHUNK = 1024 * 1024
+ROW_CHUNK = 5000
+
+MANIFEST = 'manifest.json'
+
+
+class BackupError(Exception):
+    """Raised when a backup cannot be read or verified."""
+
+
+class BackupManager:
+    """Runs backups and restores in a background thread, and backups on schedule."""
+
+    def __init__(self, db_path, blob_root, out_dir):
+        self.db_path = str(db_path)
+        self.blob_root = blob_root
+        self.out_dir = out_dir
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='backup')
+        self._future = None
+        self._last_attempt = 0
+        self.last_error = None
+        self.last_restore = None
+        # Partial backups and restore staging are only left behind by a crash
+        for pattern in ('*.partial', 'restore-*'):
+            for path in self.out_dir.glob(pattern):
+                shutil.rmtree(path, ignore_errors=True)
+        self._stop = threading.Event()
+        self._scheduler = threading.Thread(target=self._schedule_loop,
+                                           name='backup-scheduler', daemon=True)
+        self._scheduler.start()
+
+    # Running backups
+
+    def run(self, include_files=True, compress=True, kind=None):
+        """Start a backup in the background.
+
+        ``kind`` forces FULL or INCREMENTAL; by default an incremental is
+        taken unless there is no full backup yet or the chain is long.
+        Returns False if a backup is already running.
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self._last_attempt = time.time()
+            self._future = self._executor.submit(
+                self._run, include_files, compress, kind)
+        return True
+
+    @property
+    def running(self):
+        return self._future is not None and not self._future.done()
+
+    def wait(self, timeout=None):
+        """Block until the current backup finishes and return its manifest."""
+        future = self._future
+        return future.result(timeout) if future is not None else None
+
+    def _run(self, include_files, compress, kind):
+        try:
+            manifest = create_backup(self.db_path, self.blob_root, self.out_dir,
+                                     include_files, compress, kind)
+        except Exception as error:
+            self.last_error = f"{type(error).__name__}: {error}"
+            raise
+        self.last_error = None
+        return manifest
+
+    def restore(self, backup_id, components):
+        """Start restoring ``components`` of ``backup_id`` in the background.
+
+        Shares the backup thread, so it never overlaps a backup.  Returns
+        False if a backup or restore is already running.
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self.last_restore = {'backup': backup_id, 'components': list(components),
+                                 'started': time.time()}
+            self._future = self._executor.submit(self._restore, backup_id, list(components))
+        return True
+
+    def _restore(self, backup_id, components):
+        from .restore import restore_backup
+
+        try:
+            summary = restore_backup(self.db_path, self.blob_root, self.out_dir,
+                                     backup_id, components)
+        except Exception as error:
+            self.last_restore['error'] = f"{type(error).__name__}: {error}"
+            raise
+        self.last_restore['summary'] = summary
+        return summary
+
+    def backups(self):
+        """Manifests of completed backups, newest first."""
+        return list_backups(self.out_dir)
+
+    def shutdown(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # Schedule
+
+    @property
+    def _schedule_path(self):
+        return self.out_dir / 'schedule.json'
+
+    def schedule(self):
+        """The saved schedule settings as a dict."""
+        try:
+            with open(self._schedule_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'schedule': MANUAL, 'include_files': True, 'compress': True,
+                    'since': time.time()}
+
+    def set_schedule(self, schedule, include_files=True, compress=True):
+        if schedule not in SCHEDULES:
+            raise ValueError(f"Unknown backup schedule: {schedule}")
+        current = self.schedule()
+        settings = {'schedule': schedule, 'include_files': include_files,
+                    'compress': compress, 'since': current['since']}
+        if settings == current:
+            return
+        if schedule != current['schedule']:
+            settings['since'] = time.time()
+        tmp = self._schedule_path.with_suffix('.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(settings, f)
+        os.replace(tmp, self._schedule_path)
+
+    def next_run(self):
+        """When the next scheduled backup is due, or None for manual only."""
+        settings = self.schedule()
+        backups = self.backups()
+        # A failed scheduled run is not retried until the next slot
+        last = max(settings['since'], self._last_attempt,
+                   backups[0]['created'] if backups else 0)
+        return next_run(settings['schedule'], datetime.fromtimestamp(last))
+
+    def _schedule_loop(self):
+        while not self._stop.wait(60):
+            due = self.next_run()
+            if due is not None and datetime.now() >= due:
+                settings = self.schedule()
+                self.run(settings['include_files'], settings['compress'])
+
+
+def next_run(schedule, after):
+    """First scheduled time strictly after ``after`` (a datetime)."""
+    if schedule == MANUAL:
+        return None
+    at = after.replace(hour=SCHEDULE_HOUR, minute=0, second=0, microsecond=0)
+    if schedule == 'Daily at 2:00 AM':
+        return at if at > after else at + timedelta(days=1)
+    if schedule == 'Weekly on Sunday':
+        at += timedelta(days=(6 - at.weekday()) % 7)
+        return at if at > after else at + timedelta(days=7)
+    if schedule == 'Monthly on 1st':
+        at = at.replace(day=1)
+        if at > after:
+            return at
+        return at.replace(year=at.year + at.month // 12, month=at.month % 12 + 1)
+    raise ValueError(f"Unknown backup schedule: {schedule}")
+
+
+# Backup engine
+
+def create_backup(db_path, blob_root, out_dir, include_files=True, compress=True,
+                  kind=None):
+    """Write one backup under ``out_dir`` and return its manifest."""
+    started = time.time()
+    chain = current_chain(out_dir)
+    if kind is None:
+        kind = INCREMENTAL if chain and len(chain) <= MAX_CHAIN else FULL
+    elif kind == INCREMENTAL and not chain:
+        kind = FULL
+    parent = chain[-1] if kind == INCREMENTAL else None
+
+    backup_id = f"{datetime.fromtimestamp(started):%Y%m%d-%H%M%S}-{kind}"
+    final = out_dir / backup_id
+    while final.exists():
+        backup_id += '_'
+        final = out_dir / backup_id
+    work = out_dir / f"{backup_id}.partial"
+    work.mkdir()
+    codec = best_codec() if compress else None
+    manifest = {
+        'id': backup_id,
+        'kind': kind,
+        'parent': parent['id'] if parent else None,
+        'created': started,
+        'codec': codec,
+        'include_files': include_files,
+        'files': {},
+        'blobs': [],
+        'tables': {},
+        'skipped_blobs': 0,
+    }
+    try:
+        if kind == FULL:
+            snapshot = work / 'database.sqlite'
+            _snapshot(db_path, snapshot)
+            source = sqlite3.connect(str(snapshot), isolation_level=None)
+            try:
+                # Zero the freed pages so the dropped rows are really gone
+                source.execute("PRAGMA secure_delete = ON")
+                for name in TRANSIENT_TABLES:
+                    source.execute(f"DROP TABLE IF EXISTS {name}")
+                manifest['keys'] = _keys(source)
+                manifest['cursors'] = _cursors(source, manifest['keys'])
+                manifest['tables'] = {name: _count(source, name)
+                                      for name in _tables(source)}
+                blobs = _blob_hashes(source) if include_files else []
+            finally:
+                source.close()
+            _store(manifest, work, snapshot, 'database.sqlite')
+            snapshot.unlink()
+        else:
+            source = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+            try:
+                # One read transaction so every table is from the same moment
+                source.execute("BEGIN")
+                manifest['keys'] = _keys(source)
+                manifest['cursors'] = _cursors(source, manifest['keys'])
+                parent_keys = parent.get('keys', _LEGACY_KEYS)
+                for name in _tables(source):
+                    key = manifest['keys'].get(name)
+                    if key is None or parent_keys.get(name) != key:
+                        rows = source.execute(f"SELECT * FROM {name}")
+                    else:
+                        rows = source.execute(
+                            f"SELECT * FROM {name} WHERE {key} > ? AND {key} <= ?",
+                            (parent['cursors'].get(name, 0), manifest['cursors'][name]))
+                    manifest['tables'][name] = _write_rows(manifest, work, name, rows,
+                                                           _schema(source, name))
+                blobs = _blob_hashes(source) if include_files else []
+                source.execute("COMMIT")
+            finally:
+                source.close()
+            held = set()
+            for backup in chain:
+                held.update(backup['blobs'])
+            manifest['skipped_blobs'] = len(held.intersection(blobs))
+            blobs = [sha for sha in blobs if sha not in held]
+
+        for sha256 in blobs:
+            path = blob_root / 'blobs' / sha256[:2] / sha256
+            if path.exists():
+                _store(manifest, work, path, f"blobs/{sha256}")
+                manifest['blobs'].append(sha256)
+
+        manifest['finished'] = time.time()
+        manifest['size'] = sum(f['size'] for f in manifest['files'].values())
+        with open(work / MANIFEST, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=1)
+        os.replace(work, final)
+    except BaseException:
+        shutil.rmtree(work, ignore_errors=True)
+        raise
+    return manifest
+
+
+def list_backups(out_dir):
+    """Manifests of completed backups under ``out_dir``, newest first."""
+    manifests = []
+    for path in out_dir.glob(f'*/{MANIFEST}'):
+        try:
+            with open(path, encoding='utf-8') as f:
+                manifests.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    manifests.sort(key=lambda m: m['created'], reverse=True)
+    return manifests
+
+
+def current_chain(out_dir):
+    """The latest full backup followed by its incrementals, oldest first."""
+    return backup_chain(out_dir, None)
+
+
+def backup_chain(out_dir, backup_id):
+    """Backups needed to restore ``backup_id`` (latest if None), oldest first."""
+    by_id = {m['id']: m for m in list_backups(out_dir)}
+    if not by_id:
+        return []
+    if backup_id is None:
+        backup_id = max(by_id.values(), key=lambda m: m['created'])['id']
+    chain = []
+    while backup_id is not None:
+        manifest = by_id.get(backup_id)
+        if manifest is None:
+            raise BackupError(f"Backup {backup_id} is missing from {out_dir}")
+        chain.append(manifest)
+        backup_id = manifest['parent']
+    chain.reverse()
+    return chain
+
+
+def best_codec():
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return 'gzip'
+    return 'zstd'
+
+
+CODEC_SUFFIXES = {None: '', 'gzip': '.gz', 'zstd': '.zst'}
+
+
+def open_compressed(path, mode, codec):
+    """Open ``path`` for streaming binary reads or writes through ``codec``."""
+    if codec is None:
+        return open(path, mode)
+    if codec == 'gzip':
+        return gzip.open(path, mode, compresslevel=6)
+    if codec == 'zstd':
+        import zstandard
+        if mode == 'wb':
+            return zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'))
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'))
+    raise BackupError(f"Unknown compression: {codec}")
+
+
+@contextmanager
+def open_verified(path, codec, sha256):
+    """Stream-decompress ``path``, checking the stored bytes against ``sha256``.
+
+    Yields a buffered binary stream (readable by line or by chunk).  The
+    checksum is computed over the stored bytes as they are read, so the
+    file is read once; BackupError is raised on exit if it does not match.
+    """
+    with open(path, 'rb') as raw:
+        reader = _HashingReader(raw)
+        try:
+            if codec is None:
+                yield io.BufferedReader(reader, COPY_CHUNK)
+            elif codec == 'gzip':
+                with gzip.GzipFile(fileobj=reader, mode='rb') as stream:
+                    yield stream
+            elif codec == 'zstd':
+                import zstandard
+                try:
+                    with zstandard.ZstdDecompressor().stream_reader(
+                            reader, closefd=False) as stream:
+                        yield io.BufferedReader(stream, COPY_CHUNK)
+                except zstandard.ZstdError as error:
+                    raise BackupError(f"Corrupt backup file {path}: {error}") from None
+            else:
+                raise BackupError(f"Unknown compression: {codec}")
+        except (gzip.BadGzipFile, EOFError, zlib.error) as error:
+            # Damage usually shows up in the decompressor before the checksum
+            raise BackupError(f"Corrupt backup file {path}: {error}") from None
+        # Hash anything the decompressor did not need to read
+        while reader.read(COPY_CHUNK):
+            pass
+    if reader.digest.hexdigest() != sha256:
+        raise BackupError(f"Checksum mismatch in {path}")
+
+
+class _HashingReader(io.RawIOBase):
+    def __init__(self, raw):
+        self._raw = raw
+        self.digest = hashlib.sha256()
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        count = self._raw.readinto(buffer)
+        self.digest.update(memoryview(buffer)[:count])
+        return count
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _snapshot(db_path, target):
+    source = sqlite3.connect(db_path, timeout=30)
+    dest = sqlite3.connect(str(target))
+    try:
+        # Copy a few hundred pages at a time so writers can get in between
+        source.backup(dest, pages=256, sleep=0.005)
+    finally:
+        dest.close()
+        source.close()
+
+
+def _store(manifest, work, path, name):
+    """Stream ``path`` into the backup as ``name`` and record its checksum."""
+    stored = name + CODEC_SUFFIXES[manifest['codec']]
+    target = work / stored
+    target.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'rb') as src, open_compressed(target, 'wb', manifest['codec']) as out:
+        shutil.copyfileobj(src, out, COPY_CHUNK)
+    manifest['files'][stored] = {'sha256': file_digest(target),
+                                 'size': target.stat().st_size}
+
+
+def _write_rows(manifest, work, table, cursor, schema):
+    """Write ``cursor`` as JSON lines (a header, then one array per row).
+
+    The header holds the column names and the statements that create the
+    table and its indexes, for tables the full snapshot does not have yet.
+    """
+    stored = f"tables/{table}.jsonl" + CODEC_SUFFIXES[manifest['codec']]
+    target = work / stored
+    target.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with open_compressed(target, 'wb', manifest['codec']) as out:
+        columns = [d[0] for d in cursor.description]
+        out.write(json.dumps({'columns': columns, 'schema': schema}).encode() + b'\n')
+        while True:
+            rows = cursor.fetchmany(ROW_CHUNK)
+            if not rows:
+                break
+            out.write(b''.join(json.dumps(list(row)).encode() + b'\n' for row in rows))
+            count += len(rows)
+    manifest['files'][stored] = {'sha256': file_digest(target),
+                                 'size': target.stat().st_size}
+    return count
+
+
+def _schema(conn, table):
+    return [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('table', 'index') "
+        "AND sql IS NOT NULL ORDER BY type = 'index'", (table,))]
+
+
+def _tables(conn):
+    names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' "
+        "AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+    return [name for name in names if name not in TRANSIENT_TABLES
+            and not any(name == d or name.startswith(d + '_') for d in DERIVED_TABLES)]
+
+
+def _keys(conn):
+    """``INCREMENTAL_KEYS`` for the tables in ``conn`` that have their key.
+
+    A table not yet given its key column by the store that owns it is
+    copied whole.
+    """
+    existing = set(_tables(conn))
+    keys = {}
+    for table, key in INCREMENTAL_KEYS.items():
+        if table in existing and key in _columns(conn, table):
+            keys[table] = key
+    return keys
+
+
+def _columns(conn, table):
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def _cursors(conn, keys):
+    return {table: conn.execute(
+                f"SELECT COALESCE(MAX({key}), 0) FROM {table}").fetchone()[0]
+            for table, key in keys.items()}
+
+
+def _count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def _blob_hashes(conn):
+    if 'blobs' not in _tables(conn):
+        return []
+    return [row[0] for row in conn.execute("SELECT sha256 FROM blobs")]
@@ -0,0 +1,177 @@
+"""In-memory bitmap indexes for low-cardinality record fields.
+
+Each distinct value of an indexed field owns a bitmap (a Python int used
+as a bit set) with bit ``n`` set when row ``n`` has that value.  Combining
+filters is then a bitwise AND, and per-value counts are popcounts, so
+neither needs to touch the rows themselves.
+"""
+
+import re
+
+_NONZERO = re.compile(rb'[^\x00]')
+_BYTE_BITS = tuple(tuple(i for i in range(8) if b >> i & 1) for b in range(256))
+
+
+class BitmapIndex:
+    """Value -> bitmap mapping for a fixed set of fields."""
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self._bitmaps = {field: {} for field in self.fields}
+        self.universe = 0
+
+    def apply(self, rows):
+        """Index ``rows`` of ``(rowid, value, value, ...)`` tuples.
+
+        Rows already in the index are re-indexed with their new values,
+        so the same call handles inserts, updates and bulk loads.  A
+        tuple value (a multi-valued field) sets the row under each item.
+        """
+        touched = None
+        pending = [{} for _ in self.fields]
+        for row in rows:
+            rowid = row[0]
+            if touched is None:
+                touched = _Pending(rowid)
+            touched.set(rowid)
+            for values, value in zip(pending, row[1:]):
+                for item in value if type(value) is tuple else (value,):
+                    bits = values.get(item)
+                    if bits is None:
+                        bits = values[item] = _Pending(rowid)
+                    bits.set(rowid)
+        if touched is None:
+            return
+        mask = touched.to_int()
+        for field, values in zip(self.fields, pending):
+            bitmaps = self._bitmaps[field]
+            if self.universe & mask:
+                for value in list(bitmaps):
+                    bitmaps[value] &= ~mask
+            for value, bits in values.items():
+                bitmaps[value] = bitmaps.get(value, 0) | bits.to_int()
+        self.universe |= mask
+
+    def remove(self, rowids):
+        mask = 0
+        for rowid in rowids:
+            mask |= 1 << rowid
+        for bitmaps in self._bitmaps.values():
+            for value in list(bitmaps):
+                bitmaps[value] &= ~mask
+        self.universe &= ~mask
+
+    def clear(self):
+        for bitmaps in self._bitmaps.values():
+            bitmaps.clear()
+        self.universe = 0
+
+    def lookup(self, field, value):
+        return self._bitmaps[field].get(value, 0)
+
+    def match(self, **criteria):
+        """AND together the bitmaps for ``field=value`` criteria.
+
+        ``None`` values are ignored, so unset filters match everything.
+        """
+        bits = self.universe
+        for field, value in criteria.items():
+            if value is not None:
+                bits &= self.lookup(field, value)
+        return bits
+
+    def counts(self, field, within=None):
+        """Rows per value of ``field``, optionally restricted to ``within``."""
+        result = {}
+        for value, bits in self._bitmaps[field].items():
+            if within is not None:
+                bits &= within
+            count = bits.bit_count()
+            if count:
+                result[value] = count
+        return result
+
+    def values(self, field):
+        return [value for value, bits in self._bitmaps[field].items() if bits]
+
+
+def from_rowids(rowids):
+    bits = bytearray()
+    for rowid in rowids:
+        _set_bit(bits, rowid)
+    return _to_int(bits)
+
+
+def iter_rowids(bits, start=0):
+    """Yield the set bits of ``bits`` at or after ``start`` in order.
+
+    Works on the byte representation so sparse bitmaps are skipped at C
+    speed instead of shifting a large integer once per result.
+    """
+    bits >>= start
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for match in _NONZERO.finditer(data):
+        offset = start + match.start() * 8
+        for bit in _BYTE_BITS[data[match.start()]]:
+            yield offset + bit
+
+
+def iter_rowids_reverse(bits, below=None):
+    """Yield the set bits of ``bits`` below ``below`` in descending order."""
+    if below is not None:
+        bits &= (1 << below) - 1
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')[::-1]
+    top = len(data) - 1
+    for match in _NONZERO.finditer(data):
+        offset = (top - match.start()) * 8
+        for bit in reversed(_BYTE_BITS[data[match.start()]]):
+            yield offset + bit
+
+
+class Membership:
+    """O(1) membership tests against a bitmap snapshot."""
+
+    def __init__(self, bits):
+        self._data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+
+    def __contains__(self, rowid):
+        index = rowid >> 3
+        return index < len(self._data) and bool(self._data[index] >> (rowid & 7) & 1)
+
+
+class _Pending:
+    """Bits set during one ``apply``, buffered from the first byte used.
+
+    A batch of new rows only touches the end of the table, so buffers
+    start at the batch's rows instead of at row 0.
+    """
+
+    __slots__ = ('start', 'buf')
+
+    def __init__(self, rowid):
+        self.start = rowid >> 3
+        self.buf = bytearray()
+
+    def set(self, rowid):
+        index = (rowid >> 3) - self.start
+        if index < 0:
+            self.buf[:0] = bytes(-index)
+            self.start += index
+            index = 0
+        if index >= len(self.buf):
+            self.buf.extend(bytes(index - len(self.buf) + 1))
+        self.buf[index] |= 1 << (rowid & 7)
+
+    def to_int(self):
+        return _to_int(self.buf) << (self.start * 8)
+
+
+def _set_bit(buf, rowid):
+    index = rowid >> 3
+    if index >= len(buf):
+        buf.extend(bytes(index - len(buf) + 1))
+    buf[index] |= 1 << (rowid & 7)
+
+
+def _to_int(buf):
+    return int.from_bytes(buf, 'little')
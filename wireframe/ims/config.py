@@ -0,0 +1,18 @@
+"""Filesystem locations used by the IMS back-end."""
+
+import os
+from pathlib import Path
+
+# Everything the app persists lives under one directory so it can be
+# relocated (or wiped) with a single environment variable.
+DATA_DIR = Path(os.environ.get(
+    'IMS_DATA_DIR',
+    Path(__file__).resolve().parent.parent / 'data'
+))
+
+
+def data_path(*parts):
+    """Return a path inside DATA_DIR, creating parent directories."""
+    path = DATA_DIR.joinpath(*parts)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return path
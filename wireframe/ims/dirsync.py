@@ -0,0 +1,467 @@
+"""Sync users from LDAP / Active Directory into the user directory.
+
+A sync reads person entries from a source (an LDIF export or a live LDAP
+server), maps each one to a user and hashes the mapped fields.  Only
+users whose hash differs from the one stored by the previous sync are
+written, in batches, so a run over an unchanged directory of 50k users
+reads every entry but rewrites none.
+
+Incremental syncs also ask the source only for entries modified since
+the newest modification time seen by the last successful run.  They
+cannot see deletions; a full sync deactivates users whose entries have
+gone from the source.
+"""
+
+import base64
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from . import revs
+from .reference import ROLES
+
+FULL, INCREMENTAL = 'full', 'incremental'
+
+_NEXT_REV = revs.next_rev('directory_sync_runs')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS directory_sync (
+    dn       TEXT PRIMARY KEY,
+    email    TEXT NOT NULL,
+    hash     TEXT NOT NULL,
+    modified TEXT NOT NULL DEFAULT ''
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS directory_sync_runs (
+    id          INTEGER PRIMARY KEY,
+    source      TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    started     REAL NOT NULL,
+    finished    REAL,
+    high_water  TEXT NOT NULL DEFAULT '',
+    seen        INTEGER NOT NULL DEFAULT 0,
+    added       INTEGER NOT NULL DEFAULT 0,
+    updated     INTEGER NOT NULL DEFAULT 0,
+    deactivated INTEGER NOT NULL DEFAULT 0,
+    error       TEXT,
+    rev         INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+# Users written per directory transaction
+DEFAULT_BATCH_SIZE = 1000
+
+# Attributes read from LDAP (lower case, as entries are keyed)
+ATTRIBUTES = ('mail', 'displayname', 'cn', 'givenname', 'sn', 'department', 'ou',
+              'employeetype', 'memberof', 'useraccountcontrol', 'nsaccountlock',
+              'lastlogontimestamp', 'modifytimestamp', 'whenchanged')
+
+# Person entries with an email address
+LDAP_FILTER = '(&(|(objectClass=person)(objectClass=user))(mail=*))'
+
+# Group CN -> role, for entries without an employeeType that is a role
+ROLE_GROUPS = {
+    'ims-administrators': 'Administrator',
+    'ims-managers': 'Manager',
+    'ims-users': 'User',
+    'ims-viewers': 'Viewer',
+}
+DEFAULT_ROLE = 'User'
+
+# userAccountControl flag for disabled accounts
+ACCOUNT_DISABLE = 0x2
+
+# Credentials for LDAP sources are only taken from the environment
+BIND_DN_ENV = 'IMS_LDAP_BIND_DN'
+PASSWORD_ENV = 'IMS_LDAP_PASSWORD'
+
+_FILETIME_EPOCH = datetime(1601, 1, 1, tzinfo=timezone.utc)
+_GROUP_CN = re.compile(r'^cn=([^,]+)', re.IGNORECASE)
+
+
+class SyncError(Exception):
+    """Raised when a source cannot be read."""
+
+
+class SyncResult:
+    """Totals for one sync run."""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.seen = 0
+        self.added = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deactivated = 0
+        self.skipped = 0
+        self.duration = 0.0
+
+    @property
+    def written(self):
+        return self.added + self.updated + self.deactivated
+
+
+class DirectorySync:
+    """Runs directory syncs in a background thread, one at a time."""
+
+    def __init__(self, db_path, directory):
+        self.db_path = str(db_path)
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='dirsync')
+        self._future = None
+        self.last_result = None
+        self.last_error = None
+
+    def run(self, location, base_dn='', kind=INCREMENTAL):
+        """Start syncing from ``location`` (an LDIF path or ldap[s]:// URL).
+
+        Returns False if a sync is already running.
+        """
+        with self._lock:
+            if self.running:
+                return False
+            self._future = self._executor.submit(self._run, location, base_dn, kind)
+        return True
+
+    @property
+    def running(self):
+        return self._future is not None and not self._future.done()
+
+    def wait(self, timeout=None):
+        """Block until the current sync finishes and return its result."""
+        future = self._future
+        return future.result(timeout) if future is not None else None
+
+    def _run(self, location, base_dn, kind):
+        try:
+            result = sync_directory(self.db_path, self.directory,
+                                    open_source(location, base_dn), kind)
+        except Exception as error:
+            self.last_error = f"{type(error).__name__}: {error}"
+            raise
+        self.last_error = None
+        self.last_result = result
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def sync_directory(db_path, directory, source, kind=INCREMENTAL,
+                   batch_size=DEFAULT_BATCH_SIZE):
+    """Bring ``directory`` in line with ``source`` and return a SyncResult.
+
+    An incremental sync falls back to a full one when this source has
+    never been synced successfully.
+    """
+    started = time.time()
+    conn = sqlite3.connect(str(db_path), isolation_level=None, timeout=30)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        revs.install(conn, 'directory_sync_runs')
+        since = None
+        if kind == INCREMENTAL:
+            row = conn.execute(
+                "SELECT high_water FROM directory_sync_runs WHERE source = ? "
+                "AND finished IS NOT NULL AND error IS NULL ORDER BY id DESC LIMIT 1",
+                (source.name,)).fetchone()
+            if row is None:
+                kind = FULL
+            else:
+                since = row[0] or None
+        run_id = conn.execute(
+            "INSERT INTO directory_sync_runs (source, kind, started, rev) "
+            f"VALUES (?, ?, ?, {_NEXT_REV})",
+            (source.name, kind, started)).lastrowid
+        result = SyncResult(kind)
+        try:
+            high_water = _apply(conn, directory, source, since, result, batch_size)
+        except Exception as error:
+            conn.execute("UPDATE directory_sync_runs SET finished = ?, error = ?, "
+                         f"rev = {_NEXT_REV} WHERE id = ?",
+                         (time.time(), f"{type(error).__name__}: {error}", run_id))
+            raise
+        result.duration = time.time() - started
+        conn.execute(
+            "UPDATE directory_sync_runs SET finished = ?, high_water = ?, seen = ?, "
+            f"added = ?, updated = ?, deactivated = ?, rev = {_NEXT_REV} WHERE id = ?",
+            (time.time(), high_water, result.seen, result.added, result.updated,
+             result.deactivated, run_id))
+    finally:
+        conn.close()
+    return result
+
+
+def _apply(conn, directory, source, since, result, batch_size):
+    known = {dn: (email, digest) for dn, email, digest in
+             conn.execute("SELECT dn, email, hash FROM directory_sync")}
+    seen = set()
+    # Emails of the entries synced so far, never deactivated by this run
+    claimed = set()
+    high_water = since or ''
+    users = []
+    retired = []
+    states = []
+
+    def flush():
+        directory.upsert_many(users, deactivate=retired)
+        _save_states(conn, states)
+        users.clear()
+        retired.clear()
+        states.clear()
+
+    for dn, entry in source.entries(since):
+        user = to_user(entry)
+        if user is None:
+            result.skipped += 1
+            continue
+        result.seen += 1
+        dn = dn.lower()
+        seen.add(dn)
+        claimed.add(user['Email'].lower())
+        modified = _generalized_time(entry)
+        high_water = max(high_water, modified)
+        digest = user_hash(user)
+        previous = known.get(dn)
+        if previous is not None and previous[1] == digest:
+            result.unchanged += 1
+            continue
+        if previous is None:
+            result.added += 1
+        else:
+            result.updated += 1
+            if previous[0].lower() not in claimed:
+                # The address changed: retire the user under the old one
+                retired.append(previous[0])
+        users.append(user)
+        states.append((dn, user['Email'], digest, modified))
+        if len(users) >= batch_size:
+            flush()
+    flush()
+
+    if since is None:
+        # Full sync: anything not in the source any more is deactivated
+        gone = [dn for dn in known if dn not in seen]
+        for start in range(0, len(gone), batch_size):
+            chunk = gone[start:start + batch_size]
+            directory.upsert_many((), deactivate=[
+                known[dn][0] for dn in chunk if known[dn][0].lower() not in claimed])
+            conn.executemany("DELETE FROM directory_sync WHERE dn = ?", ((dn,) for dn in chunk))
+            result.deactivated += len(chunk)
+    return high_water
+
+
+def _save_states(conn, states):
+    if not states:
+        return
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany("INSERT OR REPLACE INTO directory_sync VALUES (?, ?, ?, ?)", states)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def last_runs(db_path, limit=10):
+    """The newest sync runs as dicts."""
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    try:
+        conn.row_factory = sqlite3.Row
+        conn.executescript(SCHEMA)
+        revs.install(conn, 'directory_sync_runs')
+        return [dict(row) for row in conn.execute(
+            "SELECT * FROM directory_sync_runs ORDER BY id DESC LIMIT ?", (limit,))]
+    finally:
+        conn.close()
+
+
+# Mapping
+
+def to_user(entry):
+    """Map an entry (lower-case attribute -> list of values) to a user dict.
+
+    Returns None for entries without an email address.
+    """
+    email = _first(entry, 'mail')
+    if not email:
+        return None
+    name = (_first(entry, 'displayname') or _first(entry, 'cn')
+            or ' '.join(filter(None, (_first(entry, 'givenname'), _first(entry, 'sn'))))
+            or email)
+    return {
+        'Name': name,
+        'Email': email,
+        'Role': _role(entry),
+        'Department': _first(entry, 'department') or _first(entry, 'ou') or '',
+        'Last Login': _last_logon(_first(entry, 'lastlogontimestamp')),
+        'Status': 'Inactive' if _disabled(entry) else 'Active',
+    }
+
+
+def user_hash(user):
+    return hashlib.sha256(json.dumps(user, sort_keys=True).encode()).hexdigest()
+
+
+def _first(entry, attribute):
+    values = entry.get(attribute)
+    return values[0].strip() if values else None
+
+
+def _role(entry):
+    employee_type = _first(entry, 'employeetype')
+    if employee_type in ROLES:
+        return employee_type
+    for group in entry.get('memberof', ()):
+        match = _GROUP_CN.match(group)
+        if match and match.group(1).lower() in ROLE_GROUPS:
+            return ROLE_GROUPS[match.group(1).lower()]
+    return DEFAULT_ROLE
+
+
+def _disabled(entry):
+    control = _first(entry, 'useraccountcontrol')
+    if control and control.isdigit() and int(control) & ACCOUNT_DISABLE:
+        return True
+    return (_first(entry, 'nsaccountlock') or '').lower() == 'true'
+
+
+def _last_logon(filetime):
+    """AD lastLogonTimestamp (100 ns ticks since 1601) as 'YYYY-MM-DD HH:MM'."""
+    if not filetime or not filetime.isdigit() or int(filetime) == 0:
+        return None
+    stamp = _FILETIME_EPOCH + timedelta(microseconds=int(filetime) // 10)
+    return stamp.strftime('%Y-%m-%d %H:%M')
+
+
+def _generalized_time(entry):
+    """modifyTimestamp / whenChanged as 'YYYYMMDDHHMMSS' ('' if absent)."""
+    value = _first(entry, 'modifytimestamp') or _first(entry, 'whenchanged') or ''
+    digits = value[:14]
+    return digits if len(digits) == 14 and digits.isdigit() else ''
+
+
+# Sources
+
+def open_source(location, base_dn=''):
+    """A source for an ``ldap://``/``ldaps://`` URL or an LDIF file path."""
+    if location.lower().startswith(('ldap://', 'ldaps://')):
+        return LdapSource(location, base_dn, os.environ.get(BIND_DN_ENV),
+                          os.environ.get(PASSWORD_ENV))
+    return LdifSource(location)
+
+
+class LdifSource:
+    """Entries of an LDIF content file (e.g. from ``ldifde`` or ``slapcat``)."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.name = f"ldif:{os.path.abspath(self.path)}"
+
+    def entries(self, since=None):
+        """Yield ``(dn, entry)`` pairs, only those modified at/after ``since``."""
+        try:
+            f = open(self.path, encoding='utf-8')
+        except OSError as error:
+            raise SyncError(f"Cannot read {self.path}: {error.strerror}") from None
+        with f:
+            for dn, entry in _parse_ldif(f):
+                if since and _generalized_time(entry) < since:
+                    continue
+                yield dn, entry
+
+
+def _parse_ldif(lines):
+    dn = None
+    entry = {}
+    logical = None
+    for raw in lines:
+        line = raw.rstrip('\r\n')
+        if line.startswith(' ') and logical is not None:
+            logical += line[1:]  # folded continuation line
+            continue
+        if logical is not None:
+            dn, entry = _add_attribute(dn, entry, logical)
+        logical = None
+        if not line:
+            if dn is not None:
+                yield dn, entry
+            dn, entry = None, {}
+        elif not line.startswith('#'):
+            logical = line
+    if logical is not None:
+        dn, entry = _add_attribute(dn, entry, logical)
+    if dn is not None:
+        yield dn, entry
+
+
+def _add_attribute(dn, entry, line):
+    name, sep, value = line.partition(':')
+    if not sep:
+        raise SyncError(f"Malformed LDIF line: {line[:80]!r}")
+    if value.startswith(':'):
+        value = base64.b64decode(value[1:].strip()).decode('utf-8')
+    else:
+        value = value.strip()
+    name = name.lower()
+    if name == 'dn':
+        return value, entry
+    if name != 'version':
+        entry.setdefault(name, []).append(value)
+    return dn, entry
+
+
+class LdapSource:
+    """Person entries of an LDAP server, read with paged searches.
+
+    Needs the optional ``ldap3`` package.
+    """
+
+    PAGE_SIZE = 1000
+
+    def __init__(self, url, base_dn, bind_dn=None, password=None, search_filter=LDAP_FILTER):
+        self.url = url
+        self.base_dn = base_dn
+        self.bind_dn = bind_dn
+        self.password = password
+        self.search_filter = search_filter
+        self.name = f"{url}/{base_dn}"
+
+    def entries(self, since=None):
+        try:
+            import ldap3
+            from ldap3.core.exceptions import LDAPException
+        except ImportError:
+            raise SyncError("LDAP sync requires the 'ldap3' package") from None
+        search_filter = self.search_filter
+        if since:
+            changed = f"(|(modifyTimestamp>={since}.0Z)(whenChanged>={since}.0Z))"
+            search_filter = f"(&{search_filter}{changed})"
+        try:
+            conn = ldap3.Connection(ldap3.Server(self.url), self.bind_dn, self.password,
+                                    auto_bind=True, read_only=True)
+        except LDAPException as error:
+            raise SyncError(f"Cannot bind to {self.url}: {error}") from None
+        try:
+            results = conn.extend.standard.paged_search(
+                self.base_dn, search_filter, attributes=list(ATTRIBUTES),
+                paged_size=self.PAGE_SIZE, generator=True)
+            for item in results:
+                if item.get('type') != 'searchResEntry':
+                    continue
+                entry = {name.lower(): [_text(v) for v in values]
+                         for name, values in item['raw_attributes'].items()}
+                yield item['dn'], entry
+        finally:
+            conn.unbind()
+
+
+def _text(value):
+    return value.decode('utf-8', 'replace') if isinstance(value, bytes) else str(value)
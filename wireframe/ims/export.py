@@ -0,0 +1,124 @@
+"""Streaming exporters for tabular data.
+
+Rows arrive as an iterable of chunks (lists of dicts) and each chunk is
+written out before the next is read, so an export holds one chunk in
+memory whatever the total row count.  Output goes to a temporary file
+under ``DATA_DIR/exports`` that the caller hands to a download button.
+"""
+
+import csv
+import json
+import os
+import tempfile
+import time
+
+from .config import DATA_DIR
+
+# Format -> (file extension, MIME type)
+FORMATS = {
+    'CSV': ('.csv', 'text/csv'),
+    'JSON Lines': ('.jsonl', 'application/x-ndjson'),
+    'Parquet': ('.parquet', 'application/vnd.apache.parquet'),
+    'Excel (XLSX)': ('.xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+EXPORT_DIR = DATA_DIR / 'exports'
+
+# Exports older than this are removed when a new one is written
+MAX_AGE = 3600
+
+
+class ExportError(Exception):
+    """Raised when a format cannot be written (e.g. missing library)."""
+
+
+def export(chunks, columns, fmt, prefix='export'):
+    """Write ``chunks`` in ``fmt`` to a new temporary file and return its path."""
+    if fmt not in FORMATS:
+        raise ExportError(f"Unknown export format: {fmt}")
+    EXPORT_DIR.mkdir(parents=True, exist_ok=True)
+    _remove_stale()
+    suffix = FORMATS[fmt][0]
+    with tempfile.NamedTemporaryFile(dir=EXPORT_DIR, prefix=f'{prefix}-',
+                                     suffix=suffix, delete=False) as tmp:
+        path = tmp.name
+    try:
+        WRITERS[fmt](path, chunks, list(columns))
+    except BaseException:
+        _unlink(path)
+        raise
+    return path
+
+
+def _write_csv(path, chunks, columns):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        for chunk in chunks:
+            writer.writerows(chunk)
+
+
+def _write_jsonl(path, chunks, columns):
+    with open(path, 'w', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.writelines(
+                json.dumps({c: row.get(c) for c in columns}, default=str) + '\n'
+                for row in chunk)
+
+
+def _write_parquet(path, chunks, columns):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportError("Parquet export requires the 'pyarrow' package") from None
+    schema = pa.schema([(c, pa.string()) for c in columns])
+    with pq.ParquetWriter(path, schema) as writer:
+        for chunk in chunks:
+            arrays = [pa.array([_text(row.get(c)) for row in chunk], pa.string())
+                      for c in columns]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+def _write_xlsx(path, chunks, columns):
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise ExportError("Excel export requires the 'openpyxl' package") from None
+    # Write-only mode streams rows to disk instead of building the sheet in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(columns)
+    for chunk in chunks:
+        for row in chunk:
+            sheet.append([row.get(c) for c in columns])
+    workbook.save(path)
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _remove_stale():
+    cutoff = time.time() - MAX_AGE
+    for path in EXPORT_DIR.iterdir():
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+        except OSError:
+            pass
+
+
+def _unlink(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+WRITERS = {
+    'CSV': _write_csv,
+    'JSON Lines': _write_jsonl,
+    'Parquet': _write_parquet,
+    'Excel (XLSX)': _write_xlsx,
+}
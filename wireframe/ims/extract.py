@@ -0,0 +1,388 @@
+"""Background text extraction and thumbnails for attachments.
+
+After an upload the blob's SHA-256 is put on a bounded queue; consumer
+threads hand each blob to a pool of worker processes that pull out its
+text (PDF, DOCX, XLSX) or render a thumbnail (PNG, JPEG).  The text is
+written to ``blob_text`` and copied into the ``attachments`` column of
+the search index for every record linking to the blob, so saving a
+record never waits on a large file.
+
+Work is tracked per unique blob: a file attached to many records is
+extracted once.  Failed jobs are retried with backoff, and each job's
+run time is stored so ``stats()`` can report throughput.  A job that
+runs past the timeout cannot be cancelled, so its worker processes are
+killed and the pool replaced; workers report their pids when they
+start so the server knows which processes to kill.
+"""
+
+import html
+import multiprocessing
+import os
+import queue
+import re
+import signal
+import sqlite3
+import threading
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from . import revs
+
+PENDING, DONE, FAILED = 'Pending', 'Done', 'Failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blob_text (
+    sha256    TEXT PRIMARY KEY,
+    status    TEXT NOT NULL,
+    attempts  INTEGER NOT NULL DEFAULT 0,
+    text      TEXT NOT NULL DEFAULT '',
+    thumbnail INTEGER NOT NULL DEFAULT 0,
+    error     TEXT,
+    duration  REAL,
+    finished  REAL,
+    rev       INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_blob_text_status ON blob_text (status);
+"""
+
+_NEXT_REV = revs.next_rev('blob_text')
+
+# Extracted text is truncated to this many characters per blob
+MAX_TEXT = 200_000
+
+THUMB_SIZE = (256, 256)
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 256
+MAX_ATTEMPTS = 3
+
+# Seconds a single job may run before it counts as a failed attempt
+JOB_TIMEOUT = 120
+
+# Combined text of a record's extracted attachments
+_RECORD_TEXT = """
+UPDATE records_fts SET attachments = (
+    SELECT IFNULL(group_concat(t.text, ' '), '')
+    FROM attachments a JOIN blob_text t USING (sha256)
+    WHERE a.record_id = :record_id AND t.status = 'Done'
+)
+WHERE rowid = (SELECT seq FROM records WHERE id = :record_id)
+"""
+
+
+class Unsupported(Exception):
+    """Raised by a worker when a file cannot be handled; not retried."""
+
+
+class ExtractionPool:
+    """Bounded queue of blobs feeding a process pool of extractors."""
+
+    def __init__(self, db_path, attachments, workers=DEFAULT_WORKERS,
+                 queue_size=DEFAULT_QUEUE_SIZE, max_attempts=MAX_ATTEMPTS,
+                 timeout=JOB_TIMEOUT):
+        self.attachments = attachments
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self._thumbs = attachments.root / 'thumbs'
+        self._thumbs.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        revs.install(self._conn, 'blob_text')
+        self._queue = queue.Queue(maxsize=queue_size)
+        # Blobs on the queue or being worked on, to avoid queueing twice
+        self._queued = set()
+        # Failed blobs waiting out their retry backoff
+        self._backoff = set()
+        self._stop = threading.Event()
+        self._workers = workers
+        # Pool -> queue its workers put their pids on
+        self._pids = {}
+        self._pool = self._new_pool()
+        self._threads = [
+            threading.Thread(target=self._run, name=f'extract-{n}', daemon=True)
+            for n in range(workers)]
+        for thread in self._threads:
+            thread.start()
+        # Blobs left pending by a previous server process
+        self.requeue_pending()
+
+    def thumbnail_path(self, sha256):
+        return self._thumbs / f'{sha256}.png'
+
+    def submit(self, sha256):
+        """Queue ``sha256`` for extraction.
+
+        Returns False if the queue is full; the blob stays pending and is
+        picked up once the queue drains.  A blob that was already
+        extracted is only re-indexed for the records now linking to it.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO blob_text (sha256, status, rev) "
+                f"VALUES (?, ?, {_NEXT_REV})",
+                (sha256, PENDING))
+            status = self._conn.execute(
+                "SELECT status FROM blob_text WHERE sha256 = ?", (sha256,)).fetchone()[0]
+            if status == DONE:
+                self._reindex(sha256)
+                return True
+            if status == FAILED or sha256 in self._queued or sha256 in self._backoff:
+                return True
+            try:
+                self._queue.put_nowait(sha256)
+            except queue.Full:
+                return False
+            self._queued.add(sha256)
+        return True
+
+    def requeue_pending(self):
+        """Put pending blobs back on the queue, as many as fit."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT sha256 FROM blob_text WHERE status = ?",
+                (PENDING,)).fetchall()
+            for (sha256,) in rows:
+                if sha256 in self._queued or sha256 in self._backoff:
+                    continue
+                try:
+                    self._queue.put_nowait(sha256)
+                except queue.Full:
+                    break
+                self._queued.add(sha256)
+
+    def status(self, sha256):
+        """The ``blob_text`` row for ``sha256`` as a dict (without the text), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT sha256, status, attempts, thumbnail, error, duration, finished "
+                "FROM blob_text WHERE sha256 = ?", (sha256,)).fetchone()
+        return dict(row) if row else None
+
+    def stats(self):
+        """Queue depth plus job counts and timings by status."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*), AVG(duration), MAX(duration) "
+                "FROM blob_text GROUP BY status").fetchall()
+        result = {'queued': self._queue.qsize()}
+        for status, count, mean, longest in rows:
+            result[status.lower()] = {'count': count, 'avg_seconds': mean,
+                                      'max_seconds': longest}
+        return result
+
+    def shutdown(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _new_pool(self):
+        # Spawn, not fork: the server process is multi-threaded
+        context = multiprocessing.get_context('spawn')
+        pids = context.SimpleQueue()
+        pool = ProcessPoolExecutor(max_workers=self._workers, mp_context=context,
+                                   initializer=_report_pid, initargs=(pids,))
+        self._pids[pool] = pids
+        return pool
+
+    def _recycle(self, pool):
+        """Kill ``pool``'s workers and start a new pool; False if already replaced."""
+        with self._lock:
+            if self._pool is not pool or self._stop.is_set():
+                return False
+            self._pool = self._new_pool()
+        # Jobs still running on the old pool fail with BrokenProcessPool and
+        # are run again on the new one (see _process).  A worker reports its
+        # pid before taking any job, so every busy worker is on the queue
+        pids = self._pids.pop(pool)
+        while not pids.empty():
+            try:
+                os.kill(pids.get(), signal.SIGTERM)
+            except OSError:
+                pass  # already gone
+        pids.close()
+        pool.shutdown(wait=False, cancel_futures=True)
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                sha256 = self._queue.get(timeout=5)
+            except queue.Empty:
+                # Pick up anything that did not fit when it was submitted
+                self.requeue_pending()
+                continue
+            started = time.perf_counter()
+            try:
+                self._process(sha256)
+            except Exception as error:
+                # Keep the thread alive for the next blob whatever went wrong
+                try:
+                    self._failed(sha256, error, time.perf_counter() - started)
+                except Exception:
+                    pass  # still Pending, so requeue_pending picks it up again
+            finally:
+                with self._lock:
+                    self._queued.discard(sha256)
+                self._queue.task_done()
+
+    def _process(self, sha256):
+        started = time.perf_counter()
+        while True:
+            pool = self._pool
+            try:
+                future = pool.submit(extract_blob, str(self.attachments.blob_path(sha256)),
+                                     str(self.thumbnail_path(sha256)))
+                text, thumbnail = future.result(timeout=self.timeout)
+                break
+            except FutureTimeout:
+                self._recycle(pool)
+                failure = TimeoutError(f"extraction took over {self.timeout}s")
+            except BrokenProcessPool as error:
+                # A worker died.  If another job's timeout already replaced
+                # the pool, this blob was not to blame: run it again
+                if not self._recycle(pool) and not self._stop.is_set():
+                    continue
+                failure = error
+            except Exception as error:
+                failure = error
+            self._failed(sha256, failure, time.perf_counter() - started)
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute(
+                    "UPDATE blob_text SET status = ?, attempts = attempts + 1, text = ?, "
+                    f"thumbnail = ?, error = NULL, duration = ?, finished = ?, rev = {_NEXT_REV} "
+                    "WHERE sha256 = ?",
+                    (DONE, text, int(thumbnail), time.perf_counter() - started,
+                     time.time(), sha256))
+                self._reindex(sha256)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _failed(self, sha256, error, duration):
+        with self._lock:
+            attempts = self._conn.execute(
+                "UPDATE blob_text SET attempts = attempts + 1, error = ?, duration = ?, "
+                f"finished = ?, rev = {_NEXT_REV} WHERE sha256 = ? RETURNING attempts",
+                (f"{type(error).__name__}: {error}", duration, time.time(),
+                 sha256)).fetchone()[0]
+            if isinstance(error, Unsupported) or attempts >= self.max_attempts:
+                self._conn.execute(
+                    f"UPDATE blob_text SET status = ?, rev = {_NEXT_REV} WHERE sha256 = ?",
+                    (FAILED, sha256))
+                return
+            # Still pending; held back from requeue_pending until the retry
+            self._backoff.add(sha256)
+        timer = threading.Timer(2 ** attempts, self._retry, (sha256,))
+        timer.daemon = True
+        timer.start()
+
+    def _retry(self, sha256):
+        with self._lock:
+            self._backoff.discard(sha256)
+        self.submit(sha256)
+
+    def _reindex(self, sha256):
+        # Caller holds the lock
+        record_ids = self._conn.execute(
+            "SELECT DISTINCT record_id FROM attachments WHERE sha256 = ?", (sha256,)).fetchall()
+        for (record_id,) in record_ids:
+            self._conn.execute(_RECORD_TEXT, {'record_id': record_id})
+
+
+def reindex_all(conn):
+    """Fill the search index's ``attachments`` column for every record."""
+    conn.execute(
+        "UPDATE records_fts SET attachments = ("
+        "SELECT IFNULL(group_concat(t.text, ' '), '') "
+        "FROM records r JOIN attachments a ON a.record_id = r.id "
+        "JOIN blob_text t USING (sha256) "
+        "WHERE r.seq = records_fts.rowid AND t.status = 'Done')")
+
+
+# Worker side (runs in the pool processes)
+
+def _report_pid(pids):
+    """Pool initializer: tell the server which process this worker is."""
+    pids.put(os.getpid())
+
+
+def extract_blob(path, thumb_path):
+    """Return ``(text, made_thumbnail)`` for the file at ``path``.
+
+    The file type is detected from its first bytes rather than its name.
+    Types with no extractor (e.g. legacy .doc/.xls) give empty text.
+    """
+    with open(path, 'rb') as f:
+        head = f.read(8)
+    if head.startswith(b'%PDF'):
+        return _pdf_text(path), False
+    if head.startswith(b'PK'):
+        return _office_text(path), False
+    if head.startswith(b'\x89PNG') or head.startswith(b'\xff\xd8'):
+        return '', _thumbnail(path, thumb_path)
+    return '', False
+
+
+def _pdf_text(path):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise Unsupported("PDF text extraction requires the 'pypdf' package") from None
+    parts = []
+    size = 0
+    for page in PdfReader(path).pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        size += len(text)
+        # Long documents stop once there is enough text to index
+        if size >= MAX_TEXT:
+            break
+    return _clean(' '.join(parts))
+
+
+# Text runs in word/document.xml and cells in xl/sharedStrings.xml
+_OFFICE_PARTS = (
+    ('word/document.xml', re.compile(r'<w:t(?:\s[^>]*)?>([^<]*)</w:t>')),
+    ('xl/sharedStrings.xml', re.compile(r'<t(?:\s[^>]*)?>([^<]*)</t>')),
+)
+
+
+def _office_text(path):
+    try:
+        archive = zipfile.ZipFile(path)
+    except zipfile.BadZipFile:
+        raise Unsupported("not a valid DOCX/XLSX file") from None
+    with archive:
+        names = set(archive.namelist())
+        for name, pattern in _OFFICE_PARTS:
+            if name in names:
+                xml = archive.read(name).decode('utf-8', errors='replace')
+                return _clean(' '.join(html.unescape(t) for t in pattern.findall(xml)))
+    return ''
+
+
+def _thumbnail(path, thumb_path):
+    try:
+        from PIL import Image
+    except ImportError:
+        raise Unsupported("thumbnails require the 'Pillow' package") from None
+    with Image.open(path) as image:
+        image.thumbnail(THUMB_SIZE)
+        if image.mode not in ('RGB', 'RGBA', 'L'):
+            image = image.convert('RGB')
+        image.save(thumb_path, 'PNG')
+    return True
+
+
+def _clean(text):
+    return ' '.join(text.split())[:MAX_TEXT]
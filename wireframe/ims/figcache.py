@@ -0,0 +1,91 @@
+"""LRU cache for built Plotly charts.
+
+Charts are keyed by chart name, the version of the data they were built
+from and any chart parameters.  A miss builds the figure and serializes
+it once into a standalone page that draws the spec with plotly.js; the
+cache keeps only that page, so a rerun that does not change the data
+neither builds nor serializes anything (``st.plotly_chart`` would
+validate and re-serialize the figure on every rerun).  Entries are
+sized by their serialized page and evicted least-recently-used first
+once the cache exceeds its byte budget.
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+
+from .profiling import timer
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# Plotly's own figure height, for charts that do not set one
+DEFAULT_HEIGHT = 450
+
+# A serialized chart: an HTML page holding the figure spec, and its height
+Chart = namedtuple('Chart', 'html height')
+
+
+class FigureCache:
+    """Thread-safe, byte-bounded LRU mapping of chart keys to serialized charts."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, name, version, build, **params):
+        """Return the cached Chart for ``name``/``version``/``params``.
+
+        ``build(**params)`` returns a Plotly figure and is only called on
+        a miss.  Older versions of the same chart are dropped when a new
+        one is stored.
+        """
+        key = (name, version, tuple(sorted(params.items())))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        with timer(f'chart.{name}'):
+            chart = serialize(build(**params))
+        nbytes = len(chart.html)
+        with self._lock:
+            for stale in [k for k in self._entries if k[0] == name and k[2] == key[2]]:
+                self._discard(stale)
+            if nbytes <= self.max_bytes:
+                self._entries[key] = (chart, nbytes)
+                self.size += nbytes
+                while self.size > self.max_bytes:
+                    self._discard(next(iter(self._entries)))
+        return chart
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _discard(self, key):
+        _, nbytes = self._entries.pop(key)
+        self.size -= nbytes
+
+
+def serialize(figure):
+    """``figure`` as a Chart drawn by plotly.js in the browser."""
+    height = figure.layout.height or DEFAULT_HEIGHT
+    html = figure.to_html(include_plotlyjs='cdn', full_html=True,
+                          default_height=f'{height}px',
+                          config={'displaylogo': False, 'responsive': True})
+    return Chart(html, height)
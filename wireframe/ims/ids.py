@@ -0,0 +1,71 @@
+"""Record ID allocation.
+
+The shared ``sequences`` table hands out blocks of numbers; each process
+keeps its current block in memory and serves IDs from it without going
+back to the database.  Taking the next number from a block is a single
+``next()`` on a range iterator, which is atomic under the GIL, so
+sessions only contend on a lock when a block runs out.
+
+A record stored under an explicit ID (an import, or a number typed in)
+can land inside a block another caller is still serving from.  The
+store reports such numbers with ``skip`` and they are passed over.
+"""
+
+import threading
+
+DEFAULT_BLOCK_SIZE = 100
+
+
+class IdAllocator:
+    """Per-process cache of reserved ID numbers.
+
+    ``reserve(count)`` must atomically take ``count`` numbers off the
+    shared sequence and return them as ``(start, stop)``; ``formatter``
+    turns a number into an ID string.
+    """
+
+    def __init__(self, reserve, formatter, block_size=DEFAULT_BLOCK_SIZE):
+        self._reserve = reserve
+        self._format = formatter
+        self.block_size = block_size
+        self._block = iter(())
+        self._span = range(0)
+        # Numbers of the current block already stored under explicit IDs
+        self._taken = frozenset()
+        self._refill_lock = threading.Lock()
+
+    def allocate(self):
+        """Return one unused ID."""
+        while True:
+            block = self._block
+            try:
+                number = next(block)
+            except StopIteration:
+                with self._refill_lock:
+                    # Another thread may have refilled while we waited
+                    if self._block is block:
+                        self._span = range(*self._reserve(self.block_size))
+                        self._taken = frozenset()
+                        self._block = iter(self._span)
+                continue
+            if number not in self._taken:
+                return self._format(number)
+
+    def skip(self, numbers):
+        """Never hand out ``numbers``: they are stored under explicit IDs."""
+        with self._refill_lock:
+            span = self._span
+            taken = {n for n in numbers if n in span}
+            if taken:
+                self._taken = self._taken | taken
+
+    @property
+    def span(self):
+        """The numbers of the block currently served from (possibly used up)."""
+        return self._span
+
+    def allocate_many(self, count):
+        """Return ``count`` unused IDs, reserving a dedicated block for large batches."""
+        if count >= self.block_size:
+            return [self._format(n) for n in range(*self._reserve(count))]
+        return [self.allocate() for _ in range(count)]
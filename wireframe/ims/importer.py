@@ -0,0 +1,253 @@
+"""Bulk record import from CSV, Excel or JSON Lines files.
+
+Input is read in batches; each batch is validated with vectorised pandas
+operations, rows that fail are appended to a rejected-rows CSV with the
+reason, and the valid rows are inserted in one transaction with their
+IDs allocated as a block.  Memory use is bounded by the batch size.
+
+Command line use (from the ``wireframe`` directory)::
+
+    python -m ims.importer legacy_records.csv
+"""
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from .config import DATA_DIR
+from .reference import PRIORITIES, RECORD_STATUSES as STATUSES
+
+# Import format -> file extensions
+FORMATS = {
+    'CSV': ('.csv',),
+    'Excel (XLSX)': ('.xlsx',),
+    'JSON Lines': ('.jsonl', '.ndjson'),
+}
+
+# Defaults for optional columns left blank
+DEFAULTS = {
+    'Priority': 'Medium',
+    'Status': 'Draft',
+    'Description': '',
+    'Tags': '',
+    'Department': '',
+}
+
+COLUMNS = ('ID', 'Name', 'Category', 'Created', 'Modified', 'Status',
+           'Priority', 'Assigned', 'Description', 'Tags', 'Department')
+
+DEFAULT_BATCH_SIZE = 5000
+
+IMPORT_DIR = DATA_DIR / 'imports'
+
+
+class ImportResult:
+    """Totals for one import run."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.rejected = 0
+        self.rejected_path = None
+
+    @property
+    def total(self):
+        return self.inserted + self.rejected
+
+
+def detect_format(filename):
+    suffix = Path(filename).suffix.lower()
+    for fmt, extensions in FORMATS.items():
+        if suffix in extensions:
+            return fmt
+    raise ValueError(f"Unsupported import file type: {suffix or filename}")
+
+
+def read_batches(source, fmt, batch_size=DEFAULT_BATCH_SIZE):
+    """Yield DataFrames of at most ``batch_size`` rows from ``source``.
+
+    ``source`` is a path or a binary file object.
+    """
+    if fmt == 'CSV':
+        yield from pd.read_csv(source, chunksize=batch_size, dtype=str,
+                               keep_default_na=False)
+    elif fmt == 'JSON Lines':
+        yield from pd.read_json(source, lines=True, chunksize=batch_size,
+                                dtype=False)
+    elif fmt == 'Excel (XLSX)':
+        yield from _read_xlsx(source, batch_size)
+    else:
+        raise ValueError(f"Unknown import format: {fmt}")
+
+
+def _read_xlsx(source, batch_size):
+    from openpyxl import load_workbook
+
+    # Read-only mode streams rows instead of loading the whole workbook
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(c) if c is not None else '' for c in next(rows, ())]
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def validate(frame, user, today=None):
+    """Split a batch into ``(valid, rejected)`` frames.
+
+    Column names are matched case-insensitively.  Name and Category are
+    required; Priority and Status must be known values (matched
+    case-insensitively, blanks get defaults); blank dates default to
+    today.  ``rejected`` keeps the original columns plus ``Reason``.
+    """
+    today = (today or date.today()).isoformat()
+    lookup = {str(c).strip().lower(): c for c in frame.columns}
+    clean = pd.DataFrame(index=frame.index)
+    for column in COLUMNS:
+        source = lookup.get(column.lower())
+        if source is None:
+            clean[column] = ''
+        else:
+            clean[column] = frame[source].fillna('').astype(str).str.strip()
+
+    reason = pd.Series('', index=frame.index)
+    reason = reason.mask(clean['Name'] == '', 'Missing Name')
+    reason = reason.mask((reason == '') & (clean['Category'] == ''), 'Missing Category')
+
+    for column, known in (('Priority', PRIORITIES), ('Status', STATUSES)):
+        blank = clean[column] == ''
+        mapped = clean[column].str.lower().map({v.lower(): v for v in known})
+        reason = reason.mask((reason == '') & ~blank & mapped.isna(),
+                             f"Unknown {column}")
+        clean[column] = mapped.where(~blank, DEFAULTS[column])
+
+    # Only rows that will be imported can clash: a rejected row never
+    # takes an ID away from a later valid one
+    ids = clean.loc[reason == '', 'ID']
+    duplicated = (ids != '') & ids.duplicated(keep='first')
+    reason = reason.mask(duplicated.reindex(reason.index, fill_value=False),
+                         'Duplicate ID in file')
+
+    for column in ('Description', 'Tags', 'Department'):
+        clean[column] = clean[column].where(clean[column] != '', DEFAULTS[column])
+    clean['Created'] = clean['Created'].where(clean['Created'] != '', today)
+    clean['Modified'] = clean['Modified'].where(clean['Modified'] != '', clean['Created'])
+    clean['Assigned'] = clean['Assigned'].where(clean['Assigned'] != '', user)
+
+    bad = reason != ''
+    rejected = frame[bad].copy()
+    rejected['Reason'] = reason[bad]
+    return clean[~bad], rejected
+
+
+def import_records(store, source, fmt, user, batch_size=DEFAULT_BATCH_SIZE,
+                   progress=None):
+    """Import ``source`` into ``store`` and return an ImportResult.
+
+    ``progress(result)`` is called after every batch.  Rejected rows
+    are written to a CSV under ``DATA_DIR/imports`` whose path is in
+    ``result.rejected_path``.
+    """
+    result = ImportResult()
+    rejected_file = None
+    try:
+        for frame in read_batches(source, fmt, batch_size):
+            valid, rejected = validate(frame, user)
+
+            taken = store.existing_ids(valid.loc[valid['ID'] != '', 'ID'])
+            if taken:
+                clash = valid['ID'].isin(taken)
+                rejected = _reject(rejected, frame, valid.index[clash], 'ID already exists')
+                valid = valid[~clash]
+
+            # Rows without an ID get a block of fresh ones, never one of
+            # the batch's own IDs or one stored meanwhile
+            missing = valid['ID'] == ''
+            if missing.any():
+                explicit = set(valid.loc[~missing, 'ID'])
+                store.skip_ids(explicit)
+                valid = valid.copy()
+                valid.loc[missing, 'ID'] = store.ids.allocate_many(int(missing.sum()))
+                allocated = valid.loc[missing, 'ID']
+                clash = missing & valid['ID'].isin(explicit | store.existing_ids(allocated))
+                if clash.any():
+                    rejected = _reject(rejected, frame, valid.index[clash],
+                                       'Generated ID already in use')
+                    valid = valid[~clash]
+
+            try:
+                store.add_many(valid.to_dict('records'))
+            except sqlite3.IntegrityError as error:
+                # Written by someone else since the checks: the batch is
+                # rolled back, so report it rather than stop half way
+                rejected = _reject(rejected, frame, valid.index, f"Not stored: {error}")
+                valid = valid.iloc[:0]
+            result.inserted += len(valid)
+
+            if len(rejected):
+                if rejected_file is None:
+                    IMPORT_DIR.mkdir(parents=True, exist_ok=True)
+                    rejected_file = tempfile.NamedTemporaryFile(
+                        'w', newline='', suffix='.csv', prefix='rejected-',
+                        dir=IMPORT_DIR, delete=False)
+                    result.rejected_path = rejected_file.name
+                    rejected.to_csv(rejected_file, index=False)
+                else:
+                    rejected.to_csv(rejected_file, index=False, header=False)
+                result.rejected += len(rejected)
+
+            if progress is not None:
+                progress(result)
+    finally:
+        if rejected_file is not None:
+            rejected_file.close()
+    return result
+
+
+def _reject(rejected, frame, index, reason):
+    """``rejected`` plus the original ``frame`` rows at ``index`` with ``reason``."""
+    extra = frame.loc[index].copy()
+    extra['Reason'] = reason
+    return pd.concat([rejected, extra])
+
+
+def main(argv=None):
+    from .store import RecordStore
+
+    parser = argparse.ArgumentParser(description="Bulk import records into the IMS store.")
+    parser.add_argument('file', help="CSV, XLSX or JSON Lines file")
+    parser.add_argument('--format', choices=list(FORMATS), help="override format detection")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--user', default='System', help="Assigned value for rows without one")
+    parser.add_argument('--db', default=str(DATA_DIR / 'ims.db'))
+    args = parser.parse_args(argv)
+
+    store = RecordStore(args.db)
+    fmt = args.format or detect_format(args.file)
+
+    def report(result):
+        print(f"\r{result.inserted:,} imported, {result.rejected:,} rejected",
+              end='', file=sys.stderr, flush=True)
+
+    result = import_records(store, args.file, fmt, args.user, args.batch_size, report)
+    print(file=sys.stderr)
+    if result.rejected_path:
+        print(f"Rejected rows written to {result.rejected_path}", file=sys.stderr)
+    store.close()
+    return 1 if result.rejected else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
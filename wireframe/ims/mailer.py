@@ -0,0 +1,433 @@
+"""Outbound mail queue with a pooled, rate-limited SMTP sender.
+
+Pages only insert messages into the persistent ``outbox`` table, which
+takes one transaction however many messages there are, and return at
+once.  A background dispatcher claims due messages in batches and sends
+them over a small pool of reused SMTP connections, no faster than the
+rate limit.  Failures are retried with exponential backoff; 5xx replies
+and messages out of attempts are marked failed.
+
+Claims are leases: a message being sent is due again once its lease
+expires, so messages claimed by a process that died are picked up
+again instead of being lost.  Server settings come from System Settings
+(SMTP Server, SMTP Port, From Email); credentials only from the
+environment.  Any local SMTP stand-in (e.g. ``python -m aiosmtpd -n``)
+works for testing.
+"""
+
+import mimetypes
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.message import EmailMessage
+
+QUEUED, SENDING, SENT, FAILED = 'queued', 'sending', 'sent', 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id           INTEGER PRIMARY KEY,
+    kind         TEXT NOT NULL,
+    recipient    TEXT NOT NULL,
+    subject      TEXT NOT NULL,
+    body         TEXT NOT NULL,
+    attachment   TEXT,
+    status       TEXT NOT NULL,
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    created      REAL NOT NULL,
+    sent         REAL,
+    error        TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox (status, next_attempt);
+"""
+
+# Messages claimed per dispatcher round
+DEFAULT_BATCH_SIZE = 100
+# Messages per second across all connections
+DEFAULT_RATE = 10
+# Concurrent SMTP connections
+DEFAULT_POOL_SIZE = 2
+DEFAULT_MAX_ATTEMPTS = 6
+
+# Retry delay doubles from BACKOFF_BASE up to BACKOFF_MAX seconds
+BACKOFF_BASE = 30
+BACKOFF_MAX = 3600
+
+# A claimed message is due again after this many seconds
+LEASE = 600
+
+# Longest sleep between outbox checks
+POLL_INTERVAL = 5
+
+# Idle connections older than this are checked with NOOP before reuse
+IDLE_CHECK = 30
+
+SMTP_TIMEOUT = 30
+
+USER_ENV = 'IMS_SMTP_USER'
+PASSWORD_ENV = 'IMS_SMTP_PASSWORD'
+
+# Kind -> (subject, body) templates, filled from ``compose`` fields
+TEMPLATES = {
+    'invite': (
+        "You're invited to {system_name}",
+        "Hello {name},\n\n"
+        "You have been invited to {system_name} at {company_name}.\n"
+        "Sign in with this email address to get started.\n",
+    ),
+    'password_reset': (
+        "{system_name} password reset",
+        "Hello {name},\n\n"
+        "A password reset was requested for your {system_name} account.\n"
+        "If this was not you, contact support@company.com.\n",
+    ),
+    'report': (
+        "{report_name}",
+        "Hello,\n\nThe report \"{report_name}\" is attached.\n\n{system_name}\n",
+    ),
+    'test': (
+        "{system_name} test email",
+        "This is a test message from {system_name}.\n",
+    ),
+}
+
+SmtpConfig = namedtuple('SmtpConfig', 'host port sender username password')
+
+
+class MailQueue:
+    """Persistent outbox plus the background dispatcher that drains it."""
+
+    def __init__(self, db_path, settings, rate=DEFAULT_RATE, pool_size=DEFAULT_POOL_SIZE,
+                 batch_size=DEFAULT_BATCH_SIZE, max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.settings = settings
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._pool = SmtpPool(pool_size)
+        self._limiter = RateLimiter(rate)
+        self._senders = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='mail')
+        self._intake = ThreadPoolExecutor(max_workers=1, thread_name_prefix='mail-intake')
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop,
+                                            name='mail-dispatcher', daemon=True)
+        self._dispatcher.start()
+
+    # Queueing
+
+    def enqueue(self, messages):
+        """Add ``messages`` (dicts from ``compose``) to the outbox; returns the count."""
+        now = time.time()
+        rows = [(m['kind'], m['to'], m['subject'], m['body'], m.get('attachment'),
+                 QUEUED, now, now) for m in messages]
+        if rows:
+            with self._lock:
+                self._write(
+                    "INSERT INTO outbox (kind, recipient, subject, body, attachment, "
+                    "status, next_attempt, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._wake.set()
+        return len(rows)
+
+    def enqueue_later(self, make_messages):
+        """Build and queue messages off the caller's thread.
+
+        ``make_messages`` is called in the background and returns an
+        iterable of messages, so a page can queue invites for thousands
+        of users without waiting for them to be read and written.
+        Returns a future for the number queued.
+        """
+        return self._intake.submit(lambda: self.enqueue(make_messages()))
+
+    # Monitoring
+
+    def stats(self):
+        """Message counts by status."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"))
+
+    def failures(self, limit=10):
+        """The most recently failed messages as dicts."""
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT id, kind, recipient, subject, attempts, error FROM outbox "
+                "WHERE status = ? ORDER BY id DESC LIMIT ?", (FAILED, limit))
+            names = [d[0] for d in cur.description]
+            return [dict(zip(names, row)) for row in cur]
+
+    def shutdown(self):
+        self._stop.set()
+        self._wake.set()
+        self._intake.shutdown(wait=False, cancel_futures=True)
+        self._senders.shutdown(wait=False, cancel_futures=True)
+        self._pool.close()
+
+    # Dispatching
+
+    def _dispatch_loop(self):
+        while not self._stop.is_set():
+            try:
+                batch = self._claim()
+                if batch:
+                    self._send(batch)
+                    continue
+                wait = self._next_due()
+            except Exception:
+                # A broken outbox must not kill the dispatcher; try again later
+                wait = POLL_INTERVAL
+            self._wake.wait(wait)
+            self._wake.clear()
+
+    def _claim(self):
+        """Lease up to ``batch_size`` due messages to this process."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, kind, recipient, subject, body, attachment, attempts "
+                    "FROM outbox WHERE status IN (?, ?) AND next_attempt <= ? "
+                    "ORDER BY next_attempt LIMIT ?",
+                    (QUEUED, SENDING, now, self.batch_size)).fetchall()
+                self._conn.executemany(
+                    "UPDATE outbox SET status = ?, attempts = attempts + 1, next_attempt = ? "
+                    "WHERE id = ?", [(SENDING, now + LEASE, row[0]) for row in rows])
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        names = ('id', 'kind', 'to', 'subject', 'body', 'attachment', 'attempts')
+        return [dict(zip(names, row[:-1] + (row[-1] + 1,))) for row in rows]
+
+    def _next_due(self):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(next_attempt) FROM outbox WHERE status IN (?, ?)",
+                (QUEUED, SENDING)).fetchone()
+        if row[0] is None:
+            return POLL_INTERVAL
+        return min(max(row[0] - time.time(), 0), POLL_INTERVAL)
+
+    def _send(self, batch):
+        config = self._config()
+        # One slice of the batch per pooled connection
+        size = self._pool.size
+        slices = [batch[i::size] for i in range(size) if batch[i::size]]
+        for results in self._senders.map(lambda part: self._send_slice(config, part), slices):
+            self._record(results)
+
+    def _send_slice(self, config, messages):
+        """Send ``messages`` over one connection; returns (message, error, permanent).
+
+        Never raises: every message comes back with an outcome, so one
+        bad message cannot lose the results of the rest of the batch.
+        """
+        results = []
+        try:
+            with self._pool.connection(config) as smtp:
+                for message in messages:
+                    try:
+                        email = build_message(message, config.sender)
+                    except OSError as error:
+                        results.append((message, f"Attachment unreadable: {error}", True))
+                        continue
+                    except Exception as error:
+                        results.append((message, _describe(error), True))
+                        continue
+                    self._limiter.acquire()
+                    try:
+                        smtp.send_message(email)
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused,
+                            smtplib.SMTPDataError) as error:
+                        # The server answered: 5xx is final, 4xx is worth retrying
+                        results.append((message, _describe(error), _smtp_code(error) >= 500))
+                    except (smtplib.SMTPException, OSError):
+                        raise
+                    except Exception as error:
+                        # Not the connection: this message can never be sent
+                        results.append((message, _describe(error), True))
+                    else:
+                        results.append((message, None, False))
+        except Exception as error:
+            # Connection-level failure: everything not yet tried goes back
+            for message in messages[len(results):]:
+                results.append((message, _describe(error), False))
+        return results
+
+    def _record(self, results):
+        now = time.time()
+        sent, retry, failed = [], [], []
+        for message, error, permanent in results:
+            if error is None:
+                sent.append((SENT, now, message['id']))
+            elif permanent or message['attempts'] >= self.max_attempts:
+                failed.append((FAILED, error, message['id']))
+            else:
+                delay = min(BACKOFF_BASE * 2 ** (message['attempts'] - 1), BACKOFF_MAX)
+                retry.append((QUEUED, now + delay, error, message['id']))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "UPDATE outbox SET status = ?, sent = ?, error = NULL WHERE id = ?", sent)
+                self._conn.executemany(
+                    "UPDATE outbox SET status = ?, error = ? WHERE id = ?", failed)
+                self._conn.executemany(
+                    "UPDATE outbox SET status = ?, next_attempt = ?, error = ? WHERE id = ?", retry)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _config(self):
+        settings = self.settings.all()
+        return SmtpConfig(settings['smtp_server'], int(settings['smtp_port']),
+                          settings['email_from'], os.environ.get(USER_ENV),
+                          os.environ.get(PASSWORD_ENV))
+
+    def _write(self, sql, rows):
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._conn.executemany(sql, rows)
+            self._conn.execute("COMMIT")
+        except Exception:
+            self._conn.execute("ROLLBACK")
+            raise
+
+
+def compose(kind, to, attachment=None, **fields):
+    """A message for the outbox from the ``kind`` template."""
+    subject, body = TEMPLATES[kind]
+    return {'kind': kind, 'to': to, 'subject': subject.format(**fields),
+            'body': body.format(**fields), 'attachment': attachment}
+
+
+def build_message(message, sender):
+    email = EmailMessage()
+    email['From'] = sender
+    email['To'] = message['to']
+    email['Subject'] = message['subject']
+    email.set_content(message['body'])
+    if message['attachment']:
+        mime = mimetypes.guess_type(message['attachment'])[0] or 'application/octet-stream'
+        maintype, subtype = mime.split('/', 1)
+        with open(message['attachment'], 'rb') as f:
+            email.add_attachment(f.read(), maintype=maintype, subtype=subtype,
+                                 filename=os.path.basename(message['attachment']))
+    return email
+
+
+def _smtp_code(error):
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return min(code for code, _ in error.recipients.values())
+    return error.smtp_code
+
+
+def _describe(error):
+    return f"{type(error).__name__}: {error}"
+
+
+class SmtpPool:
+    """Up to ``size`` reusable SMTP connections for one server config."""
+
+    def __init__(self, size):
+        self.size = size
+        self._lock = threading.Lock()
+        self._idle = []  # (config, smtp, released at)
+
+    @contextmanager
+    def connection(self, config):
+        """Borrow a connection; it is closed instead of returned on error."""
+        smtp = self._take(config)
+        try:
+            yield smtp
+        except BaseException:
+            _quit(smtp)
+            raise
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((config, smtp, time.monotonic()))
+                return
+        _quit(smtp)
+
+    def _take(self, config):
+        while True:
+            with self._lock:
+                entry = next((e for e in self._idle if e[0] == config), None)
+                if entry is not None:
+                    self._idle.remove(entry)
+                stale = [e for e in self._idle if e[0] != config]
+                for e in stale:
+                    self._idle.remove(e)
+            for _, smtp, _ in stale:
+                _quit(smtp)  # settings changed since these were opened
+            if entry is None:
+                return _connect(config)
+            _, smtp, released = entry
+            if time.monotonic() - released < IDLE_CHECK:
+                return smtp
+            try:
+                if smtp.noop()[0] == 250:
+                    return smtp
+            except (smtplib.SMTPException, OSError):
+                pass
+            _quit(smtp)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for _, smtp, _ in idle:
+            _quit(smtp)
+
+
+def _connect(config):
+    if config.port == 465:
+        smtp = smtplib.SMTP_SSL(config.host, config.port, timeout=SMTP_TIMEOUT)
+    else:
+        smtp = smtplib.SMTP(config.host, config.port, timeout=SMTP_TIMEOUT)
+        smtp.ehlo()
+        if smtp.has_extn('starttls'):
+            smtp.starttls()
+            smtp.ehlo()
+    if config.username:
+        smtp.login(config.username, config.password or '')
+    return smtp
+
+
+def _quit(smtp):
+    try:
+        smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        smtp.close()
+
+
+class RateLimiter:
+    """Token bucket allowing ``rate`` acquisitions per second (bursts of ``burst``)."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
@@ -0,0 +1,154 @@
+"""Materialized record aggregates for the Dashboard.
+
+Counts by category/status/priority and records created per day, week and
+month are kept in small summary tables.  Triggers adjust them by one row
+on every insert, update and delete, so reading the Dashboard costs the
+same whether there are a hundred records or ten million.
+"""
+
+from datetime import date, timedelta
+
+# Record fields with per-value counts
+DIMENSIONS = ('category', 'status', 'priority')
+
+# Statuses counted as open tasks on the Dashboard
+PENDING_STATUSES = ('Pending', 'Pending Review')
+
+# Grain -> SQL expression for the bucket start of a ``created`` date
+GRAINS = {
+    'day': "date({col})",
+    'week': "date({col}, '-6 days', 'weekday 1')",
+    'month': "strftime('%Y-%m-01', {col})",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS record_stats (
+    dimension TEXT NOT NULL,
+    value     TEXT NOT NULL,
+    n         INTEGER NOT NULL,
+    PRIMARY KEY (dimension, value)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS record_timeline (
+    grain  TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    n      INTEGER NOT NULL,
+    PRIMARY KEY (grain, bucket)
+) WITHOUT ROWID;
+"""
+
+
+def _adjust(row, delta):
+    """Trigger statements adding ``delta`` for the ``row`` (new/old) values."""
+    statements = [
+        "INSERT INTO record_stats VALUES ('total', '', {d}) "
+        "ON CONFLICT (dimension, value) DO UPDATE SET n = n + {d};"
+    ]
+    for dimension in DIMENSIONS:
+        statements.append(
+            f"INSERT INTO record_stats VALUES ('{dimension}', IFNULL({row}.{dimension}, ''), {{d}}) "
+            "ON CONFLICT (dimension, value) DO UPDATE SET n = n + {d};")
+    for grain, expression in GRAINS.items():
+        bucket = expression.format(col=f'{row}.created')
+        statements.append(
+            f"INSERT INTO record_timeline SELECT '{grain}', {bucket}, {{d}} "
+            f"WHERE {bucket} IS NOT NULL "
+            "ON CONFLICT (grain, bucket) DO UPDATE SET n = n + {d};")
+    return '\n    '.join(s.format(d=delta) for s in statements)
+
+
+TRIGGERS = f"""
+CREATE TRIGGER IF NOT EXISTS record_metrics_insert AFTER INSERT ON records BEGIN
+    {_adjust('new', 1)}
+END;
+CREATE TRIGGER IF NOT EXISTS record_metrics_update
+AFTER UPDATE OF {', '.join(DIMENSIONS)}, created ON records BEGIN
+    {_adjust('old', -1)}
+    {_adjust('new', 1)}
+END;
+CREATE TRIGGER IF NOT EXISTS record_metrics_delete AFTER DELETE ON records BEGIN
+    {_adjust('old', -1)}
+END;
+"""
+
+
+def install(conn):
+    """Create the summary tables and triggers, backfilling older databases."""
+    conn.executescript(SCHEMA)
+    empty = conn.execute("SELECT COUNT(*) FROM record_stats").fetchone()[0] == 0
+    conn.executescript(TRIGGERS)
+    if empty:
+        rebuild(conn)
+
+
+def rebuild(conn):
+    """Recount the summary tables from ``records`` (e.g. after a restore)."""
+    conn.execute("DELETE FROM record_stats")
+    conn.execute("DELETE FROM record_timeline")
+    conn.execute("INSERT INTO record_stats SELECT 'total', '', COUNT(*) FROM records")
+    for dimension in DIMENSIONS:
+        conn.execute(
+            f"INSERT INTO record_stats SELECT '{dimension}', IFNULL({dimension}, ''), COUNT(*) "
+            f"FROM records GROUP BY 1, 2")
+    for grain, expression in GRAINS.items():
+        bucket = expression.format(col='created')
+        conn.execute(
+            f"INSERT INTO record_timeline SELECT '{grain}', {bucket}, COUNT(*) "
+            f"FROM records WHERE {bucket} IS NOT NULL GROUP BY 1, 2")
+
+
+def read_counts(conn):
+    """``{dimension: {value: count}}`` plus ``'total'`` for all records."""
+    result = {dimension: {} for dimension in DIMENSIONS}
+    result['total'] = 0
+    for dimension, value, n in conn.execute(
+            "SELECT dimension, value, n FROM record_stats WHERE n > 0"):
+        if dimension == 'total':
+            result['total'] = n
+        else:
+            result[dimension][value] = n
+    return result
+
+
+def read_timeline(conn, grain='day', start=None, end=None, latest=None):
+    """``[(bucket, count), ...]`` in bucket order for ``start <= bucket <= end``.
+
+    ``latest`` keeps only that many of the most recent buckets.
+    """
+    if grain not in GRAINS:
+        raise ValueError(f"Unknown grain: {grain}")
+    sql = "SELECT bucket, n FROM record_timeline WHERE grain = ? AND n > 0"
+    params = [grain]
+    if start is not None:
+        sql += " AND bucket >= ?"
+        params.append(str(start))
+    if end is not None:
+        sql += " AND bucket <= ?"
+        params.append(str(end))
+    sql += " ORDER BY bucket DESC"
+    if latest is not None:
+        sql += " LIMIT ?"
+        params.append(latest)
+    return [tuple(row) for row in reversed(conn.execute(sql, params).fetchall())]
+
+
+def summarize(counts, timeline_day, today=None):
+    """Derive the headline Dashboard numbers from the aggregates.
+
+    ``timeline_day`` only needs to cover the last two months.
+    """
+    today = today or date.today()
+    per_day = {date.fromisoformat(bucket): n for bucket, n in timeline_day}
+    month_start = today.replace(day=1)
+    last_month_start = (month_start - timedelta(days=1)).replace(day=1)
+    this_month = sum(n for day, n in per_day.items() if day >= month_start)
+    last_month = sum(n for day, n in per_day.items()
+                     if last_month_start <= day < month_start)
+    return {
+        'total': counts['total'],
+        'this_week': sum(n for day, n in per_day.items()
+                         if day > today - timedelta(days=7)),
+        'this_month': this_month,
+        'last_month': last_month,
+        'pending': sum(counts['status'].get(s, 0) for s in PENDING_STATUSES),
+        'active': counts['status'].get('Active', 0),
+    }
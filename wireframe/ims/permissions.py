@@ -0,0 +1,156 @@
+"""Record visibility: which records each user may see.
+
+A record is Public (everyone), Restricted (its owner and the users it
+is shared with) or Private (its owner only).  Owner and Shared With hold
+user emails, which are unique in the directory and, like there, compared
+without regard to case: the store keeps them lower-cased and every
+lookup here lower-cases the user's email too.  The records a user may
+see are the union of bitmaps from the store's index -- Public, owned by
+them, shared with them and Restricted -- so the Records page restricts a
+query with one more intersection rather than a check per row.
+
+Resolved bitmaps are cached per user.  Like the store's bitmap index,
+a cached bitmap is caught up from the ``rev`` column: only records
+written since it was built are re-checked, so a write does not throw
+away every user's bitmap.  A directory change only drops the bitmap of
+a user whose role or status changed.
+"""
+
+import threading
+from collections import OrderedDict
+
+from .profiling import timed
+
+PUBLIC = 'Public'
+RESTRICTED = 'Restricted'
+PRIVATE = 'Private'
+VISIBILITIES = (PUBLIC, RESTRICTED, PRIVATE)
+
+# Roles that see every record
+UNRESTRICTED_ROLES = ('Administrator',)
+
+# Users whose access bitmaps are kept
+DEFAULT_MAX_USERS = 256
+
+# Access of a user: everything, nothing, or by record visibility
+ALL, NONE, BY_VISIBILITY = 'all', 'none', 'by_visibility'
+
+
+class _Entry:
+    __slots__ = ('access', 'directory_version', 'position', 'bits')
+
+    def __init__(self, access, directory_version, position, bits):
+        self.access = access
+        self.directory_version = directory_version
+        self.position = position
+        self.bits = bits
+
+
+class PermissionResolver:
+    """Thread-safe, per-user cache of accessible-record bitmaps."""
+
+    def __init__(self, store, directory, max_users=DEFAULT_MAX_USERS):
+        self.store = store
+        self.directory = directory
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @timed('permissions.visible')
+    def visible(self, email):
+        """Bitmap of the records ``email`` may see, for the store's ``visible=``.
+
+        None means no restriction (administrators); unknown and inactive
+        users see nothing.
+        """
+        email = email.lower()
+        directory_version = self.directory.version
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is not None:
+                self._entries.move_to_end(email)
+        if entry is not None and entry.directory_version != directory_version:
+            if access_of(self.directory.get(email)) == entry.access:
+                entry.directory_version = directory_version
+            else:
+                entry = None
+        if entry is None:
+            self.misses += 1
+            entry = self._resolve(email, directory_version)
+        elif entry.access == BY_VISIBILITY:
+            self.hits += 1
+            entry = self._catch_up(email, entry)
+        else:
+            self.hits += 1
+        with self._lock:
+            self._entries[email] = entry
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        if entry.access == ALL:
+            return None
+        return entry.bits
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _resolve(self, email, directory_version):
+        access = access_of(self.directory.get(email))
+        if access != BY_VISIBILITY:
+            return _Entry(access, directory_version, None, 0)
+        position, bits = accessible(self.store, email)
+        return _Entry(access, directory_version, position, bits)
+
+    def _catch_up(self, email, entry):
+        """Re-check only the records written since ``entry`` was built."""
+        position, rows = self.store.acl_changes(entry.position)
+        if rows is None:
+            # Records were restored; rebuild from the index
+            return self._resolve(email, entry.directory_version)
+        bits = entry.bits
+        for seq, visibility, owner, shared_with in rows:
+            if can_see(email, visibility, owner, shared_with):
+                bits |= 1 << seq
+            else:
+                bits &= ~(1 << seq)
+        # A fresh entry: another thread may still be reading the old one
+        return _Entry(entry.access, entry.directory_version, position, bits)
+
+
+def access_of(user):
+    """ALL, NONE or BY_VISIBILITY for a directory user (None: unknown)."""
+    if user is None or user['Status'] != 'Active':
+        return NONE
+    if user['Role'] in UNRESTRICTED_ROLES:
+        return ALL
+    return BY_VISIBILITY
+
+
+def can_see(email, visibility, owner, shared_with):
+    """The visibility rule for one record."""
+    email = email.lower()
+    return (visibility == PUBLIC or owner.lower() == email
+            or (visibility == RESTRICTED and email in (s.lower() for s in shared_with)))
+
+
+def accessible(store, email):
+    """``(position, bits)`` of the records visible to the user ``email``.
+
+    The same rule as ``can_see``, as bitmap operations over the index.
+    """
+    email = email.lower()
+    position, (public, restricted, owned, shared) = store.lookup(
+        ('visibility', PUBLIC), ('visibility', RESTRICTED),
+        ('owner', email), ('shared_with', email))
+    return position, public | owned | (shared & restricted)
+
+
+def visibility_of(label):
+    """The stored visibility for a form label such as 'Private (Only me)'."""
+    word = label.split(' ')[0]
+    if word not in VISIBILITIES:
+        raise ValueError(f"Unknown visibility: {label}")
+    return word
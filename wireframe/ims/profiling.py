@@ -0,0 +1,128 @@
+"""In-process timing of reruns, pages, store queries and chart builds.
+
+Timings go into one process-wide ``Profiler``: a fixed-size ring buffer
+of recent durations per name (so percentiles reflect current load, not
+the whole uptime) plus running totals.  Recording is a clock read and a
+deque append, cheap enough to leave on in production.
+
+    from ims.profiling import timed, timer
+
+    @timed('store.count')
+    def count(...): ...
+
+    with timer('frame.records'):
+        df = pd.DataFrame(...)
+"""
+
+import functools
+import json
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Durations kept per name for the percentiles
+DEFAULT_WINDOW = 1024
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class Profiler:
+    """Thread-safe ring buffers of durations keyed by name."""
+
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._samples = {}
+        # name -> [count, total seconds] since start (or reset)
+        self._totals = {}
+        self.started = time.time()
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+                self._totals[name] = [0, 0.0]
+            samples.append(seconds)
+            totals = self._totals[name]
+            totals[0] += 1
+            totals[1] += seconds
+
+    @contextmanager
+    def timer(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def timed(self, name):
+        """Decorator recording every call of the function under ``name``."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(name, time.perf_counter() - started)
+            return wrapper
+        return decorate
+
+    def summary(self):
+        """One dict per name: counts, total, mean, max and the QUANTILES."""
+        with self._lock:
+            items = [(name, sorted(samples), tuple(self._totals[name]))
+                     for name, samples in self._samples.items()]
+        rows = []
+        for name, samples, (count, total) in sorted(items):
+            row = {'name': name, 'count': count, 'total': total,
+                   'mean': total / count if count else 0.0,
+                   'max': samples[-1] if samples else 0.0}
+            for q in QUANTILES:
+                row[f'p{round(q * 100)}'] = percentile(samples, q)
+            rows.append(row)
+        return rows
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self.started = time.time()
+
+    def to_json(self):
+        return json.dumps({'started': self.started, 'window': self.window,
+                           'timings': self.summary()}, indent=1)
+
+    def to_prometheus(self, metric='ims_duration_seconds'):
+        """The timings in the Prometheus text exposition format (as a summary)."""
+        lines = [f"# HELP {metric} Duration of IMS operations in seconds.",
+                 f"# TYPE {metric} summary"]
+        for row in self.summary():
+            label = row['name'].replace('\\', '\\\\').replace('"', '\\"')
+            for q in QUANTILES:
+                lines.append(f'{metric}{{name="{label}",quantile="{q}"}} '
+                             f'{row[f"p{round(q * 100)}"]:.6g}')
+            lines.append(f'{metric}_sum{{name="{label}"}} {row["total"]:.6g}')
+            lines.append(f'{metric}_count{{name="{label}"}} {row["count"]}')
+        return '\n'.join(lines) + '\n'
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of an already sorted list (0.0 when empty)."""
+    if not ordered:
+        return 0.0
+    rank = max(math.ceil(q * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+# The process-wide profiler used by the helpers below
+PROFILER = Profiler()
+
+timer = PROFILER.timer
+timed = PROFILER.timed
@@ -0,0 +1,190 @@
+"""Static reference data shared by every session.
+
+Option lists, the training catalogue and the FAQ are built once when the
+module is first imported and then only looked up, instead of being
+rebuilt on every rerun of every session.  Everything is a tuple (or a
+mapping of tuples) so one session cannot change it for the others.
+"""
+
+# Record form category -> stored category is its first word
+RECORD_CATEGORIES = (
+    'Legal Documents',
+    'Technical Specifications',
+    'Financial Records',
+    'Project Files',
+    'Client Communications',
+    'Security Documents',
+)
+
+FILTER_CATEGORIES = ('Legal', 'Technical', 'Financial', 'Security')
+FILTER_STATUSES = ('Active', 'Draft', 'Complete', 'Pending')
+
+PRIORITIES = ('Low', 'Medium', 'High', 'Critical')
+RECORD_STATUSES = ('Draft', 'Active', 'Pending', 'Pending Review', 'Complete', 'Inactive')
+INITIAL_STATUSES = ('Draft', 'Active', 'Pending Review')
+
+DEPARTMENTS = ('IT', 'Finance', 'Operations', 'Legal', 'HR')
+ROLES = ('Administrator', 'Manager', 'User', 'Viewer')
+USER_STATUSES = ('Active', 'Inactive', 'Pending')
+
+ATTACHMENT_TYPES = ('pdf', 'doc', 'docx', 'xls', 'xlsx', 'png', 'jpg', 'jpeg')
+
+# System Settings choices
+TIME_ZONES = ('UTC-5 (EST)', 'UTC-8 (PST)', 'UTC+0 (GMT)', 'UTC+1 (CET)')
+LANGUAGES = ('English', 'Spanish', 'French', 'German')
+PASSWORD_POLICIES = ('Standard', 'Strong', 'Custom')
+BACKUP_FREQUENCIES = ('Daily', 'Weekly', 'Monthly')
+
+# Seed data for a fresh records store
+SAMPLE_RECORDS = (
+    {
+        'ID': 'IMS-001',
+        'Name': 'Client Contract - ABC Corp',
+        'Category': 'Legal',
+        'Created': '2024-01-15',
+        'Modified': '2024-01-20',
+        'Status': 'Active',
+        'Priority': 'High',
+        'Assigned': 'John Smith'
+    },
+    {
+        'ID': 'IMS-002',
+        'Name': 'Project Specifications',
+        'Category': 'Technical',
+        'Created': '2024-01-14',
+        'Modified': '2024-01-19',
+        'Status': 'Draft',
+        'Priority': 'Medium',
+        'Assigned': 'Jane Doe'
+    },
+    {
+        'ID': 'IMS-003',
+        'Name': 'Budget Analysis Q1',
+        'Category': 'Financial',
+        'Created': '2024-01-12',
+        'Modified': '2024-01-18',
+        'Status': 'Complete',
+        'Priority': 'High',
+        'Assigned': 'Bob Wilson',
+        'Visibility': 'Restricted',
+        'Owner': 'bob.wilson@company.com',
+        'Shared With': ['jane.doe@company.com']
+    },
+    {
+        'ID': 'IMS-004',
+        'Name': 'Security Audit Report',
+        'Category': 'Security',
+        'Created': '2024-01-10',
+        'Modified': '2024-01-17',
+        'Status': 'Pending',
+        'Priority': 'Critical',
+        'Assigned': 'Alice Johnson',
+        'Visibility': 'Private',
+        'Owner': 'alice.johnson@company.com'
+    }
+)
+
+SAMPLE_USERS = (
+    {
+        'Name': 'John Smith',
+        'Email': 'john.smith@company.com',
+        'Role': 'Administrator',
+        'Department': 'IT',
+        'Last Login': '2024-01-20 10:30',
+        'Status': 'Active'
+    },
+    {
+        'Name': 'Jane Doe',
+        'Email': 'jane.doe@company.com',
+        'Role': 'Manager',
+        'Department': 'Operations',
+        'Last Login': '2024-01-20 09:15',
+        'Status': 'Active'
+    },
+    {
+        'Name': 'Bob Wilson',
+        'Email': 'bob.wilson@company.com',
+        'Role': 'User',
+        'Department': 'Finance',
+        'Last Login': '2024-01-19 16:45',
+        'Status': 'Active'
+    },
+    {
+        'Name': 'Alice Johnson',
+        'Email': 'alice.johnson@company.com',
+        'Role': 'User',
+        'Department': 'Security',
+        'Last Login': '2024-01-18 14:20',
+        'Status': 'Inactive'
+    },
+)
+
+USER_COLUMNS = ('Name', 'Email', 'Role', 'Department', 'Last Login', 'Status')
+
+TRAINING_MODULES = (
+    {"Module": "System Basics", "Duration": "30 min", "Status": "Completed", "Score": "95%"},
+    {"Module": "Record Management", "Duration": "45 min", "Status": "Completed", "Score": "88%"},
+    {"Module": "Collaboration Features", "Duration": "25 min", "Status": "Completed", "Score": "92%"},
+    {"Module": "Report Generation", "Duration": "35 min", "Status": "In Progress", "Score": "65%"},
+    {"Module": "Advanced Search", "Duration": "20 min", "Status": "Not Started", "Score": "-"},
+    {"Module": "Security & Permissions", "Duration": "40 min", "Status": "Not Started", "Score": "-"},
+    {"Module": "System Administration", "Duration": "60 min", "Status": "Not Started", "Score": "-"},
+    {"Module": "Troubleshooting", "Duration": "30 min", "Status": "Not Started", "Score": "-"},
+)
+
+# FAQ category -> ((question, markdown answer), ...)
+FAQ = {
+    "General Usage": (
+        ("How do I navigate the system?", """
+Use the sidebar navigation menu to move between different sections:
+- **Dashboard**: Overview and quick stats
+- **Records**: Manage your documents and files
+- **Reports**: Generate and view analytics
+- **Admin**: System administration (if authorized)
+"""),
+        ("How do I search for records?", """
+1. Use the search bar at the top of the Records page
+2. Enter keywords related to your record
+3. Use filters to narrow results by category, status, or date
+4. Use search operators (AND, OR, NOT) for advanced searches
+"""),
+        ("Can I customize the dashboard?", """
+Yes! You can customize your dashboard by:
+- Rearranging widget order
+- Choosing which metrics to display
+- Setting default time ranges for charts
+- Creating custom quick-access buttons
+"""),
+    ),
+    "Account & Access": (),
+    "Records Management": (
+        ("What file types can I upload?", """
+The system supports the following file types:
+- **Documents**: PDF, DOC, DOCX, TXT, RTF
+- **Spreadsheets**: XLS, XLSX, CSV
+- **Images**: PNG, JPG, JPEG, GIF
+- **Archives**: ZIP, RAR
+- **Maximum file size**: 10MB per file
+"""),
+        ("How do I set record permissions?", """
+When creating or editing a record:
+1. Go to the "Access & Permissions" section
+2. Choose visibility level:
+   - **Public**: All users can view
+   - **Restricted**: Only selected users
+   - **Private**: Only you can access
+3. For restricted records, select specific users or groups
+"""),
+    ),
+    "Technical Issues": (),
+    "Security & Privacy": (),
+}
+
+
+def search_faq(query):
+    """FAQ entries whose question or answer contains every word of ``query``."""
+    words = query.lower().split()
+    return [(question, answer)
+            for entries in FAQ.values()
+            for question, answer in entries
+            if all(w in question.lower() or w in answer.lower() for w in words)]
@@ -0,0 +1,232 @@
+"""Background report generation.
+
+Reports are built in a pool of worker processes so a slow report never
+holds up the Streamlit script thread (or the GIL) for other sessions.
+Job state lives in the ``report_jobs`` table, which the Reports page
+polls; the finished report is a CSV file under ``DATA_DIR/reports``.
+"""
+
+import csv
+import multiprocessing
+import sqlite3
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+from .metrics import GRAINS
+
+# Report type -> short type shown in the Recent Reports table
+REPORT_TYPES = {
+    'Usage Analytics': 'Analytics',
+    'Performance Metrics': 'Performance',
+    'Security Audit': 'Security',
+    'Data Quality Report': 'System',
+    'User Activity Report': 'Users',
+    'Custom Report': 'Custom',
+}
+
+# Time period -> days back from today (None = no lower bound)
+PERIODS = {
+    'Last 7 days': 7,
+    'Last 30 days': 30,
+    'Last 90 days': 90,
+    'This Year': 'year',
+    'Custom Range': None,
+}
+
+QUEUED, PROCESSING, READY, FAILED = 'Queued', 'Processing', 'Ready', 'Failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS report_jobs (
+    id          INTEGER PRIMARY KEY,
+    name        TEXT NOT NULL,
+    report_type TEXT NOT NULL,
+    period      TEXT NOT NULL,
+    user        TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    submitted   REAL NOT NULL,
+    started     REAL,
+    finished    REAL,
+    size        INTEGER,
+    path        TEXT,
+    error       TEXT
+);
+"""
+
+DEFAULT_WORKERS = 2
+
+
+class ReportJobs:
+    """Submits report jobs to a process pool and tracks their state."""
+
+    def __init__(self, db_path, out_dir, max_workers=DEFAULT_WORKERS):
+        self.db_path = str(db_path)
+        self.out_dir = out_dir
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript(SCHEMA)
+        # Jobs from a previous server process can no longer finish
+        self._conn.execute(
+            "UPDATE report_jobs SET status = ?, error = 'Interrupted by restart' "
+            "WHERE status IN (?, ?)", (FAILED, QUEUED, PROCESSING))
+        # Spawn, not fork: the server process is multi-threaded
+        self._pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn'))
+
+    def submit(self, report_type, period, user):
+        """Queue a report and return its job id without waiting for it."""
+        name = f"{report_type} - {period}"
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO report_jobs (name, report_type, period, user, status, submitted) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (name, report_type, period, user, QUEUED, time.time()))
+        job_id = cur.lastrowid
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        path = self.out_dir / f"report-{job_id}.csv"
+        future = self._pool.submit(build_report, self.db_path, job_id,
+                                   report_type, period, str(path))
+        future.add_done_callback(lambda f: self._finish(job_id, str(path), f))
+        return job_id
+
+    def _finish(self, job_id, path, future):
+        # exception() raises on a job cancelled at shutdown
+        if future.cancelled():
+            error = CancelledError("cancelled at shutdown")
+        else:
+            error = future.exception()
+        with self._lock:
+            if error is None:
+                self._conn.execute(
+                    "UPDATE report_jobs SET status = ?, finished = ?, size = ?, path = ? "
+                    "WHERE id = ?", (READY, time.time(), future.result(), path, job_id))
+            else:
+                self._conn.execute(
+                    "UPDATE report_jobs SET status = ?, finished = ?, error = ? WHERE id = ?",
+                    (FAILED, time.time(), f"{type(error).__name__}: {error}", job_id))
+
+    def jobs(self, limit=10):
+        """Most recent jobs first, as dicts."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM report_jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def active(self):
+        """Whether any job is still queued or processing."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM report_jobs WHERE status IN (?, ?) LIMIT 1",
+                (QUEUED, PROCESSING)).fetchone()
+        return row is not None
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def period_start(period, today=None):
+    """First date covered by ``period``, or None for no lower bound."""
+    today = today or date.today()
+    days = PERIODS.get(period)
+    if days == 'year':
+        return today.replace(month=1, day=1)
+    if days is None:
+        return None
+    return today - timedelta(days=days)
+
+
+def format_size(size):
+    if size is None:
+        return 'Pending'
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+# Worker side (runs in the pool processes)
+
+def build_report(db_path, job_id, report_type, period, out_path):
+    """Write the report CSV and return its size in bytes."""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        conn.execute("UPDATE report_jobs SET status = ?, started = ? WHERE id = ?",
+                     (PROCESSING, time.time(), job_id))
+        conn.commit()
+        start = period_start(period)
+        header, rows = QUERIES[report_type](conn, start)
+        with open(out_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            # Rows are streamed from the cursor, never held in memory
+            writer.writerows(rows)
+            return f.tell()
+    finally:
+        conn.close()
+
+
+def _since(start):
+    return 0 if start is None else datetime.combine(start, datetime.min.time()).timestamp()
+
+
+def _usage_analytics(conn, start):
+    return ('Day', 'Action', 'Events'), conn.execute(
+        "SELECT date(ts, 'unixepoch'), action, COUNT(*) FROM activity "
+        "WHERE ts >= ? GROUP BY 1, 2 ORDER BY 1, 2", (_since(start),))
+
+
+def _performance_metrics(conn, start):
+    # Buckets are keyed by their first day; keep the one the period starts
+    # in, so a week or month begun before the start date is not left out
+    first = ' '.join(f"WHEN '{grain}' THEN {expression.format(col='?1')}"
+                     for grain, expression in GRAINS.items())
+    return ('Grain', 'Bucket', 'Records Created'), conn.execute(
+        "SELECT grain, bucket, n FROM record_timeline "
+        f"WHERE n > 0 AND bucket >= IFNULL(CASE grain {first} END, '') "
+        "ORDER BY grain, bucket",
+        (str(start or ''),))
+
+
+def _security_audit(conn, start):
+    return ('Time', 'Action', 'User', 'Detail'), conn.execute(
+        "SELECT datetime(ts, 'unixepoch'), action, user, detail FROM activity "
+        "WHERE ts >= ? AND action IN ('User Login', 'Security Scan') ORDER BY ts",
+        (_since(start),))
+
+
+def _data_quality(conn, start):
+    # Full scan of the records table - the reason reports run off-thread
+    return ('Field', 'Missing'), conn.execute(
+        "SELECT 'Created', SUM(created IS NULL OR created = '') FROM records WHERE IFNULL(created, '') >= ?1 "
+        "UNION ALL SELECT 'Status', SUM(status IS NULL OR status = '') FROM records WHERE IFNULL(created, '') >= ?1 "
+        "UNION ALL SELECT 'Priority', SUM(priority IS NULL OR priority = '') FROM records WHERE IFNULL(created, '') >= ?1 "
+        "UNION ALL SELECT 'Assigned', SUM(assigned IS NULL OR assigned = '') FROM records WHERE IFNULL(created, '') >= ?1 "
+        "UNION ALL SELECT 'Description', SUM(description = '') FROM records WHERE IFNULL(created, '') >= ?1 "
+        "UNION ALL SELECT 'Tags', SUM(tags = '') FROM records WHERE IFNULL(created, '') >= ?1",
+        (str(start or ''),))
+
+
+def _user_activity(conn, start):
+    return ('User', 'Events', 'Last Seen'), conn.execute(
+        "SELECT user, COUNT(*), datetime(MAX(ts), 'unixepoch') FROM activity "
+        "WHERE ts >= ? GROUP BY user ORDER BY 2 DESC", (_since(start),))
+
+
+def _custom(conn, start):
+    return ('ID', 'Name', 'Category', 'Created', 'Modified', 'Status', 'Priority', 'Assigned'), conn.execute(
+        "SELECT id, name, category, created, modified, status, priority, assigned "
+        "FROM records WHERE IFNULL(created, '') >= ? ORDER BY seq", (str(start or ''),))
+
+
+QUERIES = {
+    'Usage Analytics': _usage_analytics,
+    'Performance Metrics': _performance_metrics,
+    'Security Audit': _security_audit,
+    'Data Quality Report': _data_quality,
+    'User Activity Report': _user_activity,
+    'Custom Report': _custom,
+}
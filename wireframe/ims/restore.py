@@ -0,0 +1,273 @@
+"""Selective restore from the backups written by ``ims.backup``.
+
+A restore rebuilds the chosen backup into a staging database (the full
+snapshot, then each incremental in turn) while, in parallel, attachment
+blobs are decompressed back into the blob store.  Every file is checked
+against the checksum in its manifest as it is streamed.
+
+Nothing live is touched until both have succeeded.  The selected tables
+are then swapped in from the staging database in a single transaction,
+so a failed or interrupted restore leaves the store exactly as it was.
+ID sequences only ever move forward, and the outgoing mail and report
+job queues are left alone.
+Blob files are content-addressed and only ever added, each with an
+atomic rename.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import activity
+from . import extract
+from . import metrics
+from . import search as search_index
+from .backup import (COPY_CHUNK, DERIVED_TABLES, FULL, INCREMENTAL_KEYS, TRANSIENT_TABLES,
+                     BackupError, backup_chain, open_verified)
+
+COMPONENTS = ('Database', 'User Files', 'System Settings', 'User Accounts')
+
+DATABASE, FILES = 'Database', 'User Files'
+
+# Component -> tables it owns; 'Database' owns every other table
+COMPONENT_TABLES = {
+    'System Settings': ('settings',),
+    'User Accounts': ('users',),
+}
+
+# Never replaced by a restore: id counters only move forward (merged in
+# as the larger of live and backup), and the work queues belong to the
+# running server
+KEPT_TABLES = ('sequences',) + TRANSIENT_TABLES
+
+DEFAULT_WORKERS = 4
+
+# Bumped on every restore so open RecordStores know to reload their indexes
+RESTORE_EPOCH = 'restore'
+
+
+def restore_backup(db_path, blob_root, backup_dir, backup_id, components,
+                   workers=DEFAULT_WORKERS):
+    """Restore ``components`` of ``backup_id`` and return a summary dict.
+
+    The summary maps each component to the number of rows (or files)
+    restored.  Raises BackupError, leaving everything unchanged, if any
+    file is missing or fails its checksum.
+    """
+    unknown = set(components) - set(COMPONENTS)
+    if unknown:
+        raise ValueError(f"Unknown restore components: {', '.join(sorted(unknown))}")
+    chain = backup_chain(backup_dir, backup_id)
+    if not chain or chain[0]['kind'] != FULL:
+        raise BackupError(f"Backup {backup_id} has no full backup to start from")
+    started = time.time()
+    db_components = [c for c in components if c != FILES]
+    summary = {}
+
+    staging_dir = tempfile.mkdtemp(prefix='restore-', dir=backup_dir)
+    staging = os.path.join(staging_dir, 'staging.sqlite')
+    try:
+        # Database staging and blob files don't depend on each other
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            staged = (pool.submit(_stage_database, backup_dir, chain, staging)
+                      if db_components else None)
+            files = (pool.submit(_restore_files, backup_dir, chain, blob_root, workers)
+                     if FILES in components else None)
+            # Wait for both before raising, so nothing is left running
+            errors = [f.exception() for f in (staged, files) if f is not None]
+            for error in errors:
+                if error is not None:
+                    raise error
+        if files is not None:
+            summary[FILES] = files.result()
+        if db_components:
+            summary.update(_swap_in(db_path, staging, db_components))
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+    summary['duration'] = time.time() - started
+    return summary
+
+
+def _component_tables(component, tables):
+    if component == DATABASE:
+        owned = {t for names in COMPONENT_TABLES.values() for t in names}
+        return [t for t in tables if t not in owned and t not in KEPT_TABLES]
+    return [t for t in tables if t in COMPONENT_TABLES[component]]
+
+
+def _stage_database(backup_dir, chain, staging):
+    """Rebuild the database as of the last backup in ``chain`` at ``staging``."""
+    full = chain[0]
+    name = next(n for n in full['files'] if n.startswith('database.sqlite'))
+    with open_verified(backup_dir / full['id'] / name, full['codec'],
+                       full['files'][name]['sha256']) as stream, \
+            open(staging, 'wb') as out:
+        shutil.copyfileobj(stream, out, COPY_CHUNK)
+
+    conn = sqlite3.connect(staging, isolation_level=None)
+    try:
+        # The staging copy is only read from; guards and derived-table
+        # triggers would only slow the replay down
+        for (trigger,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger'").fetchall():
+            conn.execute(f"DROP TRIGGER {trigger}")
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        for backup in chain[1:]:
+            conn.execute("BEGIN")
+            for table in backup['tables']:
+                _replay(conn, backup_dir, backup, table)
+            conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def _replay(conn, backup_dir, backup, table):
+    name = next(n for n in backup['files'] if n.startswith(f'tables/{table}.jsonl'))
+    try:
+        _replay_rows(conn, backup_dir / backup['id'] / name, backup['codec'],
+                     backup['files'][name]['sha256'], table)
+    except ValueError as error:
+        raise BackupError(f"Corrupt backup file {backup['id']}/{name}: {error}") from None
+
+
+def _replay_rows(conn, path, codec, sha256, table):
+    with open_verified(path, codec, sha256) as stream:
+        lines = iter(stream)
+        header = json.loads(next(lines))
+        columns = header['columns']
+        column_list = ', '.join(columns)
+        # Tables created after the full backup are not in the snapshot yet;
+        # they need their real keys for the replacing inserts below
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+                            (table,)).fetchone():
+            for sql in header.get('schema') or [f"CREATE TABLE {table} ({column_list})"]:
+                conn.execute(sql)
+        if table in INCREMENTAL_KEYS:
+            verb = "INSERT OR REPLACE"
+        else:
+            # Copied whole in every backup
+            conn.execute(f"DELETE FROM {table}")
+            verb = "INSERT"
+        conn.executemany(
+            f"{verb} INTO {table} ({column_list}) VALUES ({', '.join('?' * len(columns))})",
+            (json.loads(line) for line in lines))
+
+
+def _restore_files(backup_dir, chain, blob_root, workers):
+    """Put every blob held by ``chain`` back in the blob store; returns the count."""
+    wanted = {}
+    for backup in chain:
+        for sha256 in backup['blobs']:
+            wanted[sha256] = backup
+    tmp_dir = blob_root / 'tmp'
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+
+    def restore(item):
+        sha256, backup = item
+        target = blob_root / 'blobs' / sha256[:2] / sha256
+        if target.exists():
+            # Content-addressed: an existing file is already correct
+            return 0
+        name = next(n for n in backup['files'] if n.startswith(f'blobs/{sha256}'))
+        digest = hashlib.sha256()
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with open_verified(backup_dir / backup['id'] / name, backup['codec'],
+                               backup['files'][name]['sha256']) as stream, \
+                    os.fdopen(fd, 'wb') as out:
+                for chunk in iter(lambda: stream.read(COPY_CHUNK), b''):
+                    digest.update(chunk)
+                    out.write(chunk)
+            if digest.hexdigest() != sha256:
+                raise BackupError(f"Blob {sha256} does not match its hash")
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return 1
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return sum(pool.map(restore, wanted.items()))
+
+
+def _swap_in(db_path, staging, components):
+    """Replace the components' tables in the live database in one transaction."""
+    conn = sqlite3.connect(str(db_path), isolation_level=None, timeout=30)
+    try:
+        conn.execute("ATTACH DATABASE ? AS staged", (staging,))
+        live = _tables(conn, 'main')
+        staged = _tables(conn, 'staged')
+        summary = {}
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            epoch = conn.execute(
+                "SELECT next FROM sequences WHERE name = ?", (RESTORE_EPOCH,)).fetchone()
+            restored = set()
+            for component in components:
+                rows = 0
+                for table in _component_tables(component, staged):
+                    if table in live:
+                        rows += _copy_table(conn, table)
+                        restored.add(table)
+                summary[component] = rows
+            if 'records' in restored:
+                metrics.rebuild(conn)
+                search_index.rebuild(conn)
+            if restored & {'records', 'attachments', 'blob_text'} and 'blob_text' in live:
+                extract.reindex_all(conn)
+            if 'activity' in restored:
+                activity.rebuild_rollup(conn)
+            if 'sequences' in staged and 'sequences' in live:
+                # Ids handed out since the backup must never be reused
+                conn.execute(
+                    "INSERT INTO main.sequences (name, next) "
+                    "SELECT name, next FROM staged.sequences WHERE name != ? "
+                    "ON CONFLICT (name) DO UPDATE SET next = MAX(next, excluded.next)",
+                    (RESTORE_EPOCH,))
+            conn.execute(
+                "INSERT INTO sequences (name, next) VALUES (?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET next = excluded.next",
+                (RESTORE_EPOCH, (epoch[0] if epoch else 0) + 1))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("DETACH DATABASE staged")
+    finally:
+        conn.close()
+    return summary
+
+
+def _copy_table(conn, table):
+    live_columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({table})")]
+    staged_columns = {row[1] for row in conn.execute(f"PRAGMA staged.table_info({table})")}
+    columns = ', '.join(c for c in live_columns if c in staged_columns)
+    # Triggers (append-only guards, metrics, search) are set aside for the
+    # bulk copy; the derived tables are rebuilt afterwards
+    triggers = conn.execute(
+        "SELECT name, sql FROM main.sqlite_master WHERE type = 'trigger' AND tbl_name = ?",
+        (table,)).fetchall()
+    for name, _ in triggers:
+        conn.execute(f"DROP TRIGGER main.{name}")
+    conn.execute(f"DELETE FROM main.{table}")
+    cur = conn.execute(
+        f"INSERT INTO main.{table} ({columns}) SELECT {columns} FROM staged.{table}")
+    for _, sql in triggers:
+        conn.execute(sql)
+    return cur.rowcount
+
+
+def _tables(conn, schema):
+    names = [row[0] for row in conn.execute(
+        f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table' "
+        "AND name NOT LIKE 'sqlite_%' ORDER BY name")]
+    return [name for name in names
+            if not any(name == d or name.startswith(d + '_') for d in DERIVED_TABLES)]
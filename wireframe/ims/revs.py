@@ -0,0 +1,21 @@
+"""Write revisions for tables that are backed up incrementally.
+
+Every insert or update of such a table sets its ``rev`` column to
+``next_rev(table)``, computed inside the writing statement, so the value is
+assigned under the database write lock and grows in commit order.  An
+incremental backup (see ``ims.backup``) then copies exactly the rows with
+a rev above its parent's; timestamps taken before the write would not
+be safe for that.
+"""
+
+def install(conn, table):
+    """Add ``rev`` (and its index) to a ``table`` created by an older release."""
+    present = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if 'rev' not in present:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN rev INTEGER NOT NULL DEFAULT 0")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_rev ON {table} (rev)")
+
+
+def next_rev(table):
+    """SQL for the next revision of ``table``, for use inside the write."""
+    return f"(SELECT COALESCE(MAX(rev), 0) + 1 FROM {table})"
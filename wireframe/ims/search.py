@@ -0,0 +1,102 @@
+"""Full-text index over record Name, Tags, Description and attachments.
+
+The index is an SQLite FTS5 table (an inverted token index with prefix
+indexes for 2 and 3 characters) that shares rowids with ``records.seq``.
+Triggers keep it in step with every insert, update and delete, so it is
+built incrementally no matter which code path writes the record.  The
+``attachments`` column is filled in later by the extraction workers
+(see ``ims.extract``).
+"""
+
+import re
+
+# Column weights for bm25(): a hit in the name counts most
+RANK_WEIGHTS = (10.0, 5.0, 1.0, 0.5)
+
+COLUMNS = ('name', 'tags', 'description', 'attachments')
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS records_fts USING fts5(
+    name, tags, description, attachments,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+CREATE TRIGGER IF NOT EXISTS records_fts_insert AFTER INSERT ON records BEGIN
+    INSERT INTO records_fts (rowid, name, tags, description)
+    VALUES (new.seq, new.name, new.tags, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS records_fts_update
+AFTER UPDATE OF name, tags, description ON records BEGIN
+    UPDATE records_fts
+    SET name = new.name, tags = new.tags, description = new.description
+    WHERE rowid = new.seq;
+END;
+CREATE TRIGGER IF NOT EXISTS records_fts_delete AFTER DELETE ON records BEGIN
+    DELETE FROM records_fts WHERE rowid = old.seq;
+END;
+"""
+
+OPERATORS = ('AND', 'OR', 'NOT')
+
+_TERM = re.compile(r'"[^"]*"?|\S+')
+_WORD = re.compile(r'\w+')
+
+
+def install(conn):
+    """Create the index on ``conn`` and backfill it for older databases."""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(records_fts)")]
+    if columns and tuple(columns) != COLUMNS:
+        # Built by an older version with fewer columns
+        conn.execute("DROP TABLE records_fts")
+    conn.executescript(SCHEMA)
+    indexed = conn.execute("SELECT COUNT(*) FROM records_fts").fetchone()[0]
+    if indexed == 0:
+        conn.execute(
+            "INSERT INTO records_fts (rowid, name, tags, description) "
+            "SELECT seq, name, tags, description FROM records")
+
+
+def rebuild(conn):
+    """Re-index every record from scratch (e.g. after a restore).
+
+    The ``attachments`` column is left empty; ``ims.extract.reindex_all``
+    fills it back in.
+    """
+    conn.execute("DELETE FROM records_fts")
+    conn.execute(
+        "INSERT INTO records_fts (rowid, name, tags, description) "
+        "SELECT seq, name, tags, description FROM records")
+
+
+def match_expression(query):
+    """Translate a search box query into an FTS5 MATCH expression.
+
+    Plain words become prefix terms (``proj`` matches "project"), quoted
+    text is matched as an exact phrase, and the AND / OR / NOT operators
+    from the Quick Reference are passed through.  Returns None when the
+    query has nothing searchable in it.
+    """
+    parts = []
+    for term in _TERM.findall(query):
+        if term in OPERATORS:
+            if parts and parts[-1] not in OPERATORS:
+                parts.append(term)
+            continue
+        if term.startswith('"'):
+            words = _WORD.findall(term)
+            if words:
+                parts.append('"%s"' % ' '.join(words))
+            continue
+        words = _WORD.findall(term)
+        if words:
+            parts.append('"%s"*' % ' '.join(words))
+    while parts and parts[-1] in OPERATORS:
+        parts.pop()
+    if not parts:
+        return None
+    return ' '.join(parts)
+
+
+def rank_expression():
+    weights = ', '.join(str(w) for w in RANK_WEIGHTS)
+    return f"bm25(records_fts, {weights})"
@@ -0,0 +1,101 @@
+"""System Settings persisted in the ``settings`` table.
+
+Values are read far more often than they are written, so the store
+keeps one read-only snapshot for the whole process.  Saving through the
+store replaces the snapshot straight away; changes made by other
+processes are picked up once the snapshot is older than ``ttl`` seconds.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from types import MappingProxyType
+
+DEFAULTS = {
+    'company_name': 'Corporate Systems Client',
+    'system_name': 'Information Management System',
+    'time_zone': 'UTC-5 (EST)',
+    'language': 'English',
+    'smtp_server': 'mail.company.com',
+    'smtp_port': 587,
+    'email_from': 'noreply@company.com',
+    'session_timeout': 30,
+    'password_policy': 'Standard',
+    'two_factor': True,
+    'login_attempts': 3,
+    'backup_frequency': 'Daily',
+    'retention_period': 365,
+    'auto_archive': True,
+    # Directory sync source: an LDIF file path or an ldap[s]:// URL
+    'directory_source': '',
+    'directory_base_dn': '',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS settings (
+    key     TEXT PRIMARY KEY,
+    value   TEXT NOT NULL,
+    updated REAL NOT NULL,
+    user    TEXT NOT NULL DEFAULT ''
+) WITHOUT ROWID;
+"""
+
+DEFAULT_TTL = 60
+
+
+class SettingsStore:
+    """Cached key/value settings with defaults for anything never saved."""
+
+    def __init__(self, db_path, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._snapshot = None
+        self._loaded = 0
+
+    def all(self):
+        """All settings as a read-only mapping, shared by every caller."""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._loaded < self.ttl:
+            return snapshot
+        with self._lock:
+            values = dict(DEFAULTS)
+            values.update((key, json.loads(value)) for key, value in
+                          self._conn.execute("SELECT key, value FROM settings"))
+            self._snapshot = MappingProxyType(values)
+            self._loaded = time.monotonic()
+            return self._snapshot
+
+    def get(self, key):
+        return self.all()[key]
+
+    def save(self, values, user=''):
+        """Store the settings in ``values`` that changed; returns their keys."""
+        current = self.all()
+        changed = {key: value for key, value in values.items()
+                   if key not in current or current[key] != value}
+        if changed:
+            now = time.time()
+            with self._lock:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._conn.executemany(
+                        "INSERT INTO settings (key, value, updated, user) VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT (key) DO UPDATE SET value = excluded.value, "
+                        "updated = excluded.updated, user = excluded.user",
+                        [(key, json.dumps(value), now, user) for key, value in changed.items()])
+                    self._conn.execute("COMMIT")
+                except Exception:
+                    self._conn.execute("ROLLBACK")
+                    raise
+        self.invalidate()
+        return list(changed)
+
+    def invalidate(self):
+        """Drop the snapshot so the next read comes from the database."""
+        with self._lock:
+            self._snapshot = None
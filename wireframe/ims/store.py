@@ -0,0 +1,586 @@
+"""Process-wide records store backed by SQLite.
+
+A single RecordStore is shared by every Streamlit session in the server
+process.  Records are kept on disk so they survive restarts, and pages
+only pull the rows they actually display instead of rebuilding a
+DataFrame of the whole collection on every rerun.
+"""
+
+import sqlite3
+import threading
+from itertools import islice
+
+from . import bitmaps
+from . import metrics
+from . import search as search_index
+from .bitmaps import BitmapIndex
+from .ids import IdAllocator
+from .profiling import timed
+
+# Display column -> SQL column
+COLUMNS = {
+    'ID': 'id',
+    'Name': 'name',
+    'Category': 'category',
+    'Created': 'created',
+    'Modified': 'modified',
+    'Status': 'status',
+    'Priority': 'priority',
+    'Assigned': 'assigned',
+}
+
+# Optional fields captured by the record form but not shown in the table.
+# Owner is a user's email and 'Shared With' a list of emails (see
+# ims.permissions), both stored lower-cased.
+EXTRA_COLUMNS = {
+    'Description': 'description',
+    'Tags': 'tags',
+    'Department': 'department',
+    'Visibility': 'visibility',
+    'Owner': 'owner',
+    'Shared With': 'shared_with',
+}
+
+# Columns added after the first release -> their definition
+ADDED_COLUMNS = {
+    'visibility': "TEXT NOT NULL DEFAULT 'Public'",
+    'owner': "TEXT NOT NULL DEFAULT ''",
+    'shared_with': "TEXT NOT NULL DEFAULT ''",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    seq         INTEGER PRIMARY KEY,
+    id          TEXT NOT NULL UNIQUE,
+    name        TEXT NOT NULL,
+    category    TEXT NOT NULL,
+    created     TEXT,
+    modified    TEXT,
+    status      TEXT,
+    priority    TEXT,
+    assigned    TEXT,
+    description TEXT NOT NULL DEFAULT '',
+    tags        TEXT NOT NULL DEFAULT '',
+    department  TEXT NOT NULL DEFAULT '',
+    visibility  TEXT NOT NULL DEFAULT 'Public',
+    owner       TEXT NOT NULL DEFAULT '',
+    shared_with TEXT NOT NULL DEFAULT '',
+    rev         INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sequences (
+    name TEXT PRIMARY KEY,
+    next INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_records_category ON records (category);
+CREATE INDEX IF NOT EXISTS idx_records_status ON records (status);
+CREATE INDEX IF NOT EXISTS idx_records_rev ON records (rev);
+CREATE INDEX IF NOT EXISTS idx_records_name ON records (name);
+CREATE INDEX IF NOT EXISTS idx_records_created ON records (IFNULL(created, ''));
+CREATE INDEX IF NOT EXISTS idx_records_modified ON records (IFNULL(modified, ''));
+"""
+
+# Fields with an in-memory bitmap index, usable as query filters.
+# shared_with holds several emails, each indexed on its own.
+INDEXED_FIELDS = ('category', 'status', 'priority', 'assigned',
+                  'visibility', 'owner', 'shared_with')
+
+# Separator of the emails stored in shared_with
+SHARE_SEPARATOR = '\n'
+
+# Values for optional columns missing from a record
+_DEFAULTS = {'description': '', 'tags': '', 'department': '',
+             'visibility': 'Public', 'owner': '', 'shared_with': ''}
+
+# Sort options for paged queries -> SQL sort key (backed by an index).
+# 'ID' walks the bitmap in seq order; 'Relevance' needs a search query.
+SORT_KEYS = {
+    'ID': None,
+    'Relevance': None,
+    'Name': 'name',
+    'Created': "IFNULL(created, '')",
+    'Modified': "IFNULL(modified, '')",
+}
+
+ID_PREFIX = 'IMS-'
+
+# Max bound parameters per "IN (...)" lookup
+_FETCH_CHUNK = 500
+
+
+class RecordStore:
+    """Thread-safe access to the records table.
+
+    Streamlit runs each session in its own thread, so one connection is
+    shared behind a lock.  WAL mode lets other processes (importers,
+    report workers) read while the app writes.
+
+    Category, Status, Priority and Assigned are served from a bitmap
+    index that is loaded once and then caught up from the ``rev`` column
+    after every write, including writes made by other processes.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        _add_columns(self._conn)
+        _lower_emails(self._conn)
+        search_index.install(self._conn)
+        metrics.install(self._conn)
+        self.ids = IdAllocator(self.reserve_block, format_id)
+        self.index = BitmapIndex(INDEXED_FIELDS)
+        self._indexed_rev = 0
+        self._data_version = None
+        self._restore_epoch = None
+        self._sync()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Writes
+
+    def seed(self, records):
+        """Load the initial records when the store is empty."""
+        with self._lock:
+            if self.count() == 0:
+                for record in records:
+                    self.add(record)
+
+    def add(self, record):
+        """Append one record (a dict keyed by display column names)."""
+        return self.add_many([record])
+
+    @timed('store.add_many')
+    def add_many(self, records):
+        """Append ``records`` in a single transaction.
+
+        Returns the seq of the last inserted record.  Either every record
+        is stored or, if any insert fails, none are.
+        """
+        rows = [_to_row(record) for record in records]
+        if not rows:
+            return None
+        names = list(dict.fromkeys(name for row in rows for name in row))
+        sql = (f"INSERT INTO records ({', '.join(names)}, rev) "
+               f"VALUES ({', '.join('?' * len(names))}, ?)")
+        self.skip_ids(row.get('id') for row in rows)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rev = self._next_rev()
+                self._conn.executemany(sql, (
+                    [row.get(name, _DEFAULTS.get(name)) for name in names] + [rev + i]
+                    for i, row in enumerate(rows)))
+                last = self._conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                # Keep the ID sequence ahead of any explicit IDs just stored
+                self._conn.execute(
+                    "UPDATE sequences SET next = MAX(next, ("
+                    "SELECT COALESCE(MAX(CAST(substr(id, ?) AS INTEGER)), 0) + 1 "
+                    "FROM records WHERE rev >= ? AND id GLOB ?)) WHERE name = 'record_id'",
+                    (len(ID_PREFIX) + 1, rev, ID_PREFIX + '[0-9]*'))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._catch_up()
+        return last
+
+    def _next_rev(self):
+        row = self._conn.execute(
+            "SELECT COALESCE(MAX(rev), 0) + 1 FROM records").fetchone()
+        return row[0]
+
+    # Index maintenance
+
+    def _sync(self):
+        """Catch the bitmap index up if another connection committed."""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            epoch = self._conn.execute(
+                "SELECT next FROM sequences WHERE name = 'restore'").fetchone()
+            if epoch is not None and epoch[0] != self._restore_epoch:
+                # Rows were replaced wholesale (see ims.restore); start over
+                self._restore_epoch = epoch[0]
+                self.index.clear()
+                self._indexed_rev = 0
+            since = self._indexed_rev
+            self._catch_up()
+            self._skip_taken(since)
+
+    def _skip_taken(self, since):
+        """Pass over block numbers other processes stored since ``since``."""
+        span = self.ids.span
+        if not span:
+            return
+        number = "CAST(substr(id, ?) AS INTEGER)"
+        cur = self._conn.execute(
+            f"SELECT {number} FROM records WHERE rev > ? AND id GLOB ? "
+            f"AND {number} BETWEEN ? AND ?",
+            (len(ID_PREFIX) + 1, since, ID_PREFIX + '[0-9]*', len(ID_PREFIX) + 1,
+             span.start, span.stop - 1))
+        self.ids.skip(row[0] for row in cur)
+
+    def _catch_up(self):
+        fields = ', '.join(INDEXED_FIELDS)
+        cur = self._conn.execute(
+            f"SELECT seq, {fields}, rev FROM records WHERE rev > ? ORDER BY rev",
+            (self._indexed_rev,))
+        last = [self._indexed_rev]
+
+        shared = INDEXED_FIELDS.index('shared_with') + 1
+
+        def rows():
+            for row in cur:
+                last[0] = row[-1]
+                row = list(row)[:-1]
+                row[shared] = tuple(row[shared].split(SHARE_SEPARATOR)) if row[shared] else ()
+                yield tuple(row)
+
+        self.index.apply(rows())
+        self._indexed_rev = last[0]
+
+    # Reads
+
+    def skip_ids(self, ids):
+        """Keep explicit ``ids`` (stored, or about to be) out of allocation.
+
+        They may fall in the block this process is allocating from.
+        """
+        self.ids.skip(n for n in map(_id_number, ids) if n is not None)
+
+    def reserve_block(self, count):
+        """Atomically take ``count`` numbers off the record ID sequence.
+
+        Returns ``(start, stop)``.  Safe across threads and processes;
+        callers normally go through ``self.ids`` instead.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._init_sequence()
+                start = self._conn.execute(
+                    "SELECT next FROM sequences WHERE name = 'record_id'").fetchone()[0]
+                self._conn.execute(
+                    "UPDATE sequences SET next = next + ? WHERE name = 'record_id'", (count,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return start, start + count
+
+    def _init_sequence(self):
+        # Start after the highest numbered ID already in use
+        self._conn.execute(
+            "INSERT OR IGNORE INTO sequences (name, next) "
+            "SELECT 'record_id', COALESCE(MAX(CAST(substr(id, ?) AS INTEGER)), 0) + 1 "
+            "FROM records WHERE id GLOB ?",
+            (len(ID_PREFIX) + 1, ID_PREFIX + '[0-9]*'))
+
+    @timed('store.existing_ids')
+    def existing_ids(self, ids):
+        """The subset of ``ids`` already used by stored records."""
+        ids = list(ids)
+        found = set()
+        with self._lock:
+            for start in range(0, len(ids), _FETCH_CHUNK):
+                chunk = ids[start:start + _FETCH_CHUNK]
+                cur = self._conn.execute(
+                    f"SELECT id FROM records WHERE id IN ({', '.join('?' * len(chunk))})",
+                    chunk)
+                found.update(row[0] for row in cur)
+        return found
+
+    # Reads take ``visible``: a bitmap of the records the caller may see
+    # (see ims.permissions), or None for no restriction.
+
+    @timed('store.count')
+    def count(self, search=None, visible=None, **filters):
+        """Number of records matching ``filters`` and ``search``."""
+        with self._lock:
+            bits = self._match(filters, visible)
+            if not search_index.match_expression(search or ''):
+                return bits.bit_count()
+            members = bitmaps.Membership(bits)
+            return sum(1 for rowid in self._search(search, ranked=False)
+                       if rowid in members)
+
+    @timed('store.facets')
+    def facets(self, fields, search=None, visible=None, **filters):
+        """Per-value counts for each of ``fields``.
+
+        Each field is counted under every filter except its own, which
+        is what a filter bar needs to show how many rows each choice
+        would leave.
+        """
+        with self._lock:
+            self._sync()
+            within = self.index.universe
+            if visible is not None:
+                within &= visible
+            if search_index.match_expression(search or ''):
+                within &= bitmaps.from_rowids(self._search(search, ranked=False))
+            result = {}
+            for field in fields:
+                others = {k: v for k, v in filters.items() if k != field}
+                bits = self.index.match(**others) & within
+                result[field] = self.index.counts(field, within=bits)
+        return result
+
+    @timed('store.query')
+    def query(self, search=None, limit=None, visible=None, **filters):
+        """Return matching records as dicts keyed by display column.
+
+        Results are in insertion order, or best match first when a
+        search query is given.
+        """
+        with self._lock:
+            bits = self._match(filters, visible)
+            if search_index.match_expression(search or ''):
+                members = bitmaps.Membership(bits)
+                rowids = (rowid for rowid in self._search(search)
+                          if rowid in members)
+            else:
+                rowids = bitmaps.iter_rowids(bits)
+            return self._fetch(list(islice(rowids, limit)))
+
+    @timed('store.page')
+    def page(self, sort='ID', descending=False, after=None, limit=50,
+             search=None, visible=None, **filters):
+        """Return ``(records, cursor)`` for one page of matching records.
+
+        Paging is keyset based: pass the returned cursor as ``after`` to
+        get the following page; it is None on the last page.  Only the
+        rows of the requested page are read from disk, whatever the
+        size of the result set.
+        """
+        with self._lock:
+            bits = self._match(filters, visible)
+            searching = bool(search_index.match_expression(search or ''))
+            if sort == 'Relevance' and searching:
+                return self._page_by_rank(search, bits, after or 0, limit)
+            if searching:
+                bits &= bitmaps.from_rowids(self._search(search, ranked=False))
+            key = SORT_KEYS.get(sort)
+            if key is None:
+                return self._page_by_seq(bits, descending, after, limit)
+            return self._page_by_key(key, bits, descending, after, limit)
+
+    def _page_by_seq(self, bits, descending, after, limit):
+        if descending:
+            rowids = bitmaps.iter_rowids_reverse(bits, below=after)
+        else:
+            rowids = bitmaps.iter_rowids(bits, 0 if after is None else after + 1)
+        rowids = list(islice(rowids, limit + 1))
+        cursor = rowids[limit - 1] if len(rowids) > limit else None
+        return self._fetch(rowids[:limit]), cursor
+
+    def _page_by_key(self, key, bits, descending, after, limit):
+        # Walk the sort index from the cursor and keep rows in the bitmap
+        members = bitmaps.Membership(bits)
+        op, direction = ('<', 'DESC') if descending else ('>', 'ASC')
+        sql = f"SELECT {key}, seq FROM records"
+        params = []
+        if after is not None:
+            sql += f" WHERE ({key}, seq) {op} (?, ?)"
+            params.extend(after)
+        sql += f" ORDER BY {key} {direction}, seq {direction}"
+        keys = []
+        for sort_value, rowid in self._conn.execute(sql, params):
+            if rowid in members:
+                keys.append((sort_value, rowid))
+                if len(keys) > limit:
+                    break
+        cursor = keys[limit - 1] if len(keys) > limit else None
+        return self._fetch([rowid for _, rowid in keys[:limit]]), cursor
+
+    def _page_by_rank(self, search, bits, offset, limit):
+        members = bitmaps.Membership(bits)
+        hits = (rowid for rowid in self._search(search) if rowid in members)
+        rowids = list(islice(hits, offset, offset + limit + 1))
+        cursor = offset + limit if len(rowids) > limit else None
+        return self._fetch(rowids[:limit]), cursor
+
+    # Aggregates (maintained by triggers, see ims.metrics)
+
+    @property
+    def version(self):
+        """Revision of the newest write; changes whenever any record does."""
+        with self._lock:
+            self._sync()
+            return self._indexed_rev
+
+    @timed('store.counts')
+    def counts(self):
+        with self._lock:
+            return metrics.read_counts(self._conn)
+
+    @timed('store.timeline')
+    def timeline(self, grain='day', start=None, end=None, latest=None):
+        with self._lock:
+            return metrics.read_timeline(self._conn, grain, start, end, latest)
+
+    def lookup(self, *criteria):
+        """``(position, bitmaps)``: one bitmap per ``(field, value)`` pair.
+
+        The bitmaps are read together, so they agree with each other and
+        with ``position``, which can be passed to ``acl_changes`` later.
+        """
+        with self._lock:
+            self._sync()
+            return self._position(), [self.index.lookup(field, value)
+                                      for field, value in criteria]
+
+    def acl_changes(self, since):
+        """``(position, rows)`` for the records written after ``since``.
+
+        Rows are ``(seq, visibility, owner, shared_with)`` with
+        shared_with as a tuple.  ``rows`` is None when the records were
+        replaced by a restore in between; start over from ``lookup``.
+        """
+        with self._lock:
+            self._sync()
+            position = self._position()
+            if since[0] != position[0]:
+                return position, None
+            cur = self._conn.execute(
+                "SELECT seq, visibility, owner, shared_with FROM records "
+                "WHERE rev > ? AND rev <= ? ORDER BY rev", (since[1], position[1]))
+            return position, [(seq, visibility, owner,
+                               tuple(shared.split(SHARE_SEPARATOR)) if shared else ())
+                              for seq, visibility, owner, shared in cur]
+
+    def _position(self):
+        # Index position: the restore epoch and the newest revision indexed
+        return self._restore_epoch, self._indexed_rev
+
+    @timed('store.get')
+    def get(self, record_id, visible=None):
+        """One record by ID, including the optional fields, or None.
+
+        'Shared With' comes back as a list of emails.
+        """
+        names = {**COLUMNS, **EXTRA_COLUMNS}
+        select = ', '.join(f'{sql} AS "{name}"' for name, sql in names.items())
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT seq, {select} FROM records WHERE id = ?", (record_id,)).fetchone()
+        if row is None or (visible is not None and not visible >> row['seq'] & 1):
+            return None
+        record = dict(row)
+        del record['seq']
+        shared = record['Shared With']
+        record['Shared With'] = shared.split(SHARE_SEPARATOR) if shared else []
+        return record
+
+    @timed('store.find_ids')
+    def find_ids(self, prefix, limit=20, visible=None):
+        """Record IDs starting with ``prefix``, for lazy ID pickers."""
+        with self._lock:
+            cur = self._conn.execute(
+                "SELECT seq, id FROM records WHERE id >= ? AND id < ? ORDER BY id",
+                (prefix, prefix + '\U0010ffff'))
+            if visible is not None:
+                members = bitmaps.Membership(visible)
+                cur = (row for row in cur if row[0] in members)
+            return [record_id for _, record_id in islice(cur, limit)]
+
+    def iter_chunks(self, chunk_size=10000, search=None, visible=None, **filters):
+        """Yield all matching records in ID order, ``chunk_size`` at a time.
+
+        The set of rows is fixed when iteration starts; the lock is only
+        held while each chunk is read, so a long export does not block
+        other sessions.
+        """
+        with self._lock:
+            bits = self._match(filters, visible)
+            if search_index.match_expression(search or ''):
+                bits &= bitmaps.from_rowids(self._search(search, ranked=False))
+        rowids = bitmaps.iter_rowids(bits)
+        while True:
+            chunk = list(islice(rowids, chunk_size))
+            if not chunk:
+                return
+            with self._lock:
+                records = self._fetch(chunk)
+            yield records
+
+    def _match(self, filters, visible):
+        self._sync()
+        bits = self.index.match(**filters)
+        if visible is not None:
+            bits &= visible
+        return bits
+
+    def _search(self, search, ranked=True):
+        """Rowids matching a search box query, best match first."""
+        sql = "SELECT rowid FROM records_fts WHERE records_fts MATCH ?"
+        if ranked:
+            sql += f" ORDER BY {search_index.rank_expression()}"
+        cur = self._conn.execute(sql, (search_index.match_expression(search),))
+        return [row[0] for row in cur]
+
+    def _fetch(self, rowids):
+        """Load records by rowid, keeping the order of ``rowids``."""
+        found = {}
+        for start in range(0, len(rowids), _FETCH_CHUNK):
+            chunk = rowids[start:start + _FETCH_CHUNK]
+            marks = ', '.join('?' * len(chunk))
+            cur = self._conn.execute(
+                f"SELECT seq, {_select_list()} FROM records WHERE seq IN ({marks})",
+                chunk)
+            for row in cur:
+                record = dict(row)
+                found[record.pop('seq')] = record
+        return [found[rowid] for rowid in rowids if rowid in found]
+
+
+def format_id(number):
+    return f"{ID_PREFIX}{number:03d}"
+
+
+def _id_number(record_id):
+    """The number in an ``IMS-<n>`` ID, or None for any other ID."""
+    if record_id and record_id.startswith(ID_PREFIX) and record_id[len(ID_PREFIX):].isdigit():
+        return int(record_id[len(ID_PREFIX):])
+    return None
+
+
+def _select_list():
+    return ', '.join(f'{sql} AS "{name}"' for name, sql in COLUMNS.items())
+
+
+def _to_row(record):
+    row = {}
+    for name, sql in {**COLUMNS, **EXTRA_COLUMNS}.items():
+        if name in record:
+            row[sql] = record[name]
+    if not isinstance(row.get('shared_with', ''), str):
+        row['shared_with'] = SHARE_SEPARATOR.join(row['shared_with'])
+    # Directory emails are case-insensitive; one spelling keeps the index exact
+    for column in ('owner', 'shared_with'):
+        if column in row:
+            row[column] = row[column].lower()
+    return row
+
+
+def _add_columns(conn):
+    """Bring a records table created by an older release up to date."""
+    present = {row[1] for row in conn.execute("PRAGMA table_info(records)")}
+    for column, definition in ADDED_COLUMNS.items():
+        if column not in present:
+            conn.execute(f"ALTER TABLE records ADD COLUMN {column} {definition}")
+
+
+def _lower_emails(conn):
+    """Lower-case owner and shared_with emails stored by older releases."""
+    conn.execute(
+        "UPDATE records SET owner = lower(owner), shared_with = lower(shared_with), "
+        "rev = (SELECT MAX(rev) + 1 FROM records) "
+        "WHERE owner != lower(owner) OR shared_with != lower(shared_with)")
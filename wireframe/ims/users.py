@@ -0,0 +1,283 @@
+"""Process-wide user directory backed by SQLite.
+
+One UserDirectory is shared by every Streamlit session, so the user list
+is held once per server instead of once per session.  Role, Department
+and Status filters are bitmap intersections (see ``ims.bitmaps``), name
+and email prefixes are range scans on case-insensitive indexes, and the
+User Management table only reads the rows of the page it shows.
+"""
+
+import sqlite3
+import threading
+from itertools import islice
+
+from . import bitmaps
+from .bitmaps import BitmapIndex
+from .profiling import timed
+
+# Display column -> SQL column
+COLUMNS = {
+    'Name': 'name',
+    'Email': 'email',
+    'Role': 'role',
+    'Department': 'department',
+    'Last Login': 'last_login',
+    'Status': 'status',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    uid        INTEGER PRIMARY KEY,
+    email      TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    name       TEXT NOT NULL COLLATE NOCASE,
+    role       TEXT NOT NULL,
+    department TEXT NOT NULL DEFAULT '',
+    last_login TEXT,
+    status     TEXT NOT NULL,
+    rev        INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sequences (
+    name TEXT PRIMARY KEY,
+    next INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_name ON users (name);
+CREATE INDEX IF NOT EXISTS idx_users_rev ON users (rev);
+"""
+
+# Columns a new user must have
+REQUIRED = frozenset(('email', 'name', 'role', 'status'))
+
+# Fields with an in-memory bitmap index, usable as filters
+INDEXED_FIELDS = ('role', 'department', 'status')
+
+# Upper bound for prefix range scans
+_PREFIX_END = '\U0010ffff'
+
+# Max bound parameters per "IN (...)" lookup
+_FETCH_CHUNK = 500
+
+
+class UserDirectory:
+    """Thread-safe access to the users table.
+
+    Users are matched on email (case-insensitively): writing a user whose
+    email is already present updates that user in place.  Like
+    RecordStore, the bitmap index is caught up from the ``rev`` column
+    after every write, including writes made by other processes.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False,
+                                     isolation_level=None, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self.index = BitmapIndex(INDEXED_FIELDS)
+        self._indexed_rev = 0
+        self._data_version = None
+        self._restore_epoch = None
+        self._sync()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Writes
+
+    def seed(self, users):
+        """Load the initial users when the directory is empty."""
+        with self._lock:
+            if self.count() == 0:
+                self.upsert_many(users)
+
+    @timed('users.upsert_many')
+    def upsert_many(self, users, deactivate=()):
+        """Insert or update ``users`` (dicts keyed by display column) at once.
+
+        Users are matched on Email; columns missing from a dict keep
+        their stored value, and a dict without Name, Role or Status only
+        updates an existing user.  The emails in ``deactivate`` are set
+        Inactive first, in the same transaction, so an address handed to
+        someone in ``users`` stays active.  Returns the number of users
+        given.
+        """
+        rows = [_to_row(user) for user in users]
+        deactivate = list(deactivate)
+        if not rows and not deactivate:
+            return 0
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rev = self._next_rev()
+                self._conn.executemany(
+                    "UPDATE users SET status = 'Inactive', rev = ? WHERE email = ?",
+                    ((rev + i, email) for i, email in enumerate(deactivate)))
+                rev += len(deactivate)
+                # One statement per distinct set of columns
+                groups = {}
+                for i, row in enumerate(rows):
+                    groups.setdefault(tuple(row), []).append(list(row.values()) + [rev + i])
+                for names, params in groups.items():
+                    names += ('rev',)
+                    if REQUIRED.issubset(names):
+                        updates = ', '.join(f"{name} = excluded.{name}"
+                                            for name in names if name != 'email')
+                        sql = (f"INSERT INTO users ({', '.join(names)}) "
+                               f"VALUES ({', '.join('?' * len(names))}) "
+                               f"ON CONFLICT (email) DO UPDATE SET {updates}")
+                    else:
+                        # Partial users can only update existing ones
+                        email = names.index('email')
+                        params = [p[:email] + p[email + 1:] + [p[email]] for p in params]
+                        names = names[:email] + names[email + 1:]
+                        sql = (f"UPDATE users SET {', '.join(f'{n} = ?' for n in names)} "
+                               "WHERE email = ?")
+                    self._conn.executemany(sql, params)
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._catch_up()
+        return len(rows)
+
+    def _next_rev(self):
+        return self._conn.execute("SELECT COALESCE(MAX(rev), 0) + 1 FROM users").fetchone()[0]
+
+    # Index maintenance
+
+    def _sync(self):
+        """Catch the bitmap index up if another connection committed."""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._data_version = version
+            epoch = self._conn.execute(
+                "SELECT next FROM sequences WHERE name = 'restore'").fetchone()
+            if epoch is not None and epoch[0] != self._restore_epoch:
+                # Rows were replaced wholesale (see ims.restore); start over
+                self._restore_epoch = epoch[0]
+                self.index.clear()
+                self._indexed_rev = 0
+            self._catch_up()
+
+    def _catch_up(self):
+        fields = ', '.join(INDEXED_FIELDS)
+        cur = self._conn.execute(
+            f"SELECT uid, {fields}, rev FROM users WHERE rev > ? ORDER BY rev",
+            (self._indexed_rev,))
+        last = [self._indexed_rev]
+
+        def rows():
+            for row in cur:
+                last[0] = row[-1]
+                yield tuple(row)[:-1]
+
+        self.index.apply(rows())
+        self._indexed_rev = last[0]
+
+    # Reads
+
+    @property
+    def version(self):
+        """Revision of the newest write; changes whenever any user does."""
+        with self._lock:
+            self._sync()
+            return self._indexed_rev
+
+    @timed('users.count')
+    def count(self, prefix=None, **filters):
+        """Number of users matching ``filters`` and the name/email ``prefix``."""
+        with self._lock:
+            return self._match(prefix, filters).bit_count()
+
+    @timed('users.page')
+    def page(self, after=None, limit=50, prefix=None, **filters):
+        """Return ``(users, cursor)`` for one page of users in name order.
+
+        Paging is keyset based like ``RecordStore.page``: pass the cursor
+        back as ``after`` for the next page; it is None on the last one.
+        """
+        with self._lock:
+            members = bitmaps.Membership(self._match(prefix, filters))
+            sql = "SELECT name, uid FROM users"
+            params = []
+            if after is not None:
+                sql += " WHERE (name, uid) > (?, ?)"
+                params.extend(after)
+            sql += " ORDER BY name, uid"
+            keys = []
+            for name, uid in self._conn.execute(sql, params):
+                if uid in members:
+                    keys.append((name, uid))
+                    if len(keys) > limit:
+                        break
+            cursor = keys[limit - 1] if len(keys) > limit else None
+            return self._fetch([uid for _, uid in keys[:limit]]), cursor
+
+    @timed('users.pick')
+    def pick(self, prefix, limit=20, **filters):
+        """Up to ``limit`` ``(email, name)`` pairs for a lazy user picker."""
+        with self._lock:
+            self._sync()
+            members = bitmaps.Membership(self.index.match(**filters))
+            # Walk the name and email indexes from the prefix, stopping
+            # after ``limit`` hits on each
+            found = {}
+            for column in ('name', 'email'):
+                cur = self._conn.execute(
+                    f"SELECT uid, email, name FROM users WHERE {column} >= ? AND {column} < ? "
+                    f"ORDER BY {column}", (prefix, prefix + _PREFIX_END))
+                hits = ((uid, (email, name)) for uid, email, name in cur if uid in members)
+                found.update(islice(hits, limit))
+            return sorted(found.values(), key=lambda pair: (pair[1].lower(), pair[0]))[:limit]
+
+    @timed('users.get')
+    def get(self, email):
+        """One user by email, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_select_list()} FROM users WHERE email = ?", (email,)).fetchone()
+        return dict(row) if row else None
+
+    def iter_chunks(self, chunk_size=10000, prefix=None, **filters):
+        """Yield all matching users in name order, ``chunk_size`` at a time."""
+        after = None
+        while True:
+            users, after = self.page(after, chunk_size, prefix, **filters)
+            if users:
+                yield users
+            if after is None:
+                return
+
+    def _match(self, prefix, filters):
+        self._sync()
+        bits = self.index.match(**filters)
+        if prefix:
+            cur = self._conn.execute(
+                "SELECT uid FROM users WHERE name >= ? AND name < ? "
+                "UNION SELECT uid FROM users WHERE email >= ? AND email < ?",
+                (prefix, prefix + _PREFIX_END) * 2)
+            bits &= bitmaps.from_rowids(row[0] for row in cur)
+        return bits
+
+    def _fetch(self, uids):
+        """Load users by uid, keeping the order of ``uids``."""
+        found = {}
+        for start in range(0, len(uids), _FETCH_CHUNK):
+            chunk = uids[start:start + _FETCH_CHUNK]
+            cur = self._conn.execute(
+                f"SELECT uid, {_select_list()} FROM users "
+                f"WHERE uid IN ({', '.join('?' * len(chunk))})", chunk)
+            for row in cur:
+                user = dict(row)
+                found[user.pop('uid')] = user
+        return [found[uid] for uid in uids if uid in found]
+
+
+def _select_list():
+    return ', '.join(f'{sql} AS "{name}"' for name, sql in COLUMNS.items())
+
+
+def _to_row(user):
+    return {sql: user[name] for name, sql in COLUMNS.items() if name in user}
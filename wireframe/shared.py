@@ -0,0 +1,169 @@
+"""Process-wide resources and helpers shared by the main script and pages.
+
+Only light imports belong here: this module is loaded on every rerun
+whatever the page, so pandas, Plotly and other heavy libraries are
+imported by the page modules that use them (see ``views``).
+"""
+
+import os
+from datetime import date, timedelta
+
+import streamlit as st
+import streamlit.components.v1 as components
+
+from ims.activity import ActivityLog
+from ims.attachments import AttachmentStore
+from ims.audit import AuditLog
+from ims.backup import BackupManager
+from ims.config import DATA_DIR, data_path
+from ims.dirsync import DirectorySync
+from ims.extract import ExtractionPool
+from ims.export import FORMATS as EXPORT_FORMATS, ExportError, export
+from ims.figcache import FigureCache
+from ims.mailer import MailQueue
+from ims.metrics import summarize
+from ims.permissions import PermissionResolver
+from ims.reference import SAMPLE_RECORDS, SAMPLE_USERS
+from ims.reports import ReportJobs
+from ims.settings import SettingsStore
+from ims.store import RecordStore
+from ims.users import UserDirectory
+
+# Signed-in user shown in the sidebar
+CURRENT_USER = 'John Smith'
+CURRENT_USER_EMAIL = 'john.smith@company.com'
+
+
+@st.cache_resource
+def get_record_store():
+    # One store per server process, shared by every session
+    store = RecordStore(data_path('ims.db'))
+    store.seed(SAMPLE_RECORDS)
+    return store
+
+
+@st.cache_resource
+def get_user_directory():
+    # One user directory per server process, shared by every session
+    directory = UserDirectory(data_path('ims.db'))
+    directory.seed(SAMPLE_USERS)
+    return directory
+
+
+@st.cache_resource
+def get_permission_resolver():
+    # Per-user visible-record bitmaps, cached until a record or user changes
+    return PermissionResolver(get_record_store(), get_user_directory())
+
+
+@st.cache_resource
+def get_directory_sync():
+    # Directory syncs run in a background thread, one at a time
+    return DirectorySync(data_path('ims.db'), get_user_directory())
+
+
+@st.cache_resource
+def get_audit_log():
+    # Audit events are written by one background thread per process
+    return AuditLog(DATA_DIR / 'audit')
+
+
+def audit(action, target='', detail=''):
+    # Security audit trail of the signed-in user; only queues the event
+    get_audit_log().record(action, CURRENT_USER_EMAIL, target, detail, st.context.ip_address or '')
+
+
+@st.cache_resource
+def get_figure_cache():
+    # Built charts are shared by all sessions until their data changes
+    return FigureCache()
+
+
+def show_chart(chart):
+    # Draws a cached Chart from its stored spec; the page body adds a margin
+    components.html(chart.html, height=chart.height + 20)
+
+
+@st.cache_resource
+def get_activity_log():
+    return ActivityLog(data_path('ims.db'))
+
+
+@st.cache_resource
+def get_attachment_store():
+    return AttachmentStore(data_path('ims.db'), DATA_DIR / 'attachments')
+
+
+@st.cache_resource
+def get_extraction_pool():
+    # Attachment text and thumbnails are produced in background workers
+    get_record_store()
+    return ExtractionPool(data_path('ims.db'), get_attachment_store())
+
+
+@st.cache_resource
+def get_backup_manager():
+    # Backups run in a background thread, also on the saved schedule
+    return BackupManager(data_path('ims.db'), DATA_DIR / 'attachments', DATA_DIR / 'backups')
+
+
+@st.cache_resource
+def get_settings_store():
+    # One settings snapshot per process, replaced whenever settings are saved
+    return SettingsStore(data_path('ims.db'))
+
+
+@st.cache_resource
+def get_mail_queue():
+    # Mail is only queued on the request path; one dispatcher sends it
+    return MailQueue(data_path('ims.db'), get_settings_store())
+
+
+@st.cache_resource
+def get_report_jobs():
+    # Reports are built in worker processes shared by all sessions
+    return ReportJobs(data_path('ims.db'), DATA_DIR / 'reports')
+
+
+def record_headline():
+    # Headline numbers for the sidebar and Dashboard, recomputed only when
+    # a record is written (or the day changes)
+    return _record_headline(get_record_store().version, date.today())
+
+
+@st.cache_data(max_entries=4)
+def _record_headline(version, today):
+    # Built from the store's materialized aggregates (constant time)
+    record_store = get_record_store()
+    counts = record_store.counts()
+    return counts, summarize(
+        counts,
+        record_store.timeline('day', start=today - timedelta(days=62)),
+        today
+    )
+
+
+def export_popover(label, key, make_chunks, columns, prefix):
+    # Stream the rows to a temporary file, then offer it for download
+    with st.popover(label, use_container_width=True):
+        export_format = st.selectbox("Format", list(EXPORT_FORMATS), key=f"{key}_format")
+        if st.button("Prepare export", key=f"{key}_prepare", use_container_width=True):
+            try:
+                with st.spinner("Exporting..."):
+                    st.session_state[key] = (export(make_chunks(), columns, export_format, prefix), export_format)
+            except ExportError as e:
+                st.error(str(e))
+        
+        prepared = st.session_state.get(key)
+        if prepared and os.path.exists(prepared[0]):
+            path, prepared_format = prepared
+            extension, mime = EXPORT_FORMATS[prepared_format]
+            with open(path, 'rb') as export_file:
+                st.download_button(
+                    f"Download {prepared_format}",
+                    data=export_file,
+                    file_name=f"{prefix}{extension}",
+                    mime=mime,
+                    key=f"{key}_download",
+                    use_container_width=True
+                )
@@ -0,0 +1,34 @@
+"""Test setup: make the ``ims`` package importable from the wireframe dir.
+
+The tests only touch ``ims``, which needs neither Streamlit nor pandas
+(apart from ``ims.importer``).
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def make_record(record_id, **fields):
+    """A record dict with the required columns filled in."""
+    record = {'ID': record_id, 'Name': f'Record {record_id}', 'Category': 'Documents',
+              'Created': '2026-01-15', 'Modified': '2026-01-15', 'Status': 'Active',
+              'Priority': 'Medium', 'Assigned': 'John Smith'}
+    record.update(fields)
+    return record
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / 'ims.db'
+
+
+@pytest.fixture
+def store(db_path):
+    from ims.store import RecordStore
+    store = RecordStore(db_path)
+    yield store
+    store.close()
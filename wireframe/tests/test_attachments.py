@@ -0,0 +1,18 @@
+import hashlib
+import io
+
+from ims.attachments import AttachmentStore
+
+
+def test_blobs_are_deduplicated_and_mapped(tmp_path, db_path):
+    attachments = AttachmentStore(db_path, tmp_path / 'attachments')
+    first, sha256 = attachments.attach('IMS-001', io.BytesIO(b'same bytes'), 'a.txt')
+    second, again = attachments.attach('IMS-002', io.BytesIO(b'same bytes'), 'b.txt')
+    assert sha256 == again == hashlib.sha256(b'same bytes').hexdigest()
+    assert first != second
+    assert [a['name'] for a in attachments.for_record('IMS-002')] == ['b.txt']
+    with attachments.open_blob(sha256) as blob:
+        assert bytes(blob) == b'same bytes'
+    _, empty = attachments.attach('IMS-003', io.BytesIO(b''), 'empty.txt')
+    with attachments.open_blob(empty) as blob:
+        assert blob == b''
@@ -0,0 +1,119 @@
+import sqlite3
+
+import pytest
+
+from ims import audit
+from ims.audit import AuditLog
+
+USERS = ('a@x.com', 'b@x.com', 'c@x.com')
+ACTIONS = ('User Login', 'Settings Updated')
+
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(audit, 'BLOCK_EVENTS', 4)
+
+
+@pytest.fixture
+def log_dir(tmp_path):
+    return tmp_path / 'audit'
+
+
+def fill(log, count=60):
+    """``count`` events one second apart from ts 1000, cycling users and actions."""
+    for n in range(count):
+        log.record(ACTIONS[n % 2], USERS[n % 3], target=f't{n}', ts=1000 + n)
+    log.flush()
+
+
+def expected(count=60, user=None, action=None, start=0, end=10 ** 9):
+    return [f't{n}' for n in reversed(range(count))
+            if (user is None or USERS[n % 3] == user)
+            and (action is None or ACTIONS[n % 2] == action)
+            and start <= 1000 + n < end]
+
+
+def targets(log, **criteria):
+    return [event['target'] for event in log.query(limit=None, **criteria)]
+
+
+def check_queries(log):
+    assert targets(log) == expected()
+    assert targets(log, user='b@x.com') == expected(user='b@x.com')
+    assert targets(log, user='a@x.com', action='User Login') == expected(
+        user='a@x.com', action='User Login')
+    assert targets(log, start=1010, end=1033) == expected(start=1010, end=1033)
+    assert targets(log, user='c@x.com', start=1005, end=1050) == expected(
+        user='c@x.com', start=1005, end=1050)
+    assert targets(log, user='nobody@x.com') == []
+    assert [e['target'] for e in log.query(limit=5)] == expected()[:5]
+
+
+def test_rollover_and_queries(log_dir):
+    log = AuditLog(log_dir, max_bytes=1000)
+    try:
+        fill(log)
+        # Segments may still be compressing; queries cover every state
+        check_queries(log)
+        assert log.stats()['events'] == 60
+        assert log.stats()['segments'] > 3
+    finally:
+        log.shutdown()
+
+
+def test_reopen_after_restart(log_dir):
+    log = AuditLog(log_dir, max_bytes=1000)
+    fill(log, 40)
+    log.shutdown()
+
+    log = AuditLog(log_dir, max_bytes=1000)
+    try:
+        assert list(log_dir.glob(f'*{audit.COMPRESSED_SUFFIX}'))
+        for n in range(40, 60):
+            log.record(ACTIONS[n % 2], USERS[n % 3], target=f't{n}', ts=1000 + n)
+        log.flush()
+        check_queries(log)
+    finally:
+        log.shutdown()
+
+
+def test_torn_last_line_is_dropped(log_dir):
+    log = AuditLog(log_dir)
+    fill(log, 3)
+    log.shutdown()
+    (active,) = log_dir.glob(f'*{audit.SUFFIX}')
+    with open(active, 'ab') as f:
+        f.write(b'{"ts":2000,"user":"a@')
+
+    log = AuditLog(log_dir)
+    try:
+        log.record('User Login', 'a@x.com', target='t3', ts=1003)
+        log.flush()
+        assert targets(log) == ['t3', 't2', 't1', 't0']
+    finally:
+        log.shutdown()
+
+
+def test_times_never_go_backwards(log_dir):
+    log = AuditLog(log_dir)
+    try:
+        log.record('User Login', 'a@x.com', target='late', ts=2000)
+        log.record('User Login', 'a@x.com', target='early', ts=1000)
+        log.flush()
+        assert [(e['target'], e['ts']) for e in log.query()] == [('early', 2000),
+                                                                 ('late', 2000)]
+    finally:
+        log.shutdown()
+
+
+def test_index_is_append_only(log_dir):
+    log = AuditLog(log_dir, max_bytes=200)
+    fill(log, 10)
+    log.shutdown()
+    conn = sqlite3.connect(log_dir / 'index.db')
+    try:
+        assert conn.execute("SELECT COUNT(*) FROM audit_segments").fetchone()[0] > 0
+        with pytest.raises(sqlite3.DatabaseError, match='append-only'):
+            conn.execute("DELETE FROM audit_segments")
+    finally:
+        conn.close()
@@ -0,0 +1,165 @@
+import io
+import json
+import sqlite3
+
+import pytest
+
+from conftest import make_record
+from ims import mailer, revs
+from ims.attachments import AttachmentStore
+from ims.backup import (FULL, INCREMENTAL, MANIFEST, BackupError, create_backup,
+                        list_backups)
+from ims.dirsync import sync_directory
+from ims.restore import restore_backup
+from ims.users import UserDirectory
+
+ALL = ['Database', 'User Files', 'System Settings', 'User Accounts']
+
+
+@pytest.fixture
+def site(tmp_path, db_path, store):
+    blob_root = tmp_path / 'attachments'
+    out_dir = tmp_path / 'backups'
+    out_dir.mkdir()
+    attachments = AttachmentStore(db_path, blob_root)
+    directory = UserDirectory(db_path)
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    conn.executescript(mailer.SCHEMA)
+    yield store, attachments, directory, conn, blob_root, out_dir
+    conn.close()
+    directory.close()
+
+
+def backup(site, kind):
+    store, attachments, directory, conn, blob_root, out_dir = site
+    return create_backup(store.path, blob_root, out_dir, kind=kind)
+
+
+def queue_mail(conn):
+    conn.execute("INSERT INTO outbox (kind, recipient, subject, body, status, next_attempt, "
+                 "created) VALUES ('test', 'a@x.com', 's', 'b', 'queued', 0, 0)")
+
+
+def test_full_and_incremental_round_trip(site):
+    store, attachments, directory, conn, blob_root, out_dir = site
+    store.add_many([make_record('IMS-001'), make_record('IMS-002')])
+    attachments.attach('IMS-001', io.BytesIO(b'first file'), 'a.txt')
+    directory.upsert_many([{'Email': 'a@x.com', 'Name': 'A', 'Role': 'User',
+                            'Status': 'Active'}])
+    queue_mail(conn)
+    full = backup(site, FULL)
+    assert 'outbox' not in full['tables']
+
+    store.add(make_record('IMS-003', Status='Archived'))
+    _, sha256 = attachments.attach('IMS-003', io.BytesIO(b'second file'), 'b.txt')
+    directory.upsert_many([{'Email': 'a@x.com', 'Role': 'Manager'}])
+    incremental = backup(site, None)
+    assert incremental['kind'] == INCREMENTAL
+    assert incremental['parent'] == full['id']
+    # Only the rows written since the full backup
+    assert incremental['tables']['records'] == 1
+    assert incremental['tables']['attachments'] == 1
+    assert incremental['tables']['users'] == 1
+    assert incremental['blobs'] == [sha256]
+
+    # Changes after the backup, which the restore must undo or keep
+    store.add(make_record('IMS-004'))
+    store.ids.allocate_many(500)
+    queue_mail(conn)
+    (blob_root / 'blobs' / sha256[:2] / sha256).unlink()
+    ids_before = conn.execute(
+        "SELECT next FROM sequences WHERE name = 'record_id'").fetchone()[0]
+
+    summary = restore_backup(store.path, blob_root, out_dir, incremental['id'], ALL)
+    assert summary['User Files'] == 1
+    assert sorted(r['ID'] for r in store.query()) == ['IMS-001', 'IMS-002', 'IMS-003']
+    assert store.count(status='Archived') == 1
+    with attachments.open_blob(sha256) as f:
+        assert f.read() == b'second file'
+    assert directory.get('a@x.com')['Role'] == 'Manager'
+    # Work queues and ID sequences are not rolled back
+    assert conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0] == 2
+    assert conn.execute(
+        "SELECT next FROM sequences WHERE name = 'record_id'").fetchone()[0] == ids_before
+    assert store.ids.allocate() not in {'IMS-001', 'IMS-002', 'IMS-003'}
+
+
+class Source:
+    name = 'test'
+
+    def entries(self, since=None):
+        yield 'cn=a', {'mail': ['a@x.com'], 'cn': ['a']}
+
+
+def test_incremental_follows_write_revisions(site):
+    store, attachments, directory, conn, blob_root, out_dir = site
+    attachments.attach('IMS-001', io.BytesIO(b'first file'), 'a.txt')
+    full = backup(site, FULL)
+    # A run timestamped before the full backup but committed after it
+    sync_directory(store.path, directory, Source())
+    conn.execute("UPDATE directory_sync_runs SET started = 0, finished = 0")
+    first = backup(site, INCREMENTAL)
+    assert first['tables']['directory_sync_runs'] == 1
+    assert first['tables']['blobs'] == 0
+    # Nothing written since: nothing copied again
+    second = backup(site, INCREMENTAL)
+    assert second['tables']['directory_sync_runs'] == 0
+
+    # A parent from before revs were tracked has cursors on other columns
+    path = out_dir / second['id'] / MANIFEST
+    manifest = json.loads(path.read_text())
+    del manifest['keys']
+    path.write_text(json.dumps(manifest))
+    third = backup(site, INCREMENTAL)
+    assert third['tables']['directory_sync_runs'] == 1
+    assert third['tables']['blobs'] == 1
+    assert third['tables']['records'] == 0
+    assert full['keys']['blobs'] == 'rev'
+
+
+def test_restore_creates_tables_added_after_the_full_backup(site):
+    store, attachments, directory, conn, blob_root, out_dir = site
+    backup(site, FULL)
+    # The directory sync tables are created by the first sync
+    sync_directory(store.path, directory, Source())
+    backup(site, INCREMENTAL)
+    conn.execute("UPDATE directory_sync_runs SET error = 'Cancelled', "
+                 f"rev = {revs.next_rev('directory_sync_runs')}")
+    last = backup(site, INCREMENTAL)
+    assert last['tables']['directory_sync_runs'] == 1
+
+    restore_backup(store.path, blob_root, out_dir, last['id'], ALL)
+    # Replayed by primary key, so the rewritten run replaced the first copy
+    assert conn.execute("SELECT COUNT(*), MAX(error) FROM directory_sync_runs").fetchone() == (
+        1, 'Cancelled')
+
+
+def test_restore_selected_components_only(site):
+    store, attachments, directory, conn, blob_root, out_dir = site
+    store.add(make_record('IMS-001'))
+    directory.upsert_many([{'Email': 'a@x.com', 'Name': 'A', 'Role': 'User',
+                            'Status': 'Active'}])
+    full = backup(site, FULL)
+    store.add(make_record('IMS-002'))
+    directory.upsert_many([{'Email': 'a@x.com', 'Role': 'Viewer'}])
+
+    restore_backup(store.path, blob_root, out_dir, full['id'], ['User Accounts'])
+    assert directory.get('a@x.com')['Role'] == 'User'
+    assert store.count() == 2
+
+
+def test_corrupt_backup_leaves_store_untouched(site):
+    store, attachments, directory, conn, blob_root, out_dir = site
+    store.add(make_record('IMS-001'))
+    backup(site, FULL)
+    store.add(make_record('IMS-002'))
+    incremental = backup(site, INCREMENTAL)
+    store.add(make_record('IMS-003'))
+
+    name = next(n for n in incremental['files'] if n.startswith('tables/records.jsonl'))
+    path = out_dir / incremental['id'] / name
+    path.write_bytes(path.read_bytes()[:-4] + b'oops')
+    with pytest.raises(BackupError):
+        restore_backup(store.path, blob_root, out_dir, incremental['id'], ALL)
+    assert store.count() == 3
+    assert len(list_backups(out_dir)) == 2
@@ -0,0 +1,66 @@
+import sqlite3
+
+from conftest import make_record
+from ims import bitmaps
+from ims.backup import FULL, create_backup
+from ims.bitmaps import BitmapIndex
+from ims.restore import restore_backup
+from ims.store import RecordStore
+
+
+def test_apply_reindexes_changed_rows():
+    index = BitmapIndex(('status', 'tags'))
+    index.apply([(1, 'Active', ('a', 'b')), (2, 'Active', ()), (9, 'Archived', ('b',))])
+    assert index.match(status='Active') == 0b110
+    assert index.match(status='Active', tags='b') == 0b10
+    assert index.match(status=None) == index.universe
+    index.apply([(1, 'Archived', ('c',))])
+    assert index.counts('status') == {'Active': 1, 'Archived': 2}
+    assert index.counts('tags', within=index.lookup('status', 'Archived')) == {'b': 1, 'c': 1}
+    index.remove([9])
+    assert index.values('status') == ['Active', 'Archived']
+    assert index.match(status='Archived') == 0b10
+
+
+def test_rowid_helpers():
+    rowids = [0, 7, 8, 63, 64, 1000]
+    bits = bitmaps.from_rowids(rowids)
+    assert list(bitmaps.iter_rowids(bits)) == rowids
+    assert list(bitmaps.iter_rowids(bits, start=8)) == [8, 63, 64, 1000]
+    assert list(bitmaps.iter_rowids_reverse(bits)) == rowids[::-1]
+    assert list(bitmaps.iter_rowids_reverse(bits, below=64)) == [63, 8, 7, 0]
+    members = bitmaps.Membership(bits)
+    assert [n for n in range(1100) if n in members] == rowids
+
+
+def test_index_catches_up_on_updates_from_other_connections(store, db_path):
+    store.add_many([make_record('IMS-001'), make_record('IMS-002')])
+    assert store.count(status='Active') == 2
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("UPDATE records SET status = 'Archived', "
+                     "rev = (SELECT MAX(rev) + 1 FROM records) WHERE id = 'IMS-002'")
+    finally:
+        conn.close()
+    assert store.count(status='Active') == 1
+    assert store.facets(['status'])['status'] == {'Active': 1, 'Archived': 1}
+
+
+def test_restore_resets_the_index(store, db_path, tmp_path):
+    out_dir = tmp_path / 'backups'
+    out_dir.mkdir()
+    store.add(make_record('IMS-001'))
+    full = create_backup(db_path, tmp_path / 'attachments', out_dir, kind=FULL)
+    store.add(make_record('IMS-002', Status='Archived'))
+    assert store.count(status='Archived') == 1
+    # Restored by another process; the open store only sees the database change
+    restore_backup(db_path, tmp_path / 'attachments', out_dir, full['id'], ['Database'])
+    assert store.count() == 1
+    assert store.count(status='Archived') == 0
+    store.add(make_record('IMS-003', Status='Archived'))
+    assert [r['ID'] for r in store.query(status='Archived')] == ['IMS-003']
+    other = RecordStore(db_path)
+    try:
+        assert other.count() == 2
+    finally:
+        other.close()
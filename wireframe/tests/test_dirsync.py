@@ -0,0 +1,50 @@
+import pytest
+
+from ims.dirsync import FULL, INCREMENTAL, sync_directory
+from ims.users import UserDirectory
+
+
+class Source:
+    """A directory source over ``(dn, email)`` pairs."""
+
+    name = 'test'
+
+    def __init__(self, people):
+        self.people = people
+
+    def entries(self, since=None):
+        for dn, email in self.people:
+            yield dn, {'mail': [email], 'cn': [dn[3:]]}
+
+
+@pytest.fixture
+def directory(db_path):
+    directory = UserDirectory(db_path)
+    yield directory
+    directory.close()
+
+
+def statuses(directory):
+    users, _ = directory.page(limit=100)
+    return {user['Email']: user['Status'] for user in users}
+
+
+def test_full_sync_adds_and_deactivates(db_path, directory):
+    result = sync_directory(db_path, directory, Source([('cn=a', 'a@x.com'),
+                                                        ('cn=b', 'b@x.com')]), FULL)
+    assert (result.added, result.deactivated) == (2, 0)
+    result = sync_directory(db_path, directory, Source([('cn=a', 'a@x.com')]), FULL)
+    assert (result.unchanged, result.deactivated) == (1, 1)
+    assert statuses(directory) == {'a@x.com': 'Active', 'b@x.com': 'Inactive'}
+
+
+@pytest.mark.parametrize('batch_size', [1, 100])
+def test_changed_email_retires_the_old_one(db_path, directory, batch_size):
+    sync_directory(db_path, directory, Source([('cn=a', 'x@x.com'), ('cn=b', 'w@x.com')]), FULL)
+    # b takes a's old address before a moves on to a new one
+    result = sync_directory(db_path, directory,
+                            Source([('cn=b', 'x@x.com'), ('cn=a', 'y@x.com')]),
+                            INCREMENTAL, batch_size=batch_size)
+    assert result.updated == 2
+    assert statuses(directory) == {'w@x.com': 'Inactive', 'x@x.com': 'Active',
+                                   'y@x.com': 'Active'}
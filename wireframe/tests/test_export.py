@@ -0,0 +1,85 @@
+import csv
+import json
+import os
+import time
+
+import pytest
+
+from conftest import make_record
+from ims import export as exporter
+from ims.export import ExportError, export
+
+COLUMNS = ['ID', 'Name', 'Status']
+
+
+@pytest.fixture(autouse=True)
+def export_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(exporter, 'EXPORT_DIR', tmp_path / 'exports')
+    return tmp_path / 'exports'
+
+
+def test_csv_streams_store_chunks(store):
+    store.add_many([make_record(f'IMS-{n:03d}') for n in range(1, 26)])
+    path = export(store.iter_chunks(chunk_size=10), COLUMNS, 'CSV', prefix='records')
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [row['ID'] for row in rows] == [f'IMS-{n:03d}' for n in range(1, 26)]
+    assert set(rows[0]) == set(COLUMNS)
+    assert os.path.basename(path).startswith('records-')
+
+
+def test_json_lines_keeps_only_the_columns():
+    chunks = [[{'ID': 'IMS-001', 'Name': 'A', 'Extra': 1}], [{'ID': 'IMS-002'}]]
+    path = export(chunks, COLUMNS, 'JSON Lines')
+    with open(path, encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == [
+            {'ID': 'IMS-001', 'Name': 'A', 'Status': None},
+            {'ID': 'IMS-002', 'Name': None, 'Status': None}]
+
+
+def test_chunks_are_written_as_they_arrive(export_dir):
+    sizes = []
+
+    def chunks():
+        for n in range(3):
+            # Every earlier chunk is already on disk when the next is made
+            sizes.append(sum(p.stat().st_size for p in export_dir.iterdir()))
+            yield [{'ID': f'IMS-{n:03d}', 'Name': 'x' * 10000}]
+
+    export(chunks(), COLUMNS, 'JSON Lines')
+    assert sizes[0] < sizes[1] < sizes[2]
+
+
+def test_failed_export_leaves_no_file(export_dir):
+    def chunks():
+        yield [{'ID': 'IMS-001'}]
+        raise RuntimeError('store went away')
+
+    with pytest.raises(RuntimeError):
+        export(chunks(), COLUMNS, 'CSV')
+    assert list(export_dir.iterdir()) == []
+    with pytest.raises(ExportError):
+        export([], COLUMNS, 'PDF')
+
+
+def test_old_exports_are_removed(export_dir):
+    export_dir.mkdir()
+    old = export_dir / 'export-old.csv'
+    old.write_text('ID\n')
+    os.utime(old, (time.time() - exporter.MAX_AGE - 1,) * 2)
+    path = export([[{'ID': 'IMS-001'}]], COLUMNS, 'CSV')
+    assert [p.name for p in export_dir.iterdir()] == [os.path.basename(path)]
+
+
+def test_parquet(store):
+    pq = pytest.importorskip('pyarrow.parquet')
+    store.add_many([make_record('IMS-001'), make_record('IMS-002', Status='Archived')])
+    table = pq.read_table(export(store.iter_chunks(chunk_size=1), COLUMNS, 'Parquet'))
+    assert table.column('Status').to_pylist() == ['Active', 'Archived']
+
+
+def test_excel(store):
+    openpyxl = pytest.importorskip('openpyxl')
+    store.add_many([make_record('IMS-001'), make_record('IMS-002', Status='Archived')])
+    sheet = openpyxl.load_workbook(export(store.iter_chunks(), COLUMNS, 'Excel (XLSX)')).active
+    assert [cell.value for cell in sheet[3]] == ['IMS-002', 'Record IMS-002', 'Archived']
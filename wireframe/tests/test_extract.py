@@ -0,0 +1,41 @@
+import os
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from ims.attachments import AttachmentStore
+from ims.extract import PENDING, ExtractionPool
+
+
+@pytest.fixture
+def extraction(tmp_path, db_path):
+    pool = ExtractionPool(db_path, AttachmentStore(db_path, tmp_path / 'attachments'),
+                          workers=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_recycle_kills_busy_workers(extraction):
+    pool = extraction._pool
+    # A worker that has run a job has reported its pid, like one that timed out
+    pool.submit(os.getpid).result(timeout=60)
+    hung = pool.submit(time.sleep, 60)
+    while not hung.running():
+        time.sleep(0.01)
+    started = time.monotonic()
+    assert extraction._recycle(pool)
+    with pytest.raises(BrokenProcessPool):
+        hung.result(timeout=30)
+    assert time.monotonic() - started < 30
+    assert extraction._pool is not pool
+    # Only the first caller replaces a pool
+    assert not extraction._recycle(pool)
+
+
+def test_stats_counts_jobs_by_status(extraction):
+    extraction._stop.set()  # keep the consumers from picking the blob up
+    extraction._conn.execute(
+        "INSERT INTO blob_text (sha256, status, duration) VALUES ('abc', ?, 0.5)", (PENDING,))
+    stats = extraction.stats()
+    assert stats['pending'] == {'count': 1, 'avg_seconds': 0.5, 'max_seconds': 0.5}
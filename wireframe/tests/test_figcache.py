@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+from ims.figcache import DEFAULT_HEIGHT, FigureCache
+
+
+class Figure:
+    """Stand-in for a Plotly figure, serialized to a fixed-size page."""
+
+    def __init__(self, size=100, height=None):
+        self.size = size
+        self.layout = SimpleNamespace(height=height)
+
+    def to_html(self, **options):
+        return 'x' * self.size
+
+
+def test_serializes_once_per_version():
+    cache = FigureCache()
+    builds = []
+
+    def build(days):
+        builds.append(days)
+        return Figure(height=300)
+
+    chart = cache.get_or_build('timeline', 1, build, days=7)
+    assert cache.get_or_build('timeline', 1, build, days=7) is chart
+    assert chart.height == 300
+    cache.get_or_build('timeline', 2, build, days=7)
+    assert builds == [7, 7]
+    # The old version of the chart was dropped, not just aged out
+    assert cache.stats() == {'entries': 1, 'bytes': 100, 'hits': 1, 'misses': 2}
+
+
+def test_evicts_least_recently_used_over_budget():
+    cache = FigureCache(max_bytes=250)
+    first = cache.get_or_build('a', 0, Figure)
+    assert first.height == DEFAULT_HEIGHT
+    cache.get_or_build('b', 0, Figure)
+    cache.get_or_build('a', 0, Figure)
+    cache.get_or_build('c', 0, Figure)
+    assert cache.get_or_build('a', 0, Figure) is first
+    assert cache.stats()['entries'] == 2
+    # Too big to ever fit: built and returned but not kept
+    cache.get_or_build('d', 0, lambda: Figure(size=300))
+    assert cache.stats()['bytes'] == 200
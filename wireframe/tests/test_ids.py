@@ -0,0 +1,79 @@
+import threading
+
+from ims.ids import IdAllocator
+from ims.store import RecordStore, format_id
+
+
+class Sequence:
+    """In-memory stand-in for the shared sequence, counting reservations."""
+
+    def __init__(self):
+        self.next = 1
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def reserve(self, count):
+        with self._lock:
+            start, self.next = self.next, self.next + count
+            self.calls.append(count)
+        return start, start + count
+
+
+def test_serves_ids_from_blocks():
+    sequence = Sequence()
+    ids = IdAllocator(sequence.reserve, format_id, block_size=10)
+    assert [ids.allocate() for _ in range(25)] == [format_id(n) for n in range(1, 26)]
+    assert sequence.calls == [10, 10, 10]
+
+
+def test_large_batches_get_their_own_block():
+    sequence = Sequence()
+    ids = IdAllocator(sequence.reserve, format_id, block_size=10)
+    first = ids.allocate()
+    batch = ids.allocate_many(50)
+    assert batch == [format_id(n) for n in range(11, 61)]
+    # The small block is still being used up
+    assert ids.allocate() == format_id(2)
+    assert first == format_id(1)
+
+
+def test_threads_never_share_an_id():
+    sequence = Sequence()
+    ids = IdAllocator(sequence.reserve, format_id, block_size=7)
+    results = [[] for _ in range(8)]
+
+    def work(out):
+        for _ in range(500):
+            out.append(ids.allocate())
+
+    threads = [threading.Thread(target=work, args=(out,)) for out in results]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    allocated = [record_id for out in results for record_id in out]
+    assert len(allocated) == len(set(allocated)) == 4000
+
+
+def test_processes_sharing_a_database_never_collide(db_path):
+    # Two stores stand in for two server processes
+    first, second = RecordStore(db_path), RecordStore(db_path)
+    try:
+        allocated = []
+        for _ in range(150):
+            allocated.append(first.ids.allocate())
+            allocated.append(second.ids.allocate())
+        assert len(set(allocated)) == len(allocated)
+    finally:
+        first.close()
+        second.close()
+
+
+def test_skipped_numbers_are_passed_over():
+    sequence = Sequence()
+    ids = IdAllocator(sequence.reserve, format_id, block_size=10)
+    assert ids.allocate() == format_id(1)
+    ids.skip([2, 4, 25])
+    assert [ids.allocate() for _ in range(3)] == [format_id(3), format_id(5), format_id(6)]
+    # Skips only apply to the block they were reported for
+    assert ids.allocate_many(5) == [format_id(n) for n in range(7, 12)]
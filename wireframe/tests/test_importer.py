@@ -0,0 +1,81 @@
+import csv
+import io
+from datetime import date
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from conftest import make_record  # noqa: E402
+from ims import importer  # noqa: E402
+
+HEADER = ['ID', 'Name', 'Category', 'Priority', 'Status']
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=HEADER)
+
+
+def csv_source(rows):
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(HEADER)
+    writer.writerows(rows)
+    return io.BytesIO(out.getvalue().encode())
+
+
+@pytest.fixture(autouse=True)
+def import_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(importer, 'IMPORT_DIR', tmp_path / 'imports')
+
+
+def test_validate_defaults_and_reasons():
+    valid, rejected = importer.validate(frame([
+        ['', 'Plan', 'Documents', 'high', ''],
+        ['', '', 'Documents', '', ''],
+        ['', 'Sheet', '', '', ''],
+        ['', 'Memo', 'Documents', 'Urgent!', ''],
+    ]), 'Jane Doe', today=date(2026, 3, 1))
+    assert list(valid['Name']) == ['Plan']
+    row = valid.iloc[0]
+    assert (row['Priority'], row['Status']) == ('High', importer.DEFAULTS['Status'])
+    assert (row['Created'], row['Modified'], row['Assigned']) == ('2026-03-01', '2026-03-01',
+                                                                 'Jane Doe')
+    assert list(rejected['Reason']) == ['Missing Name', 'Missing Category', 'Unknown Priority']
+
+
+def test_duplicate_ids_only_count_valid_rows():
+    valid, rejected = importer.validate(frame([
+        ['IMS-900', '', 'Documents', '', ''],      # invalid: does not claim the ID
+        ['IMS-900', 'Kept', 'Documents', '', ''],
+        ['IMS-900', 'Second', 'Documents', '', ''],
+    ]), 'Jane Doe')
+    assert list(valid['Name']) == ['Kept']
+    assert list(rejected['Reason']) == ['Missing Name', 'Duplicate ID in file']
+
+
+def test_import_records(store):
+    store.add(make_record('IMS-002'))
+    source = csv_source([
+        ['', 'New', 'Documents', '', ''],
+        ['IMS-002', 'Exists', 'Documents', '', ''],
+        ['IMS-050', 'Explicit', 'Documents', '', ''],
+        ['', '', 'Documents', '', ''],
+    ])
+    result = importer.import_records(store, source, 'CSV', 'Jane Doe', batch_size=2)
+    assert (result.inserted, result.rejected) == (2, 2)
+    with open(result.rejected_path, newline='') as f:
+        reasons = [row['Reason'] for row in csv.DictReader(f)]
+    assert reasons == ['ID already exists', 'Missing Name']
+    assert store.get('IMS-050')['Name'] == 'Explicit'
+
+
+def test_generated_ids_avoid_explicit_ones(store):
+    # The cached block starts at IMS-001; the file claims the next numbers
+    assert store.ids.allocate() == 'IMS-001'
+    rows = [[f'IMS-{n:03d}', f'Explicit {n}', 'Documents', '', ''] for n in range(2, 6)]
+    rows += [['', f'Generated {n}', 'Documents', '', ''] for n in range(4)]
+    result = importer.import_records(store, csv_source(rows), 'CSV', 'Jane Doe')
+    assert (result.inserted, result.rejected) == (8, 0)
+    assert store.count() == 8
+    assert store.get('IMS-003')['Name'] == 'Explicit 3'
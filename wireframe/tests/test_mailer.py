@@ -0,0 +1,221 @@
+import base64
+import smtplib
+import socket
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from ims import mailer
+
+
+class Settings:
+    def __init__(self, server='smtp.test', port=25):
+        self.server = server
+        self.port = port
+
+    def all(self):
+        return {'smtp_server': self.server, 'smtp_port': str(self.port),
+                'email_from': 'ims@x.com'}
+
+
+class FakeSmtp:
+    """Accepts every message except those whose recipient names a failure."""
+
+    def __init__(self, sent):
+        self.sent = sent
+
+    def send_message(self, email):
+        to = email['To']
+        if to.startswith('refused'):
+            raise smtplib.SMTPRecipientsRefused({to: (550, b'No such user')})
+        if to.startswith('busy'):
+            raise smtplib.SMTPRecipientsRefused({to: (451, b'Try again later')})
+        if to.startswith('broken'):
+            raise ValueError('cannot encode message')
+        self.sent.append(to)
+
+    def noop(self):
+        return 250, b'OK'
+
+    def quit(self):
+        pass
+
+
+class SmtpServer:
+    """Just enough of an SMTP server on localhost for smtplib, one thread per client.
+
+    Recipients starting with "refused" are rejected with 550.
+    """
+
+    def __init__(self):
+        self.connections = 0
+        self.quits = 0
+        self.logins = []
+        self.received = []
+        self._sock = socket.create_server(('127.0.0.1', 0))
+        self._sock.settimeout(0.1)
+        self.port = self._sock.getsockname()[1]
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._accept, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        self._sock.close()
+
+    def _accept(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self._sock.accept()
+            except socket.timeout:
+                continue
+            self.connections += 1
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn, conn.makefile('rwb') as f:
+            def reply(*lines):
+                f.write(b''.join(line.encode() + b'\r\n' for line in lines))
+                f.flush()
+
+            reply('220 localhost ready')
+            recipients = []
+            for line in f:
+                verb, _, arg = line.decode().rstrip('\r\n').partition(' ')
+                verb = verb.upper()
+                if verb == 'EHLO':
+                    reply('250-localhost', '250 AUTH PLAIN')
+                elif verb == 'AUTH':
+                    _, user, password = base64.b64decode(arg.split()[1]).decode().split('\0')
+                    self.logins.append((user, password))
+                    reply('235 Authenticated')
+                elif verb == 'MAIL':
+                    recipients = []
+                    reply('250 OK')
+                elif verb == 'RCPT':
+                    address = arg[arg.index('<') + 1:arg.index('>')]
+                    if address.startswith('refused'):
+                        reply('550 No such user')
+                    else:
+                        recipients.append(address)
+                        reply('250 OK')
+                elif verb == 'DATA':
+                    reply('354 End data with <CR><LF>.<CR><LF>')
+                    for data in f:
+                        if data == b'.\r\n':
+                            break
+                    self.received.extend(recipients)
+                    reply('250 Queued')
+                elif verb in ('RSET', 'NOOP'):
+                    recipients = []
+                    reply('250 OK')
+                elif verb == 'QUIT':
+                    self.quits += 1
+                    reply('221 Bye')
+                    return
+                else:
+                    reply('502 Not implemented')
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    sent = []
+    monkeypatch.setattr(mailer, '_connect', lambda config: FakeSmtp(sent))
+    return sent
+
+
+@pytest.fixture
+def make_queue(db_path):
+    queues = []
+
+    def make(**options):
+        queue = mailer.MailQueue(db_path, Settings(), rate=1000, **options)
+        queues.append(queue)
+        return queue
+
+    yield make
+    for queue in queues:
+        queue.shutdown()
+
+
+def send(queue, db_path, recipients):
+    """Queue a test message to each recipient and wait for one attempt at each."""
+    queue.enqueue(mailer.compose('test', to, system_name='IMS') for to in recipients)
+    conn = sqlite3.connect(db_path)
+    try:
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            waiting = conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE attempts = 0 OR status = ?",
+                (mailer.SENDING,)).fetchone()[0]
+            if not waiting:
+                return queue.stats()
+            time.sleep(0.02)
+    finally:
+        conn.close()
+    raise AssertionError(f"outbox not drained: {queue.stats()}")
+
+
+def test_messages_are_sent(sent, make_queue, db_path):
+    recipients = [f'user{n}@x.com' for n in range(25)]
+    assert send(make_queue(), db_path, recipients) == {mailer.SENT: 25}
+    assert sorted(sent) == sorted(recipients)
+
+
+def test_one_bad_message_does_not_lose_the_batch(sent, make_queue, db_path):
+    queue = make_queue(pool_size=1)
+    stats = send(queue, db_path, ['a@x.com', 'broken@x.com', 'b@x.com', 'c@x.com'])
+    assert stats == {mailer.SENT: 3, mailer.FAILED: 1}
+    [failure] = queue.failures()
+    assert failure['recipient'] == 'broken@x.com'
+    assert 'cannot encode message' in failure['error']
+
+
+def test_permanent_and_temporary_refusals(sent, make_queue, db_path):
+    queue = make_queue()
+    stats = send(queue, db_path, ['refused@x.com', 'busy@x.com', 'ok@x.com'])
+    assert stats == {mailer.SENT: 1, mailer.FAILED: 1, mailer.QUEUED: 1}
+    assert [f['recipient'] for f in queue.failures()] == ['refused@x.com']
+
+
+def test_out_of_attempts_is_final(sent, make_queue, db_path):
+    queue = make_queue(max_attempts=1)
+    assert send(queue, db_path, ['busy@x.com']) == {mailer.FAILED: 1}
+
+
+def test_connection_failures_are_retried(monkeypatch, make_queue, db_path):
+    def refuse(config):
+        raise ConnectionRefusedError('connection refused')
+
+    monkeypatch.setattr(mailer, '_connect', refuse)
+    queue = make_queue()
+    assert send(queue, db_path, ['a@x.com', 'b@x.com']) == {mailer.QUEUED: 2}
+
+
+def test_rate_limiter_spaces_out_acquisitions():
+    limiter = mailer.RateLimiter(rate=50, burst=1)
+    started = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    assert time.monotonic() - started >= 0.09
+
+
+def test_real_smtp_connection_is_reused(monkeypatch, db_path):
+    server = SmtpServer()
+    monkeypatch.setenv(mailer.USER_ENV, 'ims')
+    monkeypatch.setenv(mailer.PASSWORD_ENV, 'secret')
+    queue = mailer.MailQueue(db_path, Settings('127.0.0.1', server.port), rate=1000,
+                             pool_size=1)
+    try:
+        send(queue, db_path, ['a@x.com', 'refused@x.com', 'b@x.com'])
+        assert send(queue, db_path, ['c@x.com']) == {mailer.SENT: 3, mailer.FAILED: 1}
+    finally:
+        queue.shutdown()
+        server.close()
+    assert server.received == ['a@x.com', 'b@x.com', 'c@x.com']
+    # One login and one connection for every batch, closed with QUIT on shutdown
+    assert (server.connections, server.quits) == (1, 1)
+    assert server.logins == [('ims', 'secret')]
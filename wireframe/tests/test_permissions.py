@@ -0,0 +1,123 @@
+import pytest
+
+from conftest import make_record
+from ims.permissions import (PRIVATE, PUBLIC, RESTRICTED, PermissionResolver, accessible,
+                             can_see, visibility_of)
+from ims.store import RecordStore
+from ims.users import UserDirectory
+
+JANE = 'jane@x.com'
+BOB = 'bob@x.com'
+ADMIN = 'admin@x.com'
+
+
+@pytest.fixture
+def directory(db_path):
+    directory = UserDirectory(db_path)
+    directory.upsert_many([
+        {'Email': JANE, 'Name': 'Jane', 'Role': 'User', 'Status': 'Active'},
+        {'Email': BOB, 'Name': 'Bob', 'Role': 'Manager', 'Status': 'Active'},
+        {'Email': ADMIN, 'Name': 'Admin', 'Role': 'Administrator', 'Status': 'Active'},
+    ])
+    yield directory
+    directory.close()
+
+
+@pytest.fixture
+def resolver(store, directory):
+    store.add_many([
+        make_record('IMS-001', Visibility=PUBLIC, Owner=BOB),
+        make_record('IMS-002', Visibility=PRIVATE, Owner=BOB),
+        make_record('IMS-003', Visibility=RESTRICTED, Owner=BOB, **{'Shared With': [JANE]}),
+        make_record('IMS-004', Visibility=PRIVATE, Owner=JANE),
+        # Shared, but private: the share list does not apply
+        make_record('IMS-005', Visibility=PRIVATE, Owner=BOB, **{'Shared With': [JANE]}),
+    ])
+    return PermissionResolver(store, directory)
+
+
+def visible_ids(store, bits):
+    return sorted(r['ID'] for r in store.query(visible=bits))
+
+
+def test_visibility_rules(store, resolver):
+    assert visible_ids(store, resolver.visible(JANE)) == ['IMS-001', 'IMS-003', 'IMS-004']
+    assert visible_ids(store, resolver.visible(BOB)) == ['IMS-001', 'IMS-002', 'IMS-003',
+                                                         'IMS-005']
+
+
+def test_administrators_and_unknown_users(resolver):
+    assert resolver.visible(ADMIN) is None
+    assert resolver.visible('nobody@x.com') == 0
+
+
+def test_cache_catches_up_with_record_writes(store, resolver):
+    before = resolver.visible(JANE)
+    store.add_many([
+        make_record('IMS-006', Visibility=RESTRICTED, Owner=BOB, **{'Shared With': [JANE]}),
+        make_record('IMS-007', Visibility=PRIVATE, Owner=BOB),
+    ])
+    after = resolver.visible(JANE)
+    assert visible_ids(store, after) == ['IMS-001', 'IMS-003', 'IMS-004', 'IMS-006']
+    assert after == accessible(store, JANE)[1]
+    assert before != after
+    assert resolver.misses == 1 and resolver.hits == 1
+
+
+def test_directory_changes_are_picked_up(store, directory, resolver):
+    assert resolver.visible(JANE) != 0
+    directory.upsert_many([{'Email': JANE, 'Status': 'Inactive'}])
+    assert resolver.visible(JANE) == 0
+    directory.upsert_many([{'Email': JANE, 'Status': 'Active', 'Role': 'Administrator'}])
+    assert resolver.visible(JANE) is None
+
+
+def test_least_recently_used_users_are_dropped(store, directory):
+    resolver = PermissionResolver(store, directory, max_users=1)
+    resolver.visible(JANE)
+    resolver.visible(BOB)
+    resolver.visible(JANE)
+    assert resolver.misses == 3
+
+
+def test_can_see_and_labels():
+    assert can_see(JANE, PUBLIC, BOB, ())
+    assert can_see(JANE, PRIVATE, JANE, ())
+    assert can_see(JANE, RESTRICTED, BOB, (JANE,))
+    assert not can_see(JANE, PRIVATE, BOB, (JANE,))
+    assert visibility_of('Restricted (Selected users)') == RESTRICTED
+    with pytest.raises(ValueError):
+        visibility_of('Secret')
+
+
+def test_emails_match_regardless_of_case(store, directory):
+    directory.upsert_many([{'Email': 'Carol.King@X.com', 'Name': 'Carol', 'Role': 'User',
+                            'Status': 'Active'}])
+    store.add_many([
+        make_record('IMS-001', Visibility=PRIVATE, Owner='CAROL.KING@x.com'),
+        make_record('IMS-002', Visibility=RESTRICTED, Owner=BOB,
+                    **{'Shared With': ['carol.king@X.COM']}),
+        make_record('IMS-003', Visibility=PRIVATE, Owner=BOB),
+    ])
+    resolver = PermissionResolver(store, directory)
+    for email in ('carol.king@x.com', 'Carol.King@X.com'):
+        assert visible_ids(store, resolver.visible(email)) == ['IMS-001', 'IMS-002']
+    # Caught-up entries apply the same rule
+    store.add(make_record('IMS-004', Visibility=RESTRICTED, Owner=BOB,
+                          **{'Shared With': ['CAROL.KING@X.COM']}))
+    assert visible_ids(store, resolver.visible('carol.king@x.com')) == [
+        'IMS-001', 'IMS-002', 'IMS-004']
+    assert can_see('Carol.King@x.com', RESTRICTED, BOB, ('CAROL.KING@X.COM',))
+
+
+def test_mixed_case_emails_from_older_releases_are_lowered(store, directory, db_path):
+    store.add(make_record('IMS-001', Visibility=PRIVATE, Owner=JANE))
+    store._conn.execute("UPDATE records SET owner = 'Jane@X.com'")
+    reopened = RecordStore(db_path)
+    try:
+        assert reopened.get('IMS-001')['Owner'] == JANE
+        # The already open store catches up with the rewrite
+        assert visible_ids(store, PermissionResolver(store, directory).visible(JANE)) == [
+            'IMS-001']
+    finally:
+        reopened.close()
@@ -0,0 +1,58 @@
+import pytest
+
+from conftest import make_record
+from ims.search import match_expression
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('proj', '"proj"*'),
+    ('budget AND plan', '"budget"* AND "plan"*'),
+    ('"annual report" OR memo', '"annual report" OR "memo"*'),
+    ('draft NOT final', '"draft"* NOT "final"*'),
+    # Operators need a term on each side; punctuation is not searchable
+    ('AND memo OR', '"memo"*'),
+    ('memo OR OR plan', '"memo"* OR "plan"*'),
+    ('e-mail', '"e mail"*'),
+    ('"unclosed phrase', '"unclosed phrase"'),
+    ('', None),
+    ('?! ""', None),
+])
+def test_match_expression(query, expected):
+    assert match_expression(query) == expected
+
+
+@pytest.fixture
+def records(store):
+    store.add_many([
+        make_record('IMS-001', Name='Budget plan 2026', Description='Quarterly figures'),
+        make_record('IMS-002', Name='Staff memo', Description='Budget cuts for the draft plan'),
+        make_record('IMS-003', Name='Annual report', Tags='final, finance'),
+        make_record('IMS-004', Name='Draft contract', Tags='legal'),
+    ])
+    return store
+
+
+def ids(records):
+    return [r['ID'] for r in records]
+
+
+def test_prefix_terms_and_ranking(records):
+    # A hit in the name outranks one in the description
+    assert ids(records.query(search='budg')) == ['IMS-001', 'IMS-002']
+    assert records.count(search='budget') == 2
+
+
+def test_operators_and_phrases(records):
+    assert ids(records.query(search='budget AND memo')) == ['IMS-002']
+    assert sorted(ids(records.query(search='memo OR contract'))) == ['IMS-002', 'IMS-004']
+    assert ids(records.query(search='budget NOT memo')) == ['IMS-001']
+    assert ids(records.query(search='"annual report"')) == ['IMS-003']
+    assert ids(records.query(search='"report annual"')) == []
+    assert ids(records.query(search='finance')) == ['IMS-003']
+
+
+def test_search_combines_with_filters(records):
+    records.add(make_record('IMS-005', Name='Budget archive', Status='Archived'))
+    assert ids(records.query(search='budget', status='Archived')) == ['IMS-005']
+    assert records.count(search='budget', status='Active') == 2
+    assert records.facets(['status'], search='budget')['status'] == {'Active': 2, 'Archived': 1}
@@ -0,0 +1,107 @@
+import sqlite3
+
+import pytest
+
+from conftest import make_record
+from ims.store import RecordStore
+
+
+def test_add_many_and_get(store):
+    last = store.add_many([make_record('IMS-001'),
+                           make_record('IMS-002', **{'Shared With': ['a@x.com', 'b@x.com']})])
+    assert last == 2
+    assert store.count() == 2
+    record = store.get('IMS-002')
+    assert record['Name'] == 'Record IMS-002'
+    assert record['Shared With'] == ['a@x.com', 'b@x.com']
+    assert store.get('IMS-001')['Shared With'] == []
+    assert store.get('IMS-404') is None
+
+
+def test_add_many_is_all_or_nothing(store):
+    store.add(make_record('IMS-001'))
+    with pytest.raises(sqlite3.IntegrityError):
+        store.add_many([make_record('IMS-002'), make_record('IMS-001')])
+    assert store.count() == 1
+    assert store.get('IMS-002') is None
+
+
+def test_filters_and_facets(store):
+    store.add_many([make_record('IMS-001', Status='Active', Priority='High'),
+                    make_record('IMS-002', Status='Active', Priority='Low'),
+                    make_record('IMS-003', Status='Archived', Priority='High')])
+    assert store.count(status='Active') == 2
+    assert store.count(status='Active', priority='High') == 1
+    assert [r['ID'] for r in store.query(priority='High')] == ['IMS-001', 'IMS-003']
+    facets = store.facets(['status'], priority='High')
+    assert facets['status'] == {'Active': 1, 'Archived': 1}
+
+
+def test_visible_restricts_reads(store):
+    store.add_many([make_record(f'IMS-00{n}') for n in range(1, 4)])
+    visible = 1 << 2  # seq 2 only
+    assert store.count(visible=visible) == 1
+    assert store.get('IMS-001', visible=visible) is None
+    assert store.get('IMS-002', visible=visible)['ID'] == 'IMS-002'
+    assert store.find_ids('IMS-', visible=visible) == ['IMS-002']
+
+
+def test_page_walks_every_row_once(store):
+    store.add_many([make_record(f'IMS-{n:03d}', Name=f'Name {n % 7}') for n in range(1, 26)])
+    for sort in ('ID', 'Name'):
+        seen, after = [], None
+        while True:
+            records, after = store.page(sort=sort, after=after, limit=10)
+            seen.extend(r['ID'] for r in records)
+            if after is None:
+                break
+        assert sorted(seen) == [f'IMS-{n:03d}' for n in range(1, 26)]
+        assert len(seen) == len(set(seen))
+
+
+def test_index_catches_up_with_other_connections(store, db_path):
+    store.add(make_record('IMS-001'))
+    other = RecordStore(db_path)
+    try:
+        other.add(make_record('IMS-002', Status='Archived'))
+    finally:
+        other.close()
+    assert store.count() == 2
+    assert store.count(status='Archived') == 1
+
+
+def test_sequence_stays_ahead_of_explicit_ids(store):
+    store.add(make_record('IMS-050'))
+    assert store.ids.allocate() == 'IMS-051'
+    store.add(make_record('IMS-500'))
+    # Another process starts a block after every ID stored so far
+    other = RecordStore(store.path)
+    try:
+        assert int(other.ids.allocate()[len('IMS-'):]) > 500
+    finally:
+        other.close()
+
+
+def test_cached_block_skips_explicit_ids(store):
+    store.add(make_record('IMS-001'))
+    assert store.ids.allocate() == 'IMS-002'
+    store.add_many([make_record('IMS-010'), make_record('IMS-005')])
+    allocated = [store.ids.allocate() for _ in range(20)]
+    assert 'IMS-005' not in allocated and 'IMS-010' not in allocated
+    store.add_many([make_record(record_id) for record_id in allocated])
+    assert store.count() == 23
+
+
+def test_cached_block_skips_ids_stored_by_other_processes(store, db_path):
+    first = store.ids.allocate()
+    other = RecordStore(db_path)
+    try:
+        # Another process imports a record numbered inside our block
+        taken = f'IMS-{int(first[len("IMS-"):]) + 2:03d}'
+        other.add(make_record(taken))
+    finally:
+        other.close()
+    store.count()  # any read catches up with the other process
+    allocated = [store.ids.allocate() for _ in range(5)]
+    assert taken not in allocated
+    store.add_many([make_record(record_id) for record_id in allocated])
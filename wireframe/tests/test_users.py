@@ -0,0 +1,80 @@
+import pytest
+
+from ims.users import UserDirectory
+
+
+def user(email, name, role='User', department='IT', status='Active'):
+    return {'Email': email, 'Name': name, 'Role': role, 'Department': department,
+            'Status': status}
+
+
+@pytest.fixture
+def directory(db_path):
+    directory = UserDirectory(db_path)
+    directory.upsert_many([
+        user('ann@x.com', 'Ann Lee', role='Administrator'),
+        user('bob@x.com', 'bob Stone', department='Finance'),
+        user('cara@x.com', 'Cara Diaz', status='Inactive'),
+        user('dan@x.com', 'Dan Brown', role='Manager', department='Finance'),
+    ])
+    yield directory
+    directory.close()
+
+
+def test_upsert_matches_email_case_insensitively(directory):
+    directory.upsert_many([user('ANN@x.com', 'Ann Lee-Park', role='Manager')])
+    assert directory.count() == 4
+    assert directory.get('ann@X.com')['Name'] == 'Ann Lee-Park'
+    assert directory.count(role='Manager') == 2
+
+
+def test_partial_users_only_update(directory):
+    directory.upsert_many([{'Email': 'bob@x.com', 'Role': 'Viewer'},
+                           {'Email': 'new@x.com', 'Role': 'Viewer'}])
+    assert directory.get('bob@x.com')['Role'] == 'Viewer'
+    assert directory.get('bob@x.com')['Department'] == 'Finance'
+    assert directory.get('new@x.com') is None
+
+
+def test_deactivate_before_reassigning(directory):
+    directory.upsert_many([user('cara@x.com', 'Cara Diaz')], deactivate=['cara@x.com',
+                                                                        'dan@x.com'])
+    assert directory.get('cara@x.com')['Status'] == 'Active'
+    assert directory.get('dan@x.com')['Status'] == 'Inactive'
+
+
+def test_filters_and_prefixes(directory):
+    assert directory.count(department='Finance') == 2
+    assert directory.count(department='Finance', role='Manager') == 1
+    assert directory.count(status='Inactive') == 1
+    # Name prefixes ignore case; email prefixes match too
+    assert directory.count(prefix='BO') == 1
+    assert directory.count(prefix='dan@') == 1
+    assert directory.count(prefix='da', department='Finance') == 1
+    assert directory.pick('c') == [('cara@x.com', 'Cara Diaz')]
+    assert directory.pick('', limit=2, department='Finance') == [('bob@x.com', 'bob Stone'),
+                                                                ('dan@x.com', 'Dan Brown')]
+
+
+def test_pages_walk_name_order(directory):
+    seen, after = [], None
+    while True:
+        users, after = directory.page(after, limit=3)
+        seen.extend(u['Name'] for u in users)
+        if after is None:
+            break
+    assert seen == ['Ann Lee', 'bob Stone', 'Cara Diaz', 'Dan Brown']
+    chunks = list(directory.iter_chunks(chunk_size=2, status='Active'))
+    assert [[u['Email'] for u in chunk] for chunk in chunks] == [
+        ['ann@x.com', 'bob@x.com'], ['dan@x.com']]
+
+
+def test_index_catches_up_with_other_connections(directory, db_path):
+    other = UserDirectory(db_path)
+    try:
+        other.upsert_many([user('eve@x.com', 'Eve Adams', role='Manager'),
+                           {'Email': 'ann@x.com', 'Status': 'Inactive'}])
+    finally:
+        other.close()
+    assert directory.count(role='Manager') == 2
+    assert directory.count(status='Inactive') == 2
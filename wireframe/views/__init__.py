@@ -0,0 +1,34 @@
+"""Page registry for the main script.
+
+Each page lives in its own module with a ``render()`` function.  A page
+module, and the libraries it needs (pandas, Plotly, ...), is imported
+the first time the page is shown, so the Training page never pays for
+pandas or Plotly and a cold start only loads the page being opened.  After that
+the module stays in ``sys.modules`` and a rerun just calls ``render()``.
+
+The package is called ``views`` rather than ``pages`` because Streamlit
+treats a ``pages/`` directory next to the main script as a multipage
+app.
+"""
+
+import importlib
+
+from ims.profiling import timer
+
+# Page name (``st.session_state.current_page``) -> module in this package
+PAGES = {
+    'Dashboard': 'dashboard',
+    'Records': 'records',
+    'Add Record': 'add_record',
+    'Reports': 'reports',
+    'Admin': 'admin',
+    'Training': 'training',
+}
+
+
+def render(page):
+    """Import (once) and render the module for ``page``."""
+    name = PAGES[page]
+    with timer(f'page.{name}'):
+        module = importlib.import_module(f'{__name__}.{name}')
+        module.render()
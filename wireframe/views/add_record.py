@@ -0,0 +1,221 @@
+"""Add/Edit Record page: the record form and bulk import."""
+
+import os
+import sqlite3
+from datetime import date, timedelta
+
+import streamlit as st
+
+from ims.permissions import RESTRICTED, visibility_of
+from ims.reference import (ATTACHMENT_TYPES, DEPARTMENTS, INITIAL_STATUSES, PRIORITIES,
+                           RECORD_CATEGORIES)
+from shared import (CURRENT_USER, CURRENT_USER_EMAIL, audit, get_activity_log,
+                    get_attachment_store, get_extraction_pool, get_record_store,
+                    get_user_directory)
+
+
+def render():
+    record_store = get_record_store()
+    activity_log = get_activity_log()
+    attachment_store = get_attachment_store()
+    extraction_pool = get_extraction_pool()
+    
+    st.markdown("## Add/Edit Record")
+    
+    # Form header
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        st.markdown("### Creating New Record")
+    with col2:
+        form_mode = st.selectbox("Mode:", ["Add New", "Edit Existing", "Bulk Import"])
+    
+    st.markdown("---")
+    
+    if form_mode == "Bulk Import":
+        st.markdown("####Import Records from File")
+        st.caption(
+            "CSV, XLSX or JSON Lines with columns Name and Category (required) and optionally "
+            "ID, Status, Priority, Created, Modified, Assigned, Description, Tags, Department. "
+            "Rows without an ID are numbered automatically."
+        )
+        
+        import_file = st.file_uploader("Choose file to import", type=['csv', 'xlsx', 'jsonl', 'ndjson'])
+        
+        if import_file and st.button("Import Records", use_container_width=True):
+            # The importer needs pandas; only load it when an import runs
+            from ims.importer import detect_format, import_records
+            
+            progress_bar = st.progress(0.0, text="Importing...")
+            
+            def show_progress(result):
+                done = min(import_file.tell() / max(import_file.size, 1), 1.0)
+                progress_bar.progress(done, text=f"{result.inserted:,} imported, {result.rejected:,} rejected")
+            
+            try:
+                import_result = import_records(
+                    record_store, import_file, detect_format(import_file.name), CURRENT_USER,
+                    progress=show_progress
+                )
+            except Exception as e:
+                progress_bar.empty()
+                st.error(f"Import failed: {e}")
+            else:
+                progress_bar.progress(1.0, text="Import complete")
+                activity_log.log('Records Imported', CURRENT_USER, f"{import_result.inserted:,} from {import_file.name}")
+                audit('Records Imported', import_file.name, f"{import_result.inserted:,} records")
+                st.session_state.import_result = import_result
+        
+        import_result = st.session_state.get('import_result')
+        if import_result:
+            st.success(f"Imported {import_result.inserted:,} of {import_result.total:,} rows")
+            if import_result.rejected_path and os.path.exists(import_result.rejected_path):
+                st.warning(f"{import_result.rejected:,} rows were rejected")
+                with open(import_result.rejected_path, 'rb') as rejected_file:
+                    st.download_button(
+                        "Download Rejected Rows",
+                        data=rejected_file,
+                        file_name="rejected_rows.csv",
+                        mime="text/csv",
+                        use_container_width=True
+                    )
+    
+    else:
+        # Outside the form so that choosing Restricted shows the user
+        # picker at once (form widgets only rerun the script on submit)
+        st.markdown("####Access & Permissions")
+        
+        visibility = st.radio(
+            "Visibility:",
+            ["Public (All users can view)", "Restricted (Selected users only)", "Private (Only me)"]
+        )
+        record_visibility = visibility_of(visibility)
+        
+        assigned_users = []
+        if record_visibility == RESTRICTED:
+            # Users are looked up in the shared directory on demand
+            col1, col2 = st.columns([1, 2])
+            with col1:
+                share_prefix = st.text_input("Find users", placeholder="Name or email")
+            with col2:
+                chosen = st.session_state.get('record_share_with', [])
+                share_options = list(dict.fromkeys(
+                    chosen + (get_user_directory().pick(share_prefix, status='Active') if share_prefix else [])
+                ))
+                assigned_users = st.multiselect(
+                    "Assign to users:", share_options, key='record_share_with',
+                    format_func=lambda option: f"{option[1]} <{option[0]}>"
+                )
+        
+        # Main form
+        with st.form("record_form"):
+            st.markdown("####Basic Information")
+            
+            col1, col2 = st.columns([2, 1])
+            with col1:
+                record_title = st.text_input("Record Title *", placeholder="Enter record title...")
+            with col2:
+                # Each session holds its own reserved ID until the record is saved
+                if 'draft_record_id' not in st.session_state:
+                    st.session_state.draft_record_id = record_store.ids.allocate()
+                record_id = st.text_input("Record ID", value=st.session_state.draft_record_id, disabled=True)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                category = st.selectbox("Category *", ("Select Category",) + RECORD_CATEGORIES)
+            with col2:
+                priority = st.selectbox("Priority Level", PRIORITIES)
+            
+            description = st.text_area("Description", 
+                                     placeholder="Enter detailed description of the record...",
+                                     height=100)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                start_date = st.date_input("Start Date", value=date.today())
+            with col2:
+                end_date = st.date_input("End Date", value=date.today() + timedelta(days=30))
+            
+            tags = st.text_input("Tags", placeholder="contract, client, important, Q1-2024")
+            
+            st.markdown("####File Attachments")
+            uploaded_files = st.file_uploader(
+                "Choose files to attach",
+                accept_multiple_files=True,
+                type=list(ATTACHMENT_TYPES)
+            )
+            
+            if uploaded_files:
+                st.write(f"{len(uploaded_files)} file(s) selected:")
+                for file in uploaded_files:
+                    st.write(f"  • {file.name} ({file.size} bytes)")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                status = st.selectbox("Initial Status", INITIAL_STATUSES)
+            with col2:
+                department = st.selectbox("Department", DEPARTMENTS)
+            
+            st.markdown("---")
+            
+            # Form buttons
+            col1, col2, col3, col4 = st.columns(4)
+            
+            with col1:
+                submitted = st.form_submit_button("Save Record", use_container_width=True)
+            with col2:
+                save_continue = st.form_submit_button("Save & Continue", use_container_width=True)
+            with col3:
+                draft = st.form_submit_button("Save as Draft", use_container_width=True)
+            with col4:
+                cancel = st.form_submit_button("Cancel", use_container_width=True)
+            
+            # Form submission handling
+            if submitted or save_continue or draft:
+                if record_title and category != "Select Category":
+                    new_record = {
+                        'ID': record_id,
+                        'Name': record_title,
+                        'Category': category.split(' ')[0],  # Take first word
+                        'Created': start_date.strftime('%Y-%m-%d'),
+                        'Modified': start_date.strftime('%Y-%m-%d'),
+                        'Status': 'Draft' if draft else status,
+                        'Priority': priority,
+                        'Assigned': CURRENT_USER,
+                        'Description': description,
+                        'Tags': tags,
+                        'Department': department,
+                        # Enforced on the Records page (see ims.permissions)
+                        'Visibility': record_visibility,
+                        'Owner': CURRENT_USER_EMAIL,
+                        'Shared With': [email for email, _ in assigned_users]
+                    }
+                    
+                    try:
+                        record_store.add(new_record)
+                    except sqlite3.IntegrityError:
+                        # Only possible if the ID was also given to an imported record
+                        record_id = new_record['ID'] = record_store.ids.allocate()
+                        record_store.add(new_record)
+                    st.session_state.draft_record_id = record_store.ids.allocate()
+                    
+                    # Uploads are streamed to the attachment store in chunks
+                    # and their text is extracted afterwards, off the save path
+                    for file in uploaded_files or []:
+                        _, sha256 = attachment_store.attach(record_id, file, file.name,
+                                                            file.type or '', CURRENT_USER)
+                        extraction_pool.submit(sha256)
+                    activity_log.log('New Record Added', CURRENT_USER, record_id)
+                    audit('New Record Added', record_id, record_visibility)
+                    st.success(f"Record {record_id} saved successfully!")
+                    
+                    if save_continue:
+                        st.info("Ready to add another record")
+                    elif not draft:
+                        st.session_state.current_page = 'Records'
+                        st.rerun()
+                else:
+                    st.error("Please fill in all required fields (marked with *)")
+            
+            if cancel:
+                st.session_state.current_page = 'Records'
+                st.rerun()
@@ -0,0 +1,479 @@
+"""Admin & Settings page: users, system settings, security, backups."""
+
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from ims.audit import ACTIONS as AUDIT_ACTIONS, risk_of
+from ims.backup import SCHEDULES as BACKUP_SCHEDULES
+from ims.dirsync import FULL as DIRECTORY_FULL, INCREMENTAL as DIRECTORY_INCREMENTAL
+from ims.mailer import FAILED as MAIL_FAILED, QUEUED as MAIL_QUEUED, SENT as MAIL_SENT, compose
+from ims.reference import (BACKUP_FREQUENCIES, DEPARTMENTS, LANGUAGES, PASSWORD_POLICIES,
+                           ROLES, TIME_ZONES, USER_COLUMNS, USER_STATUSES)
+from ims.profiling import PROFILER, timer
+from ims.reports import format_size
+from ims.restore import COMPONENTS as RESTORE_COMPONENTS
+from shared import (CURRENT_USER, CURRENT_USER_EMAIL, audit, export_popover, get_activity_log,
+                    get_audit_log, get_backup_manager, get_directory_sync, get_extraction_pool,
+                    get_figure_cache, get_mail_queue, get_settings_store, get_user_directory)
+
+
+# Rows per page of the User Management table
+USERS_PAGE_SIZE = 50
+
+# Security audit log periods -> days back (None: everything)
+AUDIT_PERIODS = {
+    "Last 24 hours": 1,
+    "Last 7 days": 7,
+    "Last 30 days": 30,
+    "Last 90 days": 90,
+    "All time": None,
+}
+# Newest matching audit events shown
+AUDIT_LIMIT = 200
+
+
+def render():
+    activity_log = get_activity_log()
+    user_directory = get_user_directory()
+    
+    st.markdown("## Administration & Settings")
+    
+    # Admin tabs
+    admin_tabs = ["User Management", "System Settings", "Security", "Backup & Restore"]
+    # Hidden unless the page is opened with ?perf=1
+    show_performance = st.query_params.get('perf') == '1'
+    if show_performance:
+        admin_tabs.append("Performance")
+    admin_tab = st.tabs(admin_tabs)
+    
+    with admin_tab[0]:  # User Management
+        st.subheader("User Management")
+        
+        # User filters (bitmap intersections in the shared directory)
+        col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+        with col1:
+            user_search = st.text_input("Search users...", placeholder="Name or email prefix")
+        with col2:
+            role_filter = st.selectbox("Filter by Role:", ("All Roles",) + ROLES)
+        with col3:
+            dept_filter = st.selectbox("Filter by Department:", ("All Departments",) + DEPARTMENTS)
+        with col4:
+            status_filter_admin = st.selectbox("Filter by Status:", ("All Status",) + USER_STATUSES)
+        
+        user_filters = dict(
+            role=None if role_filter == "All Roles" else role_filter,
+            department=None if dept_filter == "All Departments" else dept_filter,
+            status=None if status_filter_admin == "All Status" else status_filter_admin
+        )
+        user_prefix = user_search.strip() or None
+        total_users = user_directory.count(prefix=user_prefix, **user_filters)
+        
+        # User actions
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            if st.button("Add New User", use_container_width=True):
+                st.info("Add User form would open here")
+        with col2:
+            export_popover(
+                "Export Users", 'users_export',
+                lambda: user_directory.iter_chunks(prefix=user_prefix, **user_filters),
+                USER_COLUMNS, 'ims_users'
+            )
+        with col3:
+            if st.button("Send Invites", use_container_width=True, disabled=not total_users):
+                # Users are read and invites queued in the background
+                settings = get_settings_store().all()
+                invite_filters = dict(user_filters)
+                get_mail_queue().enqueue_later(lambda: (
+                    compose('invite', user['Email'], name=user['Name'],
+                            system_name=settings['system_name'], company_name=settings['company_name'])
+                    for chunk in user_directory.iter_chunks(prefix=user_prefix, **invite_filters)
+                    for user in chunk
+                ))
+                activity_log.log('Invites Sent', CURRENT_USER, f"{total_users:,} users")
+                audit('Invites Sent', detail=f"{total_users:,} users")
+                st.toast(f"Queued invites for {total_users:,} users")
+        with col4:
+            with st.popover("Sync with AD", use_container_width=True):
+                directory_sync = get_directory_sync()
+                settings_store = get_settings_store()
+                sync_source = st.text_input("Directory source", value=settings_store.get('directory_source'),
+                                            placeholder="ldaps://dc.company.com or /path/to/export.ldif")
+                sync_base_dn = st.text_input("Base DN", value=settings_store.get('directory_base_dn'),
+                                             placeholder="OU=Staff,DC=company,DC=com")
+                full_sync = st.checkbox("Full sync (also deactivates removed users)")
+                st.caption("LDAP credentials are read from IMS_LDAP_BIND_DN and IMS_LDAP_PASSWORD")
+                
+                if st.button("Start Sync", disabled=not sync_source.strip(), use_container_width=True):
+                    settings_store.save({'directory_source': sync_source.strip(),
+                                         'directory_base_dn': sync_base_dn.strip()}, CURRENT_USER)
+                    # Only changed users are written, in batches, in the background
+                    if directory_sync.run(sync_source.strip(), sync_base_dn.strip(),
+                                          DIRECTORY_FULL if full_sync else DIRECTORY_INCREMENTAL):
+                        activity_log.log('Directory Sync Started', CURRENT_USER, sync_source.strip())
+                        audit('Directory Sync Started', sync_source.strip(), 'full' if full_sync else 'incremental')
+                        st.toast("Directory sync started")
+                    else:
+                        st.warning("A directory sync is already running")
+                
+                last_sync = directory_sync.last_result
+                if directory_sync.running:
+                    st.info("Sync in progress...")
+                elif directory_sync.last_error:
+                    st.error(f"Last sync failed: {directory_sync.last_error}")
+                elif last_sync:
+                    st.success(f"{last_sync.kind.title()} sync: {last_sync.added:,} added, "
+                               f"{last_sync.updated:,} updated, {last_sync.deactivated:,} deactivated, "
+                               f"{last_sync.unchanged:,} unchanged in {last_sync.duration:.1f}s")
+        
+        # Keyset pagination, starting over whenever the filters change
+        users_page_key = (user_prefix, tuple(user_filters.items()))
+        if st.session_state.get('users_page_key') != users_page_key:
+            st.session_state.users_page_key = users_page_key
+            st.session_state.users_cursors = [None]
+        user_cursors = st.session_state.users_cursors
+        
+        page_users, next_user_cursor = user_directory.page(
+            after=user_cursors[-1], limit=USERS_PAGE_SIZE, prefix=user_prefix, **user_filters
+        )
+        
+        # Users table
+        with timer('frame.users'):
+            users_df = pd.DataFrame(page_users, columns=list(USER_COLUMNS))
+        
+        st.dataframe(
+            users_df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Name": st.column_config.TextColumn("Full Name", width="medium"),
+                "Email": st.column_config.TextColumn("Email Address", width="large"),
+                "Role": st.column_config.TextColumn("Role", width="small"),
+                "Department": st.column_config.TextColumn("Department", width="small"),
+                "Last Login": st.column_config.TextColumn("Last Login", width="medium"),
+                "Status": st.column_config.TextColumn("Status", width="small")
+            }
+        )
+        
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("◀ Previous", key="users_previous", disabled=len(user_cursors) == 1, use_container_width=True):
+                user_cursors.pop()
+                st.rerun()
+        with col2:
+            if users_df.empty:
+                st.caption("No matching users")
+            else:
+                first_user = (len(user_cursors) - 1) * USERS_PAGE_SIZE
+                st.caption(f"Users {first_user + 1:,}–{first_user + len(users_df):,} of {total_users:,}")
+        with col3:
+            if st.button("Next ▶", key="users_next", disabled=next_user_cursor is None, use_container_width=True):
+                user_cursors.append(next_user_cursor)
+                st.rerun()
+        
+        # User actions: users are looked up on demand instead of listing them all
+        if total_users:
+            col1, col2 = st.columns([1, 2])
+            with col1:
+                pick_prefix = st.text_input("Find user", placeholder="Name or email")
+            with col2:
+                user_options = (
+                    user_directory.pick(pick_prefix, **user_filters) if pick_prefix
+                    else [(user['Email'], user['Name']) for user in page_users]
+                )
+                selected_user = st.selectbox(
+                    "Select user for actions:", user_options,
+                    format_func=lambda option: f"{option[1]} <{option[0]}>"
+                )
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.button("Edit User", use_container_width=True)
+            with col2:
+                if st.button("Reset Password", use_container_width=True, disabled=not selected_user):
+                    get_mail_queue().enqueue([compose(
+                        'password_reset', selected_user[0], name=selected_user[1],
+                        system_name=get_settings_store().get('system_name')
+                    )])
+                    activity_log.log('Password Reset Sent', CURRENT_USER, selected_user[0])
+                    audit('Password Reset Sent', selected_user[0])
+                    st.toast(f"Password reset email queued for {selected_user[1]}")
+            with col3:
+                with st.popover("Change Permissions", use_container_width=True, disabled=not selected_user):
+                    current_role = (user_directory.get(selected_user[0]) or {}).get('Role') if selected_user else None
+                    new_role = st.selectbox("Role", ROLES,
+                                            index=ROLES.index(current_role) if current_role in ROLES else 0)
+                    st.caption("Administrators see every record; other roles see public records, "
+                               "their own and those shared with them")
+                    if st.button("Apply", key="apply_role", use_container_width=True,
+                                 disabled=new_role == current_role):
+                        # Bumps the directory version, so cached record access is recomputed
+                        user_directory.upsert_many([{'Email': selected_user[0], 'Role': new_role}])
+                        activity_log.log('Permissions Changed', CURRENT_USER, f"{selected_user[0]}: {new_role}")
+                        audit('Permissions Changed', selected_user[0], f"{current_role} -> {new_role}")
+                        st.toast(f"{selected_user[1]} is now {new_role}")
+            with col4:
+                st.button("Deactivate", use_container_width=True)
+    
+    with admin_tab[1]:  # System Settings
+        st.subheader("System Configuration")
+        
+        # Saved values come from the process-wide settings snapshot
+        settings_store = get_settings_store()
+        settings = settings_store.all()
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("####General Settings")
+            company_name = st.text_input("Company Name", value=settings['company_name'])
+            system_name = st.text_input("System Name", value=settings['system_name'])
+            time_zone = st.selectbox("Time Zone", TIME_ZONES,
+                                     index=TIME_ZONES.index(settings['time_zone']))
+            language = st.selectbox("Default Language", LANGUAGES,
+                                    index=LANGUAGES.index(settings['language']))
+            
+            st.markdown("####mail Settings")
+            smtp_server = st.text_input("SMTP Server", value=settings['smtp_server'])
+            smtp_port = st.number_input("SMTP Port", value=settings['smtp_port'], min_value=1, max_value=65535)
+            email_from = st.text_input("From Email", value=settings['email_from'])
+            
+            # Outbox state; mail is sent in the background at a limited rate
+            mail_queue = get_mail_queue()
+            outbox = mail_queue.stats()
+            st.caption(f"Outbox: {outbox.get(MAIL_QUEUED, 0):,} queued, {outbox.get(MAIL_SENT, 0):,} sent, "
+                       f"{outbox.get(MAIL_FAILED, 0):,} failed")
+            for failure in mail_queue.failures(limit=3):
+                st.caption(f"Not delivered to {failure['recipient']}: {failure['error']}")
+            if st.button("Send Test Email", use_container_width=True):
+                mail_queue.enqueue([compose('test', CURRENT_USER_EMAIL, system_name=settings['system_name'])])
+                st.toast(f"Test email queued for {CURRENT_USER_EMAIL}")
+        
+        with col2:
+            st.markdown("####Security Settings")
+            session_timeout = st.number_input("Session Timeout (minutes)", value=settings['session_timeout'], min_value=5, max_value=480)
+            password_policy = st.selectbox("Password Policy", PASSWORD_POLICIES,
+                                           index=PASSWORD_POLICIES.index(settings['password_policy']))
+            two_factor = st.checkbox("Enable Two-Factor Authentication", value=settings['two_factor'])
+            login_attempts = st.number_input("Max Login Attempts", value=settings['login_attempts'], min_value=1, max_value=10)
+            
+            st.markdown("####Data Settings")
+            backup_frequency = st.selectbox("Backup Frequency", BACKUP_FREQUENCIES,
+                                            index=BACKUP_FREQUENCIES.index(settings['backup_frequency']))
+            retention_period = st.number_input("Data Retention (days)", value=settings['retention_period'], min_value=30, max_value=2555)
+            auto_archive = st.checkbox("Auto-archive old records", value=settings['auto_archive'])
+        
+        if st.button("Save Settings", use_container_width=True):
+            changed = settings_store.save({
+                'company_name': company_name,
+                'system_name': system_name,
+                'time_zone': time_zone,
+                'language': language,
+                'smtp_server': smtp_server,
+                'smtp_port': int(smtp_port),
+                'email_from': email_from,
+                'session_timeout': int(session_timeout),
+                'password_policy': password_policy,
+                'two_factor': two_factor,
+                'login_attempts': int(login_attempts),
+                'backup_frequency': backup_frequency,
+                'retention_period': int(retention_period),
+                'auto_archive': auto_archive
+            }, CURRENT_USER)
+            if changed:
+                activity_log.log('Settings Updated', CURRENT_USER, ', '.join(changed))
+                audit('Settings Updated', detail=', '.join(changed))
+            st.success("Settings saved successfully!")
+    
+    with admin_tab[2]:  # Security
+        st.subheader("Security Management")
+        
+        # Security metrics
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Security Score", "92%", "2%")
+        with col2:
+            st.metric("Failed Logins", "12", "5")
+        with col3:
+            st.metric("Active Sessions", "23", "3")
+        with col4:
+            st.metric("Last Scan", "2 hrs ago", "")
+        
+        st.markdown("####Security Audit Log")
+        audit_log = get_audit_log()
+        
+        # Queries read only the segments and blocks indexed for the
+        # user, event and period chosen
+        col1, col2, col3 = st.columns([2, 1, 1])
+        with col1:
+            audit_user = st.text_input("User", placeholder="Email address, e.g. john.smith@company.com")
+        with col2:
+            audit_action = st.selectbox("Event", ("All Events",) + AUDIT_ACTIONS)
+        with col3:
+            audit_period = st.selectbox("Period", list(AUDIT_PERIODS), index=2)
+        
+        audit_days = AUDIT_PERIODS[audit_period]
+        audit_events = audit_log.query(
+            user=audit_user.strip() or None,
+            action=None if audit_action == "All Events" else audit_action,
+            start=None if audit_days is None else datetime.now().timestamp() - audit_days * 86400,
+            limit=AUDIT_LIMIT
+        )
+        security_log = pd.DataFrame(
+            [{
+                'Timestamp': datetime.fromtimestamp(event['ts']).strftime('%Y-%m-%d %H:%M:%S'),
+                'Event': event['action'],
+                'User': event['user'],
+                'Target': event['target'],
+                'Detail': event['detail'],
+                'IP': event['ip'],
+                'Risk': risk_of(event['action'])
+            } for event in audit_events],
+            columns=['Timestamp', 'Event', 'User', 'Target', 'Detail', 'IP', 'Risk']
+        )
+        
+        st.dataframe(security_log, use_container_width=True, hide_index=True)
+        audit_stats = audit_log.stats()
+        st.caption(f"Newest {len(audit_events):,} matching events | {audit_stats['events']:,} events in "
+                   f"{audit_stats['segments']:,} segments ({format_size(audit_stats['bytes'])})")
+        if audit_stats['dropped']:
+            st.error(f"{audit_stats['dropped']:,} audit events could not be written: {audit_log.last_error}")
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("Run Security Scan", use_container_width=True):
+                activity_log.log('Security Scan', CURRENT_USER)
+                audit('Security Scan')
+        with col2:
+            st.button("Generate Security Report", use_container_width=True)
+        with col3:
+            st.button("View Alerts", use_container_width=True)
+    
+    with admin_tab[3]:  # Backup & Restore
+        st.subheader("Backup & Restore")
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.markdown("####Backup Management")
+            backup_manager = get_backup_manager()
+            backups = backup_manager.backups()
+            if backup_manager.running:
+                st.info("Backup in progress...")
+            elif backup_manager.last_error:
+                st.error(f"Last backup failed: {backup_manager.last_error}")
+            elif backups:
+                last_backup = backups[0]
+                st.info(f"Last backup: {datetime.fromtimestamp(last_backup['finished']):%Y-%m-%d %I:%M %p} "
+                        f"({last_backup['kind'].title()}, {format_size(last_backup['size'])})")
+            else:
+                st.info("No backups yet")
+            
+            saved_schedule = backup_manager.schedule()
+            backup_schedule = st.selectbox("Backup Schedule:", BACKUP_SCHEDULES,
+                                           index=BACKUP_SCHEDULES.index(saved_schedule['schedule']))
+            include_files = st.checkbox("Include uploaded files", value=saved_schedule['include_files'])
+            compress_backup = st.checkbox("Compress backup files", value=saved_schedule['compress'])
+            backup_manager.set_schedule(backup_schedule, include_files, compress_backup)
+            next_backup = backup_manager.next_run()
+            if next_backup:
+                st.caption(f"Next scheduled backup: {next_backup:%Y-%m-%d %I:%M %p}")
+            
+            if st.button("Run Backup Now", use_container_width=True):
+                # Runs in the background; the page stays responsive
+                if backup_manager.run(include_files, compress_backup):
+                    activity_log.log('Backup Started', CURRENT_USER)
+                    audit('Backup Started', detail='with files' if include_files else 'database only')
+                    st.toast("Backup started")
+                else:
+                    st.warning("A backup is already running")
+        
+        with col2:
+            st.markdown("####Restore Options")
+            
+            backup_files = {backup['id']: backup for backup in backups}
+            selected_backup = st.selectbox(
+                "Select backup to restore:", list(backup_files),
+                format_func=lambda backup_id: (
+                    f"{datetime.fromtimestamp(backup_files[backup_id]['created']):%Y-%m-%d %H:%M} "
+                    f"({backup_files[backup_id]['kind'].title()})"))
+            
+            restore_options = st.multiselect("Restore components:", 
+                RESTORE_COMPONENTS, 
+                default=["Database"])
+            
+            st.warning("This action cannot be undone. Please confirm you want to proceed.")
+            confirm_restore = st.checkbox("Replace current data with this backup")
+            
+            if st.button("Restore from Backup", use_container_width=True,
+                         disabled=not (selected_backup and restore_options and confirm_restore)):
+                # Staged and verified in the background, then swapped in at once
+                if backup_manager.restore(selected_backup, restore_options):
+                    activity_log.log('Restore Started', CURRENT_USER, selected_backup)
+                    audit('Restore Started', selected_backup, ', '.join(restore_options))
+                    st.toast("Restore started")
+                else:
+                    st.warning("A backup or restore is already running")
+            
+            last_restore = backup_manager.last_restore
+            if last_restore:
+                if 'error' in last_restore:
+                    st.error(f"Restore of {last_restore['backup']} failed: {last_restore['error']}")
+                elif 'summary' in last_restore:
+                    st.success(f"Restored {', '.join(last_restore['components'])} from "
+                               f"{last_restore['backup']} in {last_restore['summary']['duration']:.1f}s")
+                else:
+                    st.info(f"Restoring {last_restore['backup']}...")
+    
+    if show_performance:
+        with admin_tab[4]:  # Performance
+            st.subheader("Performance")
+            st.caption(f"Timings since {datetime.fromtimestamp(PROFILER.started):%Y-%m-%d %H:%M}; "
+                       f"percentiles over the last {PROFILER.window:,} calls of each operation")
+            
+            timings = pd.DataFrame(PROFILER.summary(),
+                                   columns=['name', 'count', 'p50', 'p95', 'p99', 'max', 'mean', 'total'])
+            for column in ('p50', 'p95', 'p99', 'max', 'mean'):
+                timings[column] = timings[column] * 1000
+            st.dataframe(
+                timings.sort_values('total', ascending=False),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "name": st.column_config.TextColumn("Operation", width="medium"),
+                    "count": st.column_config.NumberColumn("Calls"),
+                    "p50": st.column_config.NumberColumn("p50 (ms)", format="%.2f"),
+                    "p95": st.column_config.NumberColumn("p95 (ms)", format="%.2f"),
+                    "p99": st.column_config.NumberColumn("p99 (ms)", format="%.2f"),
+                    "max": st.column_config.NumberColumn("Max (ms)", format="%.2f"),
+                    "mean": st.column_config.NumberColumn("Mean (ms)", format="%.2f"),
+                    "total": st.column_config.NumberColumn("Total (s)", format="%.2f")
+                }
+            )
+            
+            cache_stats = get_figure_cache().stats()
+            st.caption("Figure cache: " + ", ".join(f"{key} {value:,}" for key, value in cache_stats.items()))
+            
+            extraction_stats = get_extraction_pool().stats()
+            extraction_jobs = [f"{extraction_stats.pop('queued'):,} queued"]
+            for status, jobs in extraction_stats.items():
+                timing = (f" (avg {jobs['avg_seconds']:.2f}s, max {jobs['max_seconds']:.2f}s)"
+                          if jobs['avg_seconds'] is not None else "")
+                extraction_jobs.append(f"{jobs['count']:,} {status}{timing}")
+            st.caption("Attachment extraction: " + ", ".join(extraction_jobs))
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.download_button("Export Prometheus", data=PROFILER.to_prometheus(),
+                                   file_name="ims_metrics.prom", mime="text/plain",
+                                   use_container_width=True)
+            with col2:
+                st.download_button("Export JSON", data=PROFILER.to_json(),
+                                   file_name="ims_metrics.json", mime="application/json",
+                                   use_container_width=True)
+            with col3:
+                if st.button("Reset Timings", use_container_width=True):
+                    PROFILER.reset()
+                    st.rerun()
@@ -0,0 +1,120 @@
+"""Dashboard page: headline metrics, charts and recent activity."""
+
+import time
+from datetime import datetime
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from ims.activity import time_ago
+from ims.profiling import timer
+from shared import (get_activity_log, get_figure_cache, get_record_store, record_headline,
+                    show_chart)
+
+# Activity Timeline periods -> days
+ACTIVITY_PERIODS = {
+    'Last 24 hours': 1,
+    'Last 7 days': 7,
+    'Last 30 days': 30,
+    'Last 90 days': 90,
+    'Last year': 365,
+}
+
+# Seconds before the Activity Timeline window moves on without new activity
+TIMELINE_REFRESH = 300
+
+
+def render():
+    record_store = get_record_store()
+    figure_cache = get_figure_cache()
+    activity_log = get_activity_log()
+    record_counts, record_summary = record_headline()
+    
+    st.markdown("## Dashboard Overview")
+    
+    # Key metrics row
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric(
+            label="Total Records",
+            value=f"{record_summary['total']:,}",
+            delta=f"{record_summary['this_week']:,} this week"
+        )
+    
+    with col2:
+        st.metric(
+            label="Pending Tasks",
+            value=f"{record_summary['pending']:,}"
+        )
+    
+    with col3:
+        last_month = record_summary['last_month']
+        st.metric(
+            label="This Month",
+            value=f"{record_summary['this_month']:,}",
+            delta=f"{(record_summary['this_month'] - last_month) / last_month:.0%} vs last month" if last_month else None
+        )
+    
+    with col4:
+        st.metric(
+            label="System Health",
+            value="98.2%",
+            delta="0.5% improvement"
+        )
+    
+    # Charts section
+    st.markdown("---")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("Records by Category")
+        categories = list(record_counts['category'])
+        values = list(record_counts['category'].values())
+        
+        chart = figure_cache.get_or_build(
+            'dashboard_category_pie', record_store.version,
+            lambda: px.pie(
+                values=values,
+                names=categories,
+                title="Distribution of Records by Category"
+            )
+        )
+        show_chart(chart)
+    
+    with col2:
+        st.subheader("Activity Timeline")
+        timeline_period = st.selectbox("Period", list(ACTIVITY_PERIODS), index=2, label_visibility="collapsed")
+        
+        def build_timeline(days):
+            # Rollups are downsampled to a few hundred points however long the period
+            end = datetime.now().timestamp()
+            grain, points = activity_log.series(end - days * 86400, end)
+            fig = px.line(
+                x=pd.to_datetime([bucket for bucket, _ in points], unit='s'),
+                y=[n for _, n in points],
+                title=f"System Activity per {grain.capitalize()}"
+            )
+            fig.update_layout(xaxis_title="Date", yaxis_title="Activities")
+            return fig
+        
+        # The window ends now, so the chart also goes stale as time passes
+        version = (activity_log.version, int(time.time() // TIMELINE_REFRESH))
+        chart = figure_cache.get_or_build('dashboard_timeline', version, build_timeline,
+                                          days=ACTIVITY_PERIODS[timeline_period])
+        show_chart(chart)
+    
+    # Recent activity table
+    st.subheader("Recent Activity")
+    with timer('frame.recent_activity'):
+        recent_activities = pd.DataFrame(
+            [
+                {'Action': action, 'User': user, 'Time': time_ago(ts), 'Status': status}
+                for ts, action, user, detail, status in activity_log.recent(5)
+            ],
+            columns=['Action', 'User', 'Time', 'Status']
+        )
+    
+    st.dataframe(recent_activities, use_container_width=True, hide_index=True)
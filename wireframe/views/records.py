@@ -0,0 +1,247 @@
+"""Records Management page: filtered, keyset-paged records table."""
+
+import pandas as pd
+import streamlit as st
+
+from ims.extract import DONE as EXTRACTED, FAILED as EXTRACTION_FAILED
+from ims.permissions import ALL as ALL_RECORDS, access_of
+from ims.profiling import timer
+from ims.reference import FILTER_CATEGORIES, FILTER_STATUSES, PRIORITIES
+from ims.reports import format_size
+from ims.store import COLUMNS as STORE_COLUMNS, SORT_KEYS
+from shared import (CURRENT_USER_EMAIL, export_popover, get_attachment_store,
+                    get_extraction_pool, get_permission_resolver, get_record_store,
+                    get_user_directory)
+
+# Sort orders offered on the Records page ('Relevance' is added while searching)
+RECORD_SORT_OPTIONS = [key for key in SORT_KEYS if key != 'Relevance']
+
+
+def render():
+    record_store = get_record_store()
+    attachment_store = get_attachment_store()
+    extraction_pool = get_extraction_pool()
+    user_directory = get_user_directory()
+    
+    st.markdown("## Records Management")
+    
+    # Administrators see every record, and can check what another user
+    # would see through the same permission checks
+    viewer = CURRENT_USER_EMAIL
+    if access_of(user_directory.get(CURRENT_USER_EMAIL)) == ALL_RECORDS:
+        viewers = dict(user_directory.pick('', limit=100, status='Active'))
+        viewer_col, _ = st.columns([1, 3])
+        with viewer_col:
+            viewer = st.selectbox("View records as", [CURRENT_USER_EMAIL] + sorted(set(viewers) - {CURRENT_USER_EMAIL}),
+                                  key='records_viewer', format_func=lambda email: viewers.get(email, email))
+    
+    # Records the viewer may see (None: all of them); every query below is
+    # intersected with it
+    visible = get_permission_resolver().visible(viewer)
+    
+    # Search and filter section
+    col1, col2, col3, col4, col5 = st.columns([3, 1, 1, 1, 1])
+    
+    with col1:
+        search_query = st.text_input("Search records...", placeholder="Search name, tags and description (best matches first)")
+    
+    # Per-value counts come from the bitmap index, each field counted
+    # under the other active filters
+    def _filter_value(key):
+        value = st.session_state.get(key, 'All')
+        return None if value == 'All' else value
+    
+    facet_counts = record_store.facets(
+        ('category', 'status', 'priority'),
+        search=search_query or None,
+        visible=visible,
+        category=_filter_value('records_category'),
+        status=_filter_value('records_status'),
+        priority=_filter_value('records_priority')
+    )
+    
+    def _with_count(field):
+        counts = facet_counts[field]
+        return lambda value: value if value == 'All' else f"{value} ({counts.get(value, 0):,})"
+    
+    with col2:
+        category_filter = st.selectbox("Category", ('All',) + FILTER_CATEGORIES,
+                                       key='records_category', format_func=_with_count('category'))
+    
+    with col3:
+        status_filter = st.selectbox("Status", ('All',) + FILTER_STATUSES,
+                                     key='records_status', format_func=_with_count('status'))
+    
+    with col4:
+        priority_filter = st.selectbox("Priority", ('All',) + PRIORITIES,
+                                       key='records_priority', format_func=_with_count('priority'))
+    
+    with col5:
+        st.markdown("<br>", unsafe_allow_html=True)
+        if st.button("Refresh", use_container_width=True):
+            st.rerun()
+    
+    # Filters are bitmap intersections in the store
+    record_filters = dict(
+        category=None if category_filter == 'All' else category_filter,
+        status=None if status_filter == 'All' else status_filter,
+        priority=None if priority_filter == 'All' else priority_filter,
+        search=search_query or None
+    )
+    
+    st.markdown("---")
+    
+    # Action buttons
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        if st.button("➕ Add New Record", key="add_new", use_container_width=True):
+            st.session_state.current_page = 'Add Record'
+            st.rerun()
+    
+    with col2:
+        # Exports the current filters straight from the store
+        export_popover(
+            "Export Data", 'records_export',
+            lambda: record_store.iter_chunks(visible=visible, **record_filters),
+            STORE_COLUMNS, 'ims_records'
+        )
+    
+    with col3:
+        st.button("Bulk Actions", use_container_width=True)
+    
+    with col4:
+        st.button("Advanced Filter", use_container_width=True)
+    
+    # Records table
+    st.subheader("All Records")
+    
+    # Sorting and paging are done by the store
+    sort_options = ['Relevance'] + list(RECORD_SORT_OPTIONS) if search_query else list(RECORD_SORT_OPTIONS)
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        sort_by = st.selectbox("Sort by", sort_options)
+    with col2:
+        page_size = st.selectbox("Rows per page", [25, 50, 100, 250], index=1)
+    with col3:
+        st.markdown("<br>", unsafe_allow_html=True)
+        descending = st.checkbox("Descending", disabled=sort_by == 'Relevance')
+    
+    # Keyset pagination: remember the cursor of each page visited so far,
+    # starting over whenever the viewer, filters or ordering change
+    page_key = (tuple(record_filters.items()), viewer, sort_by, descending, page_size)
+    if st.session_state.get('records_page_key') != page_key:
+        st.session_state.records_page_key = page_key
+        st.session_state.records_cursors = [None]
+    cursors = st.session_state.records_cursors
+    
+    total_matches = record_store.count(visible=visible, **record_filters)
+    page_records, next_cursor = record_store.page(
+        sort=sort_by,
+        descending=descending,
+        after=cursors[-1],
+        limit=page_size,
+        visible=visible,
+        **record_filters
+    )
+    with timer('frame.records'):
+        records_df = pd.DataFrame(page_records, columns=list(STORE_COLUMNS))
+    
+    # Display table with custom styling
+    st.dataframe(
+        records_df,
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "ID": st.column_config.TextColumn("Record ID", width="small"),
+            "Name": st.column_config.TextColumn("Record Name", width="large"),
+            "Category": st.column_config.TextColumn("Category", width="small"),
+            "Status": st.column_config.TextColumn("Status", width="small"),
+            "Priority": st.column_config.TextColumn("Priority", width="small"),
+            "Created": st.column_config.DateColumn("Created", width="small"),
+            "Modified": st.column_config.DateColumn("Modified", width="small"),
+            "Assigned": st.column_config.TextColumn("Assigned To", width="medium")
+        }
+    )
+    
+    # Page navigation
+    first_row = (len(cursors) - 1) * page_size
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("◀ Previous", disabled=len(cursors) == 1, use_container_width=True):
+            cursors.pop()
+            st.rerun()
+    with col2:
+        if records_df.empty:
+            st.caption("No matching records")
+        else:
+            st.caption(f"Rows {first_row + 1:,}–{first_row + len(records_df):,} of {total_matches:,}")
+    with col3:
+        if st.button("Next ▶", disabled=next_cursor is None, use_container_width=True):
+            cursors.append(next_cursor)
+            st.rerun()
+    
+    # Record actions
+    st.subheader("Quick Actions")
+    
+    # IDs are looked up on demand instead of listing every record
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        id_prefix = st.text_input("Find record by ID", placeholder="e.g. IMS-01")
+    with col2:
+        id_options = record_store.find_ids(id_prefix, visible=visible) if id_prefix else records_df['ID'].tolist()
+        selected_record = st.selectbox("Select record for actions:", id_options)
+    
+    if id_options:
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            if st.button("View Details", use_container_width=True):
+                st.session_state.viewing_record = selected_record
+        with col2:
+            st.button("Edit Record", use_container_width=True)
+        with col3:
+            st.button("Duplicate", use_container_width=True)
+        with col4:
+            st.button("Delete", use_container_width=True)
+        
+        # Record details with its attachments
+        viewed = record_store.get(st.session_state.get('viewing_record') or '', visible=visible)
+        if viewed:
+            with st.expander(f"{viewed['ID']} - {viewed['Name']}", expanded=True):
+                st.write(f"**Category:** {viewed['Category']} | **Status:** {viewed['Status']} | "
+                         f"**Priority:** {viewed['Priority']} | **Assigned:** {viewed['Assigned']}")
+                if viewed['Description']:
+                    st.write(viewed['Description'])
+                if viewed['Tags']:
+                    st.caption(f"Tags: {viewed['Tags']}")
+                
+                for attachment in attachment_store.for_record(viewed['ID']):
+                    extraction = extraction_pool.status(attachment['sha256']) or {}
+                    col1, col2 = st.columns([3, 1])
+                    with col1:
+                        st.write(f"{attachment['name']} ({format_size(attachment['size'])})")
+                        thumbnail = extraction_pool.thumbnail_path(attachment['sha256'])
+                        if extraction.get('thumbnail') and thumbnail.exists():
+                            st.image(str(thumbnail))
+                        if extraction.get('status') == EXTRACTED:
+                            st.caption("Indexed for search")
+                        elif extraction.get('status') == EXTRACTION_FAILED:
+                            st.caption(f"Not indexed: {extraction['error']}")
+                        elif extraction:
+                            st.caption("Extracting text...")
+                    with col2:
+                        # The file is only read once asked for, not on every rerun
+                        if st.session_state.get('download_attachment') == attachment['id']:
+                            with attachment_store.open_blob(attachment['sha256']) as blob:
+                                st.download_button(
+                                    "Save File",
+                                    data=bytes(blob),
+                                    file_name=attachment['name'],
+                                    mime=attachment['mime'] or "application/octet-stream",
+                                    key=f"attachment_{attachment['id']}",
+                                    use_container_width=True
+                                )
+                        elif st.button("Download", key=f"prepare_attachment_{attachment['id']}",
+                                       use_container_width=True):
+                            st.session_state.download_attachment = attachment['id']
+                            st.rerun()
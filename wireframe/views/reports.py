@@ -0,0 +1,159 @@
+"""Reports & Analytics page: background report jobs and charts."""
+
+import os
+from datetime import datetime
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from ims.profiling import timer
+from ims.reports import READY, REPORT_TYPES, format_size
+from ims.mailer import compose
+from shared import (CURRENT_USER, CURRENT_USER_EMAIL, get_activity_log, get_figure_cache,
+                    get_mail_queue, get_report_jobs, get_settings_store, show_chart)
+
+
+def render():
+    activity_log = get_activity_log()
+    figure_cache = get_figure_cache()
+    
+    st.markdown("## Reports & Analytics")
+    
+    # Report type selector
+    col1, col2, col3 = st.columns([2, 1, 1])
+    
+    with col1:
+        report_type = st.selectbox("Select Report Type:", list(REPORT_TYPES))
+    
+    with col2:
+        date_range = st.selectbox("Time Period:", [
+            "Last 7 days",
+            "Last 30 days",
+            "Last 90 days",
+            "This Year",
+            "Custom Range"
+        ])
+    
+    with col3:
+        st.markdown("<br>", unsafe_allow_html=True)
+        if st.button("Generate Report", use_container_width=True):
+            get_report_jobs().submit(report_type, date_range, CURRENT_USER)
+            activity_log.log('Report Generated', CURRENT_USER, f"{report_type} ({date_range})")
+            st.toast(f"{report_type} queued")
+    
+    st.markdown("---")
+    
+    # Quick stats dashboard
+    st.subheader("Quick Statistics")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("Total Records", "1,247", "12%")
+    with col2:
+        st.metric("Active Users", "45", "8%")
+    with col3:
+        st.metric("Storage Used", "2.3 TB", "5%")
+    with col4:
+        st.metric("System Uptime", "99.8%", "0.2%")
+    
+    # Charts and visualizations
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        st.subheader("Monthly Activity Trend")
+        months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun']
+        activities = [234, 289, 345, 423, 567, 612]
+        
+        def build_monthly_trend():
+            fig = px.bar(x=months, y=activities, title="Monthly System Activity")
+            fig.update_layout(xaxis_title="Month", yaxis_title="Activities")
+            return fig
+        
+        # Static sample data, so a fixed version keeps it cached
+        chart = figure_cache.get_or_build('reports_monthly_trend', 0, build_monthly_trend)
+        show_chart(chart)
+    
+    with col2:
+        st.subheader("User Activity Distribution")
+        users = ['John S.', 'Jane D.', 'Bob W.', 'Alice J.', 'Mike D.']
+        activity_counts = [156, 134, 98, 87, 65]
+        
+        chart = figure_cache.get_or_build(
+            'reports_user_share', 0,
+            lambda: px.pie(values=activity_counts, names=users, title="User Activity Share")
+        )
+        show_chart(chart)
+    
+    # Report history table
+    st.subheader("Recent Reports")
+    
+    report_jobs = get_report_jobs()
+    
+    # Poll job state in a fragment so only the table reruns while reports are being built
+    @st.fragment(run_every=2 if report_jobs.active() else None)
+    def recent_reports():
+        jobs = report_jobs.jobs()
+        with timer('frame.report_history'):
+            report_history = pd.DataFrame(
+                [
+                    {
+                        'Report Name': job['name'],
+                        'Type': REPORT_TYPES[job['report_type']],
+                        'Generated': datetime.fromtimestamp(job['submitted']).strftime('%Y-%m-%d %H:%M'),
+                        'Status': job['status'],
+                        'Size': format_size(job['size']),
+                        'Duration': f"{job['finished'] - job['started']:.1f} s" if job['finished'] and job['started'] else ''
+                    }
+                    for job in jobs
+                ],
+                columns=['Report Name', 'Type', 'Generated', 'Status', 'Size', 'Duration']
+            )
+        
+        st.dataframe(report_history, use_container_width=True, hide_index=True)
+        
+        for job in jobs:
+            if job['error']:
+                st.caption(f"{job['name']} failed: {job['error']}")
+                break
+        
+        # Stop polling once the last job is done
+        if st.session_state.get('reports_polling') and not report_jobs.active():
+            st.session_state.reports_polling = False
+            st.rerun()
+        st.session_state.reports_polling = report_jobs.active()
+    
+    recent_reports()
+    
+    latest_report = next(
+        (job for job in report_jobs.jobs() if job['status'] == READY and os.path.exists(job['path'])),
+        None
+    )
+    
+    # Action buttons for reports
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        if latest_report:
+            with open(latest_report['path'], 'rb') as report_file:
+                st.download_button(
+                    "Download Report",
+                    data=report_file,
+                    file_name=f"{latest_report['name']}.csv",
+                    mime="text/csv",
+                    use_container_width=True
+                )
+        else:
+            st.button("Download Report", disabled=True, use_container_width=True)
+    with col2:
+        if st.button("Email Report", use_container_width=True, disabled=not latest_report):
+            get_mail_queue().enqueue([compose(
+                'report', CURRENT_USER_EMAIL, latest_report['path'],
+                report_name=latest_report['name'], system_name=get_settings_store().get('system_name')
+            )])
+            activity_log.log('Report Emailed', CURRENT_USER, latest_report['name'])
+            st.toast(f"{latest_report['name']} will be emailed to {CURRENT_USER_EMAIL}")
+    with col3:
+        st.button("Schedule Report", use_container_width=True)
+    with col4:
+        st.button("Refresh Data", use_container_width=True)
@@ -0,0 +1,412 @@
+"""Training & Documentation page."""
+
+import streamlit as st
+
+from ims.reference import FAQ, TRAINING_MODULES, search_faq
+
+
+def render():
+    st.markdown("## Training & Documentation")
+    
+    # Training navigation tabs
+    training_tabs = st.tabs(["User Guide", "Training Modules", "Quick Reference", "FAQ", "Video Tutorials", "Support"])
+    
+    with training_tabs[0]:  # User Guide
+        st.subheader("System User Guide")
+        
+        # User guide sections
+        guide_sections = st.selectbox("Select Guide Section:", [
+            "Getting Started",
+            "Navigation & Interface",
+            "Managing Records",
+            "Creating Reports", 
+            "User Management",
+            "System Administration",
+            "Security & Permissions",
+            "Troubleshooting"
+        ])
+        
+        if guide_sections == "Getting Started":
+            st.markdown("""
+            ###Welcome to the Information Management System
+            
+            This comprehensive guide will help you get started with the IMS platform.
+            
+            #### First Steps:
+            1. **Login**: Use your corporate credentials to access the system
+            2. **Dashboard**: Familiarize yourself with the main dashboard layout
+            3. **Navigation**: Learn to use the sidebar navigation menu
+            4. **Profile**: Complete your user profile setup
+            
+            #### System Overview:
+            The IMS is designed to help organizations manage their information assets efficiently:
+            - **Records Management**: Create, edit, and organize documents
+            - **Collaboration**: Share and collaborate on records with team members
+            - **Reporting**: Generate insights from your data
+            - **Security**: Maintain data security and access controls
+            """)
+            
+            st.info("**Tip**: Start by exploring the Dashboard to get familiar with the system layout.")
+            
+        elif guide_sections == "Managing Records":
+            st.markdown("""
+            ###Records Management Guide
+            
+            #### Creating New Records:
+            1. Navigate to **Records Management** from the sidebar
+            2. Click the **"+ Add New Record"** button
+            3. Fill in the required information:
+               - Record Title (required)
+               - Category (required)
+               - Description
+               - Priority Level
+               - Tags
+            4. Set access permissions
+            5. Upload any relevant files
+            6. Save the record
+            
+            #### Organizing Records:
+            - **Categories**: Use categories to group related records
+            - **Tags**: Add descriptive tags for easy searching
+            - **Folders**: Organize records in logical folder structures
+            - **Search**: Use the search functionality to find records quickly
+            
+            #### Best Practices:
+            - Use descriptive titles and clear descriptions
+            - Apply consistent tagging conventions
+            - Regularly review and update record statuses
+            - Set appropriate access permissions
+            """)
+            
+        # Add downloadable user manual
+        st.markdown("###Downloadable Resources")
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.download_button(
+                label="Download User Manual (PDF)",
+                data="Sample user manual content...",
+                file_name="IMS_User_Manual.pdf",
+                mime="application/pdf",
+                use_container_width=True
+            )
+        
+        with col2:
+            st.download_button(
+                label="Download Quick Reference",
+                data="Quick reference guide content...",
+                file_name="IMS_Quick_Reference.pdf", 
+                mime="application/pdf",
+                use_container_width=True
+            )
+        
+        with col3:
+            st.download_button(
+                label="Admin Guide",
+                data="Administrator guide content...",
+                file_name="IMS_Admin_Guide.pdf",
+                mime="application/pdf",
+                use_container_width=True
+            )
+    
+    with training_tabs[1]:  # Training Modules
+        st.subheader("Interactive Training Modules")
+        
+        # Training progress
+        st.markdown("###Your Training Progress")
+        progress_col1, progress_col2, progress_col3 = st.columns(3)
+        
+        with progress_col1:
+            st.metric("Completed Modules", "3/8", "37.5%")
+        with progress_col2:
+            st.metric("Time Spent", "2.5 hours", "+30 min")
+        with progress_col3:
+            st.metric("Certification Progress", "60%", "+15%")
+        
+        st.progress(0.375)  # 37.5% progress
+        
+        # Training modules list
+        st.markdown("###Available Training Modules")
+        
+        # Plain rows: two small tables are not worth importing pandas for
+        st.dataframe(list(TRAINING_MODULES), use_container_width=True, hide_index=True)
+        
+        # Module actions
+        selected_module = st.selectbox("Select module to start:", 
+            [m["Module"] for m in TRAINING_MODULES if "Not Started" in m["Status"] or "In Progress" in m["Status"]])
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            if st.button("Start Module", use_container_width=True):
+                st.success(f"Starting module: {selected_module}")
+        with col2:
+            st.button("Take Assessment", use_container_width=True)
+        with col3:
+            st.button("View Certificate", use_container_width=True)
+    
+    with training_tabs[2]:  # Quick Reference
+        st.subheader("Quick Reference Guide")
+        
+        # Quick reference sections
+        ref_col1, ref_col2 = st.columns(2)
+        
+        with ref_col1:
+            st.markdown("""
+            ###Keyboard Shortcuts
+            
+            | Action | Shortcut |
+            |--------|----------|
+            | New Record | `Ctrl + N` |
+            | Search | `Ctrl + F` |
+            | Save | `Ctrl + S` |
+            | Print | `Ctrl + P` |
+            | Help | `F1` |
+            | Refresh | `F5` |
+            | Logout | `Ctrl + L` |
+            
+            ###Search Operators
+            
+            | Operator | Example | Description |
+            |----------|---------|-------------|
+            | `AND` | `contract AND legal` | Both terms |
+            | `OR` | `budget OR finance` | Either term |
+            | `NOT` | `project NOT archived` | Exclude term |
+            | `"quotes"` | `"project plan"` | Exact phrase |
+            | `*` | `proj*` | Wildcard |
+            """)
+        
+        with ref_col2:
+            st.markdown("""
+            ###Status Indicators
+            
+            | Symbol | Status | Description |
+            |--------|--------|-------------|
+            |   | Active | Record is active and current |
+            |   | Pending | Awaiting review or approval |
+            |   | Inactive | Record is disabled |
+            |   | Draft | Work in progress |
+            |   | Complete | Task or process finished |
+            |   | Processing | System is working |
+            
+            ###Priority Levels
+            
+            | Level | Color | When to Use |
+            |-------|-------|-------------|
+            |   Critical | Red | Immediate attention required |
+            |   High | Orange | Important, handle soon |
+            |   Medium | Yellow | Normal priority |
+            |   Low | Green | Handle when convenient |
+            """)
+        
+        # Common tasks checklist
+        st.markdown("###Common Tasks Checklist")
+        
+        task_col1, task_col2 = st.columns(2)
+        
+        with task_col1:
+            st.markdown("**Daily Tasks:**")
+            st.checkbox("Check dashboard for new notifications")
+            st.checkbox("Review assigned records")
+            st.checkbox("Update record statuses")
+            st.checkbox("Respond to collaboration requests")
+        
+        with task_col2:
+            st.markdown("**Weekly Tasks:**")
+            st.checkbox("Generate weekly activity report")
+            st.checkbox("Archive completed records")
+            st.checkbox("Review security alerts")
+            st.checkbox("Update team on progress")
+    
+    with training_tabs[3]:  # FAQ
+        st.subheader("Frequently Asked Questions")
+        
+        # FAQ categories
+        faq_category = st.selectbox("Select Category:", list(FAQ))
+        
+        for question, answer in FAQ[faq_category]:
+            with st.expander(question):
+                st.markdown(answer)
+        
+        # Search FAQ
+        st.markdown("###Search FAQ")
+        faq_search = st.text_input("Search FAQ:", placeholder="Type your question...")
+        
+        if faq_search:
+            st.info(f"Searching for: '{faq_search}'")
+            faq_matches = search_faq(faq_search)
+            if faq_matches:
+                for question, answer in faq_matches:
+                    with st.expander(question):
+                        st.markdown(answer)
+            else:
+                st.markdown("**Suggested topics:**")
+                st.write("• How to reset password")
+                st.write("• Record sharing permissions") 
+                st.write("• System backup procedures")
+    
+    with training_tabs[4]:  # Video Tutorials
+        st.subheader("Video Tutorials")
+        
+        # Video tutorial categories
+        video_col1, video_col2 = st.columns(2)
+        
+        with video_col1:
+            st.markdown("### Getting Started Videos")
+            
+            tutorials = [
+                {"title": "System Overview & Navigation", "duration": "5:32", "views": "1,234"},
+                {"title": "Creating Your First Record", "duration": "7:45", "views": "987"},
+                {"title": "Understanding Dashboard Widgets", "duration": "4:18", "views": "756"},
+                {"title": "Basic Search Techniques", "duration": "6:23", "views": "654"}
+            ]
+            
+            for tutorial in tutorials:
+                with st.container():
+                    col_thumb, col_info = st.columns([1, 3])
+                    
+                    with col_thumb:
+                        st.markdown("")  # Video thumbnail placeholder
+                    
+                    with col_info:
+                        st.markdown(f"**{tutorial['title']}**")
+                        st.caption(f"Duration: {tutorial['duration']} | Views: {tutorial['views']}")
+                        if st.button(f"Watch", key=f"watch_{tutorial['title']}", use_container_width=True):
+                            st.info(f"Playing: {tutorial['title']}")
+        
+        with video_col2:
+            st.markdown("###Advanced Features")
+            
+            advanced_tutorials = [
+                {"title": "Advanced Search & Filtering", "duration": "8:12", "views": "543"},
+                {"title": "Creating Custom Reports", "duration": "12:34", "views": "432"},
+                {"title": "User Management & Permissions", "duration": "9:56", "views": "321"},
+                {"title": "System Administration", "duration": "15:22", "views": "210"}
+            ]
+            
+            for tutorial in advanced_tutorials:
+                with st.container():
+                    col_thumb, col_info = st.columns([1, 3])
+                    
+                    with col_thumb:
+                        st.markdown("")  # Video thumbnail placeholder
+                    
+                    with col_info:
+                        st.markdown(f"**{tutorial['title']}**")
+                        st.caption(f"Duration: {tutorial['duration']} | Views: {tutorial['views']}")
+                        if st.button(f"Watch", key=f"watch_adv_{tutorial['title']}", use_container_width=True):
+                            st.info(f"Playing: {tutorial['title']}")
+        
+        # Video playlist
+        st.markdown("### 📺 Recommended Learning Path")
+        learning_path = [
+            "1. System Overview & Navigation",
+            "2. Creating Your First Record", 
+            "3. Understanding Dashboard Widgets",
+            "4. Basic Search Techniques",
+            "5. Advanced Search & Filtering",
+            "6. Creating Custom Reports"
+        ]
+        
+        for i, step in enumerate(learning_path):
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.write(step)
+            with col2:
+                if i < 3:  # First 3 completed
+                    st.markdown("")
+                elif i == 3:  # Current step
+                    st.markdown("")
+                else:  # Future steps
+                    st.markdown("")
+    
+    with training_tabs[5]:  # Support
+        st.subheader("Support & Help")
+        
+        support_col1, support_col2 = st.columns(2)
+        
+        with support_col1:
+            st.markdown("###Get Help")
+            
+            # Support ticket form
+            with st.form("support_ticket"):
+                st.markdown("**Submit Support Ticket**")
+                
+                ticket_type = st.selectbox("Issue Type:", [
+                    "Technical Problem",
+                    "Account Access",
+                    "Feature Request", 
+                    "Training Question",
+                    "Bug Report",
+                    "Other"
+                ])
+                
+                priority = st.selectbox("Priority:", ["Low", "Medium", "High", "Urgent"])
+                
+                subject = st.text_input("Subject:", placeholder="Brief description of your issue")
+                
+                description = st.text_area("Description:", 
+                    placeholder="Please provide detailed information about your issue...",
+                    height=100)
+                
+                attachment = st.file_uploader("Attach screenshot or file (optional):")
+                
+                if st.form_submit_button("Submit Ticket", use_container_width=True):
+                    st.success("Support ticket submitted successfully! Ticket #IMS-2024-001")
+        
+        with support_col2:
+            st.markdown("###Contact Information")
+            
+            st.info("""
+            **Email Support**  
+            support@company.com  
+            Response time: 2-4 hours
+            
+            **Phone Support**  
+            +1 (555) 123-4567  
+            Hours: Mon-Fri 8AM-6PM EST
+            
+            **Live Chat**  
+            Available on this page  
+            Hours: Mon-Fri 9AM-5PM EST
+            
+            **Knowledge Base**  
+            help.company.com/ims
+            """)
+            
+            st.markdown("###Support Statistics")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.metric("Avg Response Time", "2.3 hours")
+                st.metric("Resolution Rate", "94%")
+            with col2:
+                st.metric("Satisfaction Score", "4.6/5")
+                st.metric("Open Tickets", "12")
+        
+        # Recent tickets
+        st.markdown("###Your Recent Tickets")
+        
+        user_tickets = [
+            {
+                'Ticket ID': 'IMS-2024-001',
+                'Subject': 'Cannot upload large files',
+                'Status': 'In Progress',
+                'Created': '2024-01-20',
+                'Priority': 'Medium'
+            },
+            {
+                'Ticket ID': 'IMS-2024-002', 
+                'Subject': 'Password reset not working',
+                'Status': 'Resolved',
+                'Created': '2024-01-18',
+                'Priority': 'High'
+            }
+        ]
+        
+        st.dataframe(user_tickets, use_container_width=True, hide_index=True)
+        
+        # Live chat simulation
+        st.markdown("###Live Chat")
+        if st.button("Start Live Chat", use_container_width=True):
+            st.success("Connecting you with a support agent...")
+            st.info("**Agent Sarah**: Hello! How can I help you today?")